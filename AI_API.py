@@ -1,41 +1,91 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+import base64
 import datetime
-import psycopg2
+import json
 
 from model_service import (
-    download_repo_and_save_safetensors,
     set_model_idle,
     set_model_standby,
-    set_model_serving
+    set_model_serving,
+    apply_model_states
 )
 from vllm_control import restart_vllm_process
+from download_jobs import download_queue, check_endpoint, QueueFullError
+from vllm_supervisor import supervisor
+from gateway import gateway_bp, router, switch_route, Backend
+from prefetch import recent_reports as prefetch_reports
+from model_cache import model_ids
+from model_snapshot import model_snapshot
+from model_events import event_bus
+from model_store import get_store
+from leaderboard import leaderboard, BOOTSTRAP_ROUNDS
+from placement import GPU_RESERVE_FRACTION
+import metrics
+import tracing
 
 app = Flask(__name__)
+# OpenAI 호환 요청 라우팅 게이트웨이 (/slots/<slot>/v1/...)
+app.register_blueprint(gateway_bp)
+# 경로별 요청 처리 시간 (/metrics)
+metrics.instrument_app(app)
 
-# PostgreSQL 접속 정보 (DB 연결 함수로 관리)
-DB_CONN_INFO = "dbname=malpyeong user=postgres password=!TeddySum host=127.0.0.1 port=5432"
+DEFAULT_SLOT = "s1"
 
-def get_db_connection():
-    return psycopg2.connect(DB_CONN_INFO)
+def _on_model_event(event):
+    # 다른 프로세스(스케줄러 등)의 상태 변경도 이벤트로 받아 프로세스 내 캐시 무효화
+    model_snapshot.invalidate()
+    model_ids.invalidate(event.get("team"))
+
+event_bus.add_callback(_on_model_event)
+
+# /eval/submit_batch 한 요청당 최대 건수
+EVAL_BATCH_MAX = 10000
+# evaluations 컬럼 제한 (db_init.py와 같게) – 배치에서 한 항목 때문에 전체 트랜잭션이 롤백되지 않도록 미리 검사
+EVALUATION_VALUES = ("1", "2", "3", "4")  # 1: A 우수, 2: B 우수, 3: 둘 다 좋음, 4: 둘 다 별로
+SESSION_ID_MAX_LEN = 50                    # session_id VARCHAR(50)
+EVALUATOR_ID_MAX = 2 ** 31 - 1             # evaluator_id INTEGER
+# /eval/list 페이지 크기 (스트리밍 시 한 번에 가져오는 행 수는 model_store.EVAL_ITER_PAGE)
+EVAL_LIST_DEFAULT_LIMIT = 100
+EVAL_LIST_MAX_LIMIT = 1000
+# /models/events keep-alive 주석을 보내는 간격(초)
+EVENTS_KEEPALIVE_SEC = 15
+# /leaderboard bootstrap 반복 횟수 상한
+LEADERBOARD_MAX_ROUNDS = 1000
 
 @app.route("/ping", methods=["GET"])
 def ping():
     return jsonify({"msg": "pong"}), 200
 
-# 모델 다운로드
+# 모델 다운로드 (백그라운드 작업으로 등록 후 job_id 즉시 반환)
 @app.route("/models/download", methods=["POST"])
 def models_download():
     data = request.json
     repo_id = data["user_id"]  # 예: "TeamA/testcnn"
     try:
-        download_repo_and_save_safetensors(repo_id)
-        return jsonify({"msg": f"Downloaded & idle: {repo_id}"}), 200
+        # 선택사항: HF 미러 주소 (MALPYEONG_HUB_MIRRORS에 등록된 것만)
+        endpoint = check_endpoint(data.get("endpoint"))
+        job = download_queue.submit(repo_id, endpoint=endpoint)
+        return jsonify({
+            "msg": f"Download queued: {repo_id}",
+            "job_id": job.job_id,
+            "status_url": f"/models/download/{job.job_id}"
+        }), 202
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 429
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+# 다운로드 작업 상태 조회
+@app.route("/models/download/<job_id>", methods=["GET"])
+def models_download_status(job_id):
+    job = download_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job_id: {job_id}"}), 404
+    return jsonify(job.to_dict()), 200
+
 # 모델 스탠바이
 @app.route("/models/standby", methods=["POST"])
 def models_standby():
@@ -44,9 +94,11 @@ def models_standby():
     gpu_id = data.get("gpu_id", 0)
     port = data.get("port", 5021)
     try:
-        set_model_standby(team_name, gpu_id=gpu_id)
-        restart_vllm_process(team_name, role='standby', default_port=port)
-        return jsonify({"msg": f"{team_name} → standby (gpu={gpu_id}, port={port})"}), 200
+        with tracing.span("models_standby", team=team_name, gpu=gpu_id, port=port) as sp:
+            # vLLM이 실제로 응답할 때까지 기다린 뒤에 standby 상태로 기록
+            restart_vllm_process(team_name, role='standby', default_port=port, gpu_id=gpu_id)
+            set_model_standby(team_name, gpu_id=gpu_id, port=port)
+        return jsonify({"msg": f"{team_name} → standby (gpu={gpu_id}, port={port})", "trace_id": sp.trace_id}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -58,9 +110,14 @@ def models_serve():
     gpu_id = data.get("gpu_id", 0)
     port = data.get("port", 5022)
     try:
-        set_model_serving(team_name, gpu_id=gpu_id)
-        restart_vllm_process(team_name, role='serving', default_port=port)
-        return jsonify({"msg": f"{team_name} → serving (gpu={gpu_id}, port={port})"}), 200
+        with tracing.span("models_serve", team=team_name, gpu=gpu_id, port=port) as sp:
+            # vLLM이 실제로 응답할 때까지 기다린 뒤에 serving 상태로 기록
+            vllm = restart_vllm_process(team_name, role='serving', default_port=port, gpu_id=gpu_id)
+            set_model_serving(team_name, gpu_id=gpu_id, port=port)
+            if data.get("slot"):
+                with tracing.span("switch_route", slot=data["slot"]):
+                    switch_route(data["slot"], Backend(port, team_name=team_name, model_name=vllm.model_path))
+        return jsonify({"msg": f"{team_name} → serving (gpu={gpu_id}, port={port})", "trace_id": sp.trace_id}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -75,81 +132,66 @@ def models_idle():
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
-# 모델 목록 조회
+def _snapshot_response(entry):
+    # 스냅샷 본문 + ETag, If-None-Match가 같으면 304 (본문 없음)
+    body, etag = entry
+    resp = Response(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp.make_conditional(request)
+
+# 모델 목록 조회 (상태가 바뀔 때만 다시 읽는 메모리 스냅샷, ETag 지원)
 @app.route("/models/list", methods=["GET"])
 def models_list():
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT team_name, model_name, model_state, gpu_id, safetensors_path, downloaded_at, updated_at
-            FROM models
-        """)
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        results = []
-        for r in rows:
-            results.append({
-                "team_name": r[0],
-                "model_name": r[1],
-                "state": r[2],
-                "gpu_id": r[3],
-                "safetensors_path": r[4],
-                "downloaded_at": r[5].strftime("%Y-%m-%d %H:%M:%S") if r[5] else None,
-                "updated_at": r[6].strftime("%Y-%m-%d %H:%M:%S") if r[6] else None
-            })
-        return jsonify(results), 200
+        return _snapshot_response(model_snapshot.models_list())
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
-# 현재 서빙 모델 조회
+# 모델 상태 변경 이벤트 스트림 (Server-Sent Events)
+@app.route("/models/events", methods=["GET"])
+def models_events():
+    """
+    GET /models/events  (text/event-stream)
+    - set_model_* / 스케줄러 전환 때마다 {team, state, gpu, port, ts} 이벤트 전송
+    - 프로세스당 LISTEN 커넥션 하나가 모든 구독자에게 팬아웃 (구독자 수와 무관하게 DB 부하 일정)
+    - 재접속 시 Last-Event-ID 이후 보관 중인 이벤트부터 다시 전송
+    """
+    last_id = request.headers.get("Last-Event-ID", request.args.get("last_event_id"))
+    sub = event_bus.subscribe(int(last_id) if last_id and last_id.isdigit() else None)
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                item = sub.get(timeout=EVENTS_KEEPALIVE_SEC)
+                if item is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                seq, event = item
+                yield f"id: {seq}\nevent: model_state\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            sub.close()
+
+    resp = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+# 현재 서빙 모델 조회 (상태가 바뀔 때만 다시 읽는 메모리 스냅샷, ETag 지원)
 @app.route("/models/current", methods=["GET"])
 def models_current():
     team_name = request.args.get("user_id", None)
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        if team_name:
-            cur.execute("""
-                SELECT model_name, safetensors_path, gpu_id
-                FROM models
-                WHERE team_name = %s AND model_state = 'serving'
-                LIMIT 1
-            """, (team_name,))
-            row = cur.fetchone()
-            cur.close()
-            conn.close()
-            if not row:
-                return jsonify({"msg": f"No serving model for {team_name}"}), 200
-            return jsonify({
-                "team_name": team_name,
-                "model_name": row[0],
-                "safetensors_path": row[1],
-                "gpu_id": row[2]
-            }), 200
-        else:
-            cur.execute("""
-                SELECT team_name, model_name, safetensors_path, gpu_id
-                FROM models
-                WHERE model_state = 'serving'
-            """)
-            rows = cur.fetchall()
-            cur.close()
-            conn.close()
-            results = []
-            for r in rows:
-                results.append({
-                    "team_name": r[0],
-                    "model_name": r[1],
-                    "safetensors_path": r[2],
-                    "gpu_id": r[3]
-                })
-            return jsonify(results), 200
+        return _snapshot_response(model_snapshot.models_current(team_name or None))
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
-# 모델 스위치: 기존 serving → idle, 새 모델 → serving
+# 모델 스위치 (blue/green): 새 모델을 먼저 띄우고 ready가 되면 게이트웨이 라우팅 전환
+#   → 기존 모델의 진행 중 요청이 끝나면 기존 vLLM 종료, 기존 serving → idle, 새 모델 → serving
+# 새 모델이 기존 모델과 같은 GPU면 기존 프로세스를 먼저 내려야 하므로 무중단이 아님
+# 같은 GPU의 다른 팀 슬롯(packed 배치로 함께 올린 standby 등)은 유지하고 교체되는 슬롯만 내림
+#   → 그때 새 모델의 --gpu-memory-utilization은 gpu_memory_utilization(선택) 또는 남은 비율
 @app.route("/models/switch", methods=["POST"])
 def models_switch():
     data = request.json
@@ -157,15 +199,148 @@ def models_switch():
     new_team = data["new_user_id"]
     new_gpu_id = data.get("new_gpu_id", 0)
     new_port = data.get("new_port", 5021)
+    slot = data.get("slot") or router.slot_of_team(old_team) or DEFAULT_SLOT
+    old_slots = [s for s in supervisor.slots() if s.team_name == old_team]
+    zero_downtime = all(s.gpu_id != new_gpu_id and s.port != new_port for s in old_slots)
+    co_located = [s for s in supervisor.find_by_gpu(new_gpu_id) if s.team_name != old_team and s.port != new_port]
     try:
-        set_model_idle(old_team)
-        set_model_serving(new_team, gpu_id=new_gpu_id)
-        restart_vllm_process(new_team, role='serving', default_port=new_port)
-        return jsonify({"msg": f"Switched from {old_team} to {new_team}. {old_team} → idle, {new_team} → serving (gpu={new_gpu_id}, port={new_port})"}), 200
+        utilization = data.get("gpu_memory_utilization")
+        if utilization is None:
+            utilization = round(1 - GPU_RESERVE_FRACTION - sum(s.gpu_memory_utilization or 0 for s in co_located), 3)
+        if not 0 < utilization <= 1:
+            raise ValueError(f"gpu {new_gpu_id}에 남은 메모리 비율이 없습니다 (gpu_memory_utilization={utilization})")
+        with tracing.span("models_switch", old=old_team, new=new_team, gpu=new_gpu_id, port=new_port) as sp:
+            # 0) 같은 GPU의 기존 모델은 메모리를 비우려고 먼저 종료 (다른 포트여도)
+            for s in old_slots:
+                if s.gpu_id == new_gpu_id and s.port != new_port:
+                    with tracing.span("kill", gpu=s.gpu_id, port=s.port, team=s.team_name):
+                        supervisor.stop(s.port)
+            # 1) 새 모델 기동 및 ready 대기 (그동안 다른 GPU의 기존 모델이 계속 응답)
+            new_vllm = restart_vllm_process(new_team, role='serving', default_port=new_port, gpu_id=new_gpu_id,
+                                            gpu_memory_utilization=utilization, exclusive=False)
+            # 2) 라우팅 원자적 전환 + 기존 백엔드 drain
+            with tracing.span("switch_route", slot=slot):
+                _, drained = switch_route(slot, Backend(new_port, team_name=new_team, model_name=new_vllm.model_path))
+            # 3) 다른 GPU의 기존 vLLM 종료
+            for s in old_slots:
+                if s.port != new_port and s.gpu_id != new_gpu_id:
+                    with tracing.span("kill", gpu=s.gpu_id, port=s.port, team=s.team_name):
+                        supervisor.stop(s.port)
+            # 4) 기존 → idle, 새 모델 → serving을 한 트랜잭션으로 (중간 상태가 보이지 않음)
+            apply_model_states({old_team: ("idle", None), new_team: ("serving", new_gpu_id, new_port)})
+        return jsonify({
+            "msg": f"Switched from {old_team} to {new_team}. {old_team} → idle, {new_team} → serving (gpu={new_gpu_id}, port={new_port})",
+            "slot": slot,
+            "zero_downtime": zero_downtime,
+            "drained": drained,
+            "trace_id": sp.trace_id
+        }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+# GPU 슬롯별 vLLM 프로세스 현황 (PID/포트/GPU/팀)
+@app.route("/gpus", methods=["GET"])
+def gpus():
+    return jsonify([slot.to_dict() for slot in supervisor.slots()]), 200
+
+# GPU 슬롯 vLLM 로그 마지막 N줄 (?n=100&port=5021)
+@app.route("/gpus/<int:gpu_id>/logs", methods=["GET"])
+def gpu_logs(gpu_id):
+    n = request.args.get("n", 100, type=int)
+    port = request.args.get("port", None, type=int)
+    slots = [s for s in supervisor.find_by_gpu(gpu_id) if port is None or s.port == port]
+    if not slots:
+        return jsonify({"error": f"No vLLM slot on gpu {gpu_id}"}), 404
+    return jsonify([{
+        "gpu_id": s.gpu_id,
+        "port": s.port,
+        "log_path": s.log_path,
+        "lines": s.tail(n)
+    } for s in slots]), 200
+
+# 모델별 vLLM 기동 시간 (launch → ready) 기록
+@app.route("/models/cold_start", methods=["GET"])
+def models_cold_start():
+    team_name = request.args.get("user_id", None)
+    history = supervisor.cold_starts()
+    if team_name:
+        return jsonify({team_name: history.get(team_name, [])}), 200
+    return jsonify(history), 200
+
+# 다음 스케줄 모델 prefetch(다운로드/page cache 워밍) 결과
+@app.route("/prefetch", methods=["GET"])
+def prefetch_status():
+    return jsonify(prefetch_reports()), 200
+
+# 프로세스 내 캐시 상태 (모델명 → model_id 적중률, /models/list·current 스냅샷 재생성 횟수)
+@app.route("/models/cache", methods=["GET"])
+def models_cache():
+    return jsonify({"model_ids": model_ids.stats(), "snapshot": model_snapshot.stats(), "events": event_bus.stats()}), 200
+
+# Prometheus 지표 (프로세스별; serve.py에서는 /metrics/control이 제어 프로세스로 전달됨)
+@app.route("/metrics", methods=["GET"])
+@app.route("/metrics/control", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+# 최근 전환 trace (스케줄 전환, /models/switch 등) – 단계별 소요 시간
+@app.route("/traces", methods=["GET"])
+def traces():
+    """
+    GET /traces?limit=20&name=daily_model_switch&min_ms=1000&spans=1
+      - 최신순, 진행 중인 trace 포함 (끝나지 않은 span은 duration_ms=null)
+      - spans=1이 아니면 trace별로 가장 오래 걸린 단계(slowest_span)만
+    """
+    limit = min(max(request.args.get("limit", 20, type=int), 1), tracing.TRACE_HISTORY)
+    return jsonify(tracing.recent_traces(limit, name=request.args.get("name"),
+                                         min_ms=request.args.get("min_ms", type=float),
+                                         with_spans=request.args.get("spans", "0") in ("1", "true"))), 200
+
+@app.route("/traces/<trace_id>", methods=["GET"])
+def trace_detail(trace_id):
+    trace = tracing.get_trace(trace_id)
+    if trace is None:
+        return jsonify({"error": f"trace {trace_id} 없음 (최근 {tracing.TRACE_HISTORY}개만 보관, 이전 기록은 {tracing.TRACE_LOG_PATH})"}), 404
+    return jsonify(trace), 200
+
 # 평과 데이터 제출 및 조회
+def _evaluator_id(item):
+    # 숫자이고 INTEGER 범위 안이면 int, 아니면 None (저장소 조회 전에 거름)
+    evaluator_id = str(item.get("evaluator_id", ""))
+    if evaluator_id.isdigit() and int(evaluator_id) <= EVALUATOR_ID_MAX:
+        return int(evaluator_id)
+    return None
+
+def _eval_row(item, resolved, known_evaluators, timestamp):
+    """
+    평가 항목 하나를 검사해 (insert_evaluations에 넘길 row, None) 또는 (None, 오류 메시지) 반환
+      resolved: 모델명 → model_id (model_ids.resolve 결과), known_evaluators: 존재하는 evaluator_id 집합
+    """
+    if not isinstance(item, dict):
+        return None, "평가 항목은 객체여야 합니다."
+    evaluator_id = item.get("evaluator_id")
+    a_model_id = resolved.get(item.get("a_model_name", ""))
+    b_model_id = resolved.get(item.get("b_model_name", ""))
+    session_id = item.get("session_id", "")
+    texts = (item.get("prompt", ""), item.get("a_model_answer", ""), item.get("b_model_answer", ""))
+    if not evaluator_id:
+        return None, "evaluator_id가 필요합니다."
+    if _evaluator_id(item) not in known_evaluators:
+        return None, f"알 수 없는 evaluator_id: {evaluator_id}"
+    if a_model_id is None:
+        return None, f"알 수 없는 a_model_name: {item.get('a_model_name', '')}"
+    if b_model_id is None:
+        return None, f"알 수 없는 b_model_name: {item.get('b_model_name', '')}"
+    if a_model_id == b_model_id:
+        return None, "a_model_name과 b_model_name이 같습니다."
+    if str(item.get("evaluation")) not in EVALUATION_VALUES:
+        return None, f"evaluation은 {', '.join(EVALUATION_VALUES)} 중 하나여야 합니다: {item.get('evaluation')}"
+    if not isinstance(session_id, str) or len(session_id) > SESSION_ID_MAX_LEN:
+        return None, f"session_id는 {SESSION_ID_MAX_LEN}자 이하 문자열이어야 합니다."
+    if not all(isinstance(t, str) for t in texts):
+        return None, "prompt, a_model_answer, b_model_answer는 문자열이어야 합니다."
+    return (a_model_id, b_model_id, *texts, str(item["evaluation"]), timestamp, session_id, _evaluator_id(item)), None
+
 @app.route("/eval/submit", methods=["POST"])
 def eval_submit():
     """
@@ -181,87 +356,151 @@ def eval_submit():
       "evaluation": 1,    // 예: 1: A 우수, 2: B 우수, 3: 둘 다 좋음, 4: 둘 다 별로
       "session_id": "abcd1234"  // 선택사항
     }
+    - /eval/submit_batch와 같은 항목 검사 (evaluator_id 존재, 모델명, evaluation 값 1~4, session_id 길이, 텍스트 타입)
     - 평가 데이터를 evaluations 테이블에 저장 (evaluator_id 포함)
     """
     data = request.json
-    evaluator_id = data.get("evaluator_id")
-    if not evaluator_id:
-        return jsonify({"error": "evaluator_id가 필요합니다."}), 400
-
-    a_model_name = data.get("a_model_name", "")
-    b_model_name = data.get("b_model_name", "")
-    prompt = data.get("prompt", "")
-    a_model_answer = data.get("a_model_answer", "")
-    b_model_answer = data.get("b_model_answer", "")
-    evaluation = data.get("evaluation", 0)
-    session_id = data.get("session_id", "")
+    if not isinstance(data, dict):
+        return jsonify({"error": "평가 항목은 객체여야 합니다."}), 400
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        # 하위 쿼리로 models 테이블에서 해당 모델명에 대한 model_id를 조회
-        cur.execute("""
-            INSERT INTO evaluations
-            (a_model_id, b_model_id, prompt, a_model_answer, b_model_answer,
-             evaluation, timestamp, session_id, evaluator_id)
-            VALUES (
-                (SELECT model_id FROM models WHERE model_name = %s LIMIT 1),
-                (SELECT model_id FROM models WHERE model_name = %s LIMIT 1),
-                %s, %s, %s, %s, %s, %s, %s
-            )
-        """, (a_model_name, b_model_name, prompt, a_model_answer, b_model_answer,
-              evaluation, timestamp, session_id, evaluator_id))
-        conn.commit()
-        cur.close()
-        conn.close()
+        # /eval/submit_batch와 같은 검사 (모델명은 프로세스 내 캐시로 model_id 변환, 모르는 이름은 DB에 가기 전에 거절)
+        store = get_store()
+        resolved = model_ids.resolve((data.get("a_model_name", ""), data.get("b_model_name", "")))
+        evaluator_id = _evaluator_id(data)
+        known_evaluators = store.known_evaluators({evaluator_id} if evaluator_id is not None else set())
+        row, error = _eval_row(data, resolved, known_evaluators, timestamp)
+        if error:
+            return jsonify({"error": error}), 400
+        # 평가 저장과 쌍별 누계 갱신은 저장소에서 한 트랜잭션
+        store.insert_evaluations([row])
         return jsonify({"msg": "evaluation saved"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+# 평가 데이터 일괄 제출 (한 트랜잭션, multi-row INSERT)
+@app.route("/eval/submit_batch", methods=["POST"])
+def eval_submit_batch():
+    """
+    POST /eval/submit_batch
+    요청 예시: {"evaluations": [ /eval/submit와 같은 형식의 평가 객체, ... ]}  (배열만 보내도 됨)
+    - 모델명은 프로세스 내 캐시로 model_id로 변환, 평가자는 한 번의 쿼리로 존재 확인
+    - evaluation 값(1~4), session_id 길이, 텍스트 타입도 항목별로 검사해 rejected로 돌려줌
+    - 검증을 통과한 항목만 한 트랜잭션에서 multi-row INSERT
+    응답: {"inserted": n, "rejected": [{"index": i, "error": "..."}]}
+    """
+    data = request.json
+    items = data.get("evaluations") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "evaluations 배열이 필요합니다."}), 400
+    if len(items) > EVAL_BATCH_MAX:
+        return jsonify({"error": f"한 번에 최대 {EVAL_BATCH_MAX}건까지 제출할 수 있습니다."}), 413
+
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    model_names = set()
+    evaluator_ids = set()
+    for item in items:
+        if isinstance(item, dict):
+            model_names.update((item.get("a_model_name", ""), item.get("b_model_name", "")))
+            evaluator_id = _evaluator_id(item)
+            if evaluator_id is not None:
+                evaluator_ids.add(evaluator_id)
+
+    try:
+        store = get_store()
+        resolved = model_ids.resolve(model_names)
+        known_evaluators = store.known_evaluators(evaluator_ids)
+
+        rows = []
+        rejected = []
+        for i, item in enumerate(items):
+            row, error = _eval_row(item, resolved, known_evaluators, timestamp)
+            if error:
+                rejected.append({"index": i, "error": error})
+            else:
+                rows.append(row)
+
+        if rows:
+            store.insert_evaluations(rows)
+        return jsonify({"inserted": len(rows), "rejected": rejected}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+# 모델 순위 (pair_stats 기반 Bradley-Terry, Elo 스케일)
+@app.route("/leaderboard", methods=["GET"])
+def get_leaderboard():
+    """
+    GET /leaderboard?ci=1&rounds=200
+    - 새 평가가 일정 수 이상 쌓였을 때만 다시 계산하고 그 외에는 캐시된 순위 반환
+    - ci=1: bootstrap 95% 신뢰구간(ci_low, ci_high) 포함
+    """
+    with_ci = request.args.get("ci", "0") in ("1", "true")
+    rounds = min(max(request.args.get("rounds", BOOTSTRAP_ROUNDS, type=int), 10), LEADERBOARD_MAX_ROUNDS)
+    try:
+        return jsonify(leaderboard.get(with_ci=with_ci, rounds=rounds)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+def _encode_eval_cursor(ts, evaluation_id):
+    raw = f"{ts.isoformat()}|{evaluation_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _decode_eval_cursor(cursor):
+    ts, evaluation_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").rsplit("|", 1)
+    return datetime.datetime.fromisoformat(ts), int(evaluation_id)
+
+def _eval_row_to_dict(r):
+    return {
+        "evaluation_id": r[0],
+        "a_model_name": r[1],
+        "b_model_name": r[2],
+        "prompt": r[3],
+        "a_model_answer": r[4],
+        "b_model_answer": r[5],
+        "evaluation": r[6],
+        "timestamp": r[7].strftime("%Y-%m-%d %H:%M:%S") if r[7] else None,
+        "session_id": r[8],
+        "evaluator_id": r[9]
+    }
+
 @app.route("/eval/list", methods=["GET"])
 def eval_list():
+    """
+    GET /eval/list?session_id=...&model_name=...&limit=100&cursor=...
+    - (timestamp, evaluation_id) 순 keyset 페이지네이션: 다음 페이지 cursor는 X-Next-Cursor 헤더로 반환
+    - stream=1: 서버 측 커서로 조건에 맞는 전체 행을 JSON lines(application/x-ndjson)로 스트리밍
+    - model_name은 models 테이블을 조인해 A/B 모델 어느 쪽이든 일치하면 포함
+    """
     session_id = request.args.get("session_id", None)
     model_name = request.args.get("model_name", None)
-    query = """
-        SELECT a_model_name, b_model_name, prompt,
-               a_model_answer, b_model_answer,
-               evaluation, timestamp, session_id, evaluator_id
-        FROM evaluations
-    """
-    conditions = []
-    params = []
-    if session_id:
-        conditions.append("session_id = %s")
-        params.append(session_id)
-    if model_name:
-        conditions.append("(a_model_name = %s OR b_model_name = %s)")
-        params.extend([model_name, model_name])
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
+    cursor = request.args.get("cursor", None)
+    stream = request.args.get("stream", "0") in ("1", "true")
+    limit = min(max(request.args.get("limit", EVAL_LIST_DEFAULT_LIMIT, type=int), 1), EVAL_LIST_MAX_LIMIT)
+
+    after = None
+    if cursor:
+        try:
+            after = _decode_eval_cursor(cursor)
+        except (ValueError, UnicodeDecodeError):
+            return jsonify({"error": f"잘못된 cursor: {cursor}"}), 400
+
+    if stream:
+        def generate():
+            # 저장소가 일정 크기 단위로만 읽어 오므로 메모리 사용량 일정
+            for r in get_store().iter_evaluations(session_id, model_name, after):
+                yield json.dumps(_eval_row_to_dict(r), ensure_ascii=False) + "\n"
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(query, tuple(params))
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        results = []
-        for r in rows:
-            results.append({
-                "a_model_name": r[0],
-                "b_model_name": r[1],
-                "prompt": r[2],
-                "a_model_answer": r[3],
-                "b_model_answer": r[4],
-                "evaluation": r[5],
-                "timestamp": r[6].strftime("%Y-%m-%d %H:%M:%S") if r[6] else None,
-                "session_id": r[7],
-                "evaluator_id": r[8]
-            })
-        return jsonify(results), 200
+        rows = get_store().list_evaluations(session_id, model_name, after, limit)
+        resp = jsonify([_eval_row_to_dict(r) for r in rows])
+        if len(rows) == limit and rows[-1][7] is not None:
+            resp.headers["X-Next-Cursor"] = _encode_eval_cursor(rows[-1][7], rows[-1][0])
+        return resp, 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 if __name__ == "__main__":
+    event_bus.start_listener()
     app.run(host="0.0.0.0", port=5020, debug=False, use_reloader=False)
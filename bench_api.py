@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+API 부하 벤치마크: 실제 트래픽 비율로 AI_API.app을 호출하고 경로별 처리량/지연/DB 조회 수를 JSON으로 기록
+
+    python bench_api.py --store memory --seconds 10 --concurrency 16 --json bench_api.json
+    python bench_api.py --store postgres --json new.json --compare old.json
+
+  - 트래픽: 평가 제출(/eval/submit), /models/current 폴링(If-None-Match 사용), /eval/list 페이지 넘기기(X-Next-Cursor)
+    비율은 --mix submit=5,current=4,list=1 처럼 지정
+  - --store memory: 프로세스 내 저장소 (DB 불필요), postgres: db_init.py로 초기화된 DB (만든 행은 끝나고 삭제)
+    sqlite[:경로]: SQLite WAL 파일
+  - db_queries_per_request: 요청 하나가 부른 저장소 연산 수 (연산 하나 = 트랜잭션/왕복 하나)
+  - --compare: 이전 결과 JSON과 경로별 req/sec, p99를 비교해 출력 (커밋 간 회귀 확인용)
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+import uuid
+
+from bench_db_pool import percentile
+
+ROUTES = ("submit", "current", "list")
+DEFAULT_MIX = "submit=5,current=4,list=1"
+
+class CountingStore:
+    """저장소 연산 호출 수를 현재 스레드가 처리 중인 경로별로 셈 (test_client는 호출한 스레드에서 요청을 처리)"""
+
+    def __init__(self, store):
+        self._store = store
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.calls = {}
+
+    def set_route(self, route):
+        self._local.route = route
+
+    def __getattr__(self, name):
+        attr = getattr(self._store, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        def counted(*args, **kwargs):
+            route = getattr(self._local, "route", None)
+            with self._lock:
+                self.calls[route] = self.calls.get(route, 0) + 1
+            return attr(*args, **kwargs)
+        return counted
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        route, _, weight = part.partition("=")
+        if route not in ROUTES:
+            raise ValueError(f"알 수 없는 경로: {route} (가능: {', '.join(ROUTES)})")
+        mix[route] = float(weight)
+    return mix
+
+def setup_fixtures(store_spec, tag, n_models, n_votes):
+    """저장소 생성 + 벤치마크용 모델/평가자/평가 행 준비 → (store, user_id, cleanup)"""
+    from model_store import create_store
+    store = create_store(store_spec)
+    meta = {"total_bytes": 0, "param_count": 0, "tensor_count": 0, "dtypes": {}, "shards": []}
+    team = lambda i: f"bench_{tag}_{i}"
+
+    if store.name == "postgres":
+        from db_pool import get_connection
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("INSERT INTO users (name, password) VALUES (%s, 'bench') RETURNING user_id", (f"bench_{tag}",))
+            user_id = cur.fetchone()[0]
+            cur.close()
+    else:
+        user_id = store.add_user(f"bench_{tag}")
+
+    ids = [store.register_model(team(i), f"bench_{tag}_model{i}", f"/bench/{i}.safetensors", "bench", meta)
+           for i in range(n_models)]
+    store.apply_states({team(0): ("serving", 0), team(1): ("standby", 1)})
+
+    rnd = random.Random(0)
+    start = datetime.datetime.now().replace(microsecond=0) - datetime.timedelta(days=1)
+    rows = []
+    for k in range(n_votes):
+        a, b = rnd.sample(ids, 2)
+        rows.append((a, b, "벤치마크 프롬프트", "A", "B", rnd.randint(1, 4),
+                     start + datetime.timedelta(seconds=k), f"bench_{tag}", user_id))
+    for i in range(0, len(rows), 5000):
+        store.insert_evaluations(rows[i:i + 5000])
+
+    def cleanup():
+        if store.name != "postgres":
+            return
+        from db_pool import get_connection
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM evaluations WHERE session_id = %s", (f"bench_{tag}",))
+            cur.execute("DELETE FROM pair_stats WHERE model_lo = ANY(%s) OR model_hi = ANY(%s)", (ids, ids))
+            cur.execute("DELETE FROM models WHERE team_name LIKE %s", (f"bench\\_{tag}\\_%",))
+            cur.execute("DELETE FROM users WHERE name = %s", (f"bench_{tag}",))
+            cur.close()
+    return store, user_id, cleanup
+
+def run(app, counting, tag, user_id, n_models, mix, seconds, concurrency):
+    routes = list(mix)
+    weights = [mix[r] for r in routes]
+    latencies = {r: [] for r in routes}
+    statuses = {r: {} for r in routes}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(k):
+        rnd = random.Random(k)
+        client = app.test_client()
+        etag = None
+        cursor = None
+        local = {r: [] for r in routes}
+        local_status = {r: {} for r in routes}
+        while time.perf_counter() < deadline:
+            route = rnd.choices(routes, weights)[0]
+            counting.set_route(route)
+            t0 = time.perf_counter()
+            if route == "submit":
+                a, b = rnd.sample(range(n_models), 2)
+                resp = client.post("/eval/submit", json={
+                    "evaluator_id": user_id, "a_model_name": f"bench_{tag}_model{a}", "b_model_name": f"bench_{tag}_model{b}",
+                    "prompt": "벤치마크 프롬프트", "a_model_answer": "A", "b_model_answer": "B",
+                    "evaluation": rnd.randint(1, 4), "session_id": f"bench_{tag}"})
+            elif route == "current":
+                headers = {"If-None-Match": etag} if etag else {}
+                resp = client.get(f"/models/current?user_id=bench_{tag}_0", headers=headers)
+                etag = resp.headers.get("ETag", etag)
+            else:
+                url = f"/eval/list?session_id=bench_{tag}&limit=50"
+                resp = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+                cursor = resp.headers.get("X-Next-Cursor")
+            local[route].append((time.perf_counter() - t0) * 1000)
+            local_status[route][resp.status_code] = local_status[route].get(resp.status_code, 0) + 1
+        counting.set_route(None)
+        with lock:
+            for r in routes:
+                latencies[r].extend(local[r])
+                for code, n in local_status[r].items():
+                    statuses[r][code] = statuses[r].get(code, 0) + n
+
+    counting.calls.clear()
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    result = {}
+    for r in routes:
+        ms = latencies[r]
+        result[r] = {
+            "requests": len(ms),
+            "req_per_sec": round(len(ms) / seconds, 1),
+            "p50_ms": round(percentile(ms, 50), 3),
+            "p95_ms": round(percentile(ms, 95), 3),
+            "p99_ms": round(percentile(ms, 99), 3),
+            "status": {str(code): n for code, n in sorted(statuses[r].items())},
+            "db_queries_per_request": round(counting.calls.get(r, 0) / len(ms), 3) if ms else None,
+        }
+    total = sum(v["requests"] for v in result.values())
+    result["total"] = {
+        "requests": total,
+        "req_per_sec": round(total / seconds, 1),
+        "db_queries_per_request": round(sum(counting.calls.get(r, 0) for r in routes) / total, 3) if total else None,
+    }
+    return result
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(result, baseline):
+    print(f"[compare] 기준: {baseline.get('revision')} ({baseline.get('store')}) → 현재: {result['revision']}")
+    for route, cur in result["routes"].items():
+        old = baseline.get("routes", {}).get(route)
+        if not old or not old.get("req_per_sec"):
+            continue
+        line = f"  {route:<8} req/sec {old['req_per_sec']:>9,.1f} → {cur['req_per_sec']:>9,.1f} ({cur['req_per_sec'] / old['req_per_sec'] - 1:+.1%})"
+        if "p99_ms" in cur and old.get("p99_ms"):
+            line += f"  p99 {old['p99_ms']}ms → {cur['p99_ms']}ms ({cur['p99_ms'] / old['p99_ms'] - 1:+.1%})"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store", default="memory", help="memory | postgres | sqlite[:경로]")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--models", type=int, default=50)
+    parser.add_argument("--votes", type=int, default=20000, help="미리 넣어 둘 평가 행 수 (/eval/list 페이지용)")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 파일")
+    parser.add_argument("--compare", default=None, help="비교할 이전 결과 JSON 파일")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    if args.store != "postgres":
+        # 프로세스 하나만 쓰므로 상태 이벤트도 프로세스 내에서만 전달
+        os.environ.setdefault("MALPYEONG_EVENTS_BACKEND", "local")
+    from model_store import set_store
+    tag = uuid.uuid4().hex[:8]
+    store, user_id, cleanup = setup_fixtures(args.store, tag, args.models, args.votes)
+    counting = CountingStore(store)
+    set_store(counting)
+    from AI_API import app
+    try:
+        routes = run(app, counting, tag, user_id, args.models, mix, args.seconds, args.concurrency)
+    finally:
+        cleanup()
+
+    result = {
+        "revision": git_revision(),
+        "store": args.store,
+        "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "config": {"seconds": args.seconds, "concurrency": args.concurrency, "models": args.models,
+                   "votes": args.votes, "mix": mix},
+        "routes": routes,
+    }
+    for route, r in routes.items():
+        if route == "total":
+            print(f"[{'total':<8}] requests={r['requests']} req/sec={r['req_per_sec']:,.1f} "
+                  f"db_queries/req={r['db_queries_per_request']}")
+        else:
+            print(f"[{route:<8}] requests={r['requests']} req/sec={r['req_per_sec']:,.1f} p50={r['p50_ms']}ms "
+                  f"p95={r['p95_ms']}ms p99={r['p99_ms']}ms status={r['status']} db_queries/req={r['db_queries_per_request']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+if __name__ == "__main__":
+    main()
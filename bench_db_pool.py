@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+/eval/submit 지연 시간 벤치마크 (커넥션 풀 사용 vs 매 요청마다 새 연결)
+
+사용 예:
+    python bench_db_pool.py --requests 500 --concurrency 8
+
+실행 중인 PostgreSQL(db_init.py로 초기화된 malpyeong DB)이 필요하다.
+벤치마크용 user/model 행을 만들고, 끝나면 자신이 만든 행만 삭제한다.
+"""
+
+import argparse
+import threading
+import time
+import uuid
+
+import db_pool
+from db_pool import get_connection
+from AI_API import app
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[idx]
+
+def setup_fixtures(tag):
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO users (name, password) VALUES (%s, 'bench') RETURNING user_id", (f"bench_{tag}",))
+        user_id = cur.fetchone()[0]
+        for side in ("a", "b"):
+            cur.execute("""
+                INSERT INTO models (team_name, model_name, model_state)
+                VALUES (%s, %s, 'idle')
+            """, (f"bench_{tag}", f"bench_{tag}_{side}"))
+        cur.close()
+    return user_id
+
+def cleanup_fixtures(tag):
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM evaluations WHERE session_id = %s", (f"bench_{tag}",))
+        cur.execute("""
+            DELETE FROM pair_stats
+            WHERE model_lo IN (SELECT model_id FROM models WHERE team_name = %s)
+               OR model_hi IN (SELECT model_id FROM models WHERE team_name = %s)
+        """, (f"bench_{tag}", f"bench_{tag}"))
+        cur.execute("DELETE FROM models WHERE team_name = %s", (f"bench_{tag}",))
+        cur.execute("DELETE FROM users WHERE name = %s", (f"bench_{tag}",))
+        cur.close()
+
+def run_submits(tag, user_id, n_requests, concurrency):
+    payload = {
+        "evaluator_id": user_id,
+        "a_model_name": f"bench_{tag}_a",
+        "b_model_name": f"bench_{tag}_b",
+        "prompt": "벤치마크 프롬프트",
+        "a_model_answer": "A",
+        "b_model_answer": "B",
+        "evaluation": 1,
+        "session_id": f"bench_{tag}",
+    }
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    per_worker = n_requests // concurrency
+
+    def worker():
+        client = app.test_client()
+        local = []
+        for _ in range(per_worker):
+            t0 = time.perf_counter()
+            resp = client.post("/eval/submit", json=payload)
+            local.append((time.perf_counter() - t0) * 1000.0)
+            if resp.status_code != 200:
+                with lock:
+                    errors.append(resp.get_json())
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    t_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t_start
+    return latencies, errors, wall
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    user_id = setup_fixtures(tag)
+    try:
+        for use_pool in (False, True):
+            db_pool.USE_POOL = use_pool
+            latencies, errors, wall = run_submits(tag, user_id, args.requests, args.concurrency)
+            label = "pool" if use_pool else "no-pool"
+            print(f"[{label:>7}] n={len(latencies)} errors={len(errors)} "
+                  f"p50={percentile(latencies, 50):.2f}ms p99={percentile(latencies, 99):.2f}ms "
+                  f"rps={len(latencies) / wall:.1f}")
+            if errors:
+                print(f"[{label:>7}] first error: {errors[0]}")
+    finally:
+        db_pool.USE_POOL = True
+        cleanup_fixtures(tag)
+        db_pool.close_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+/eval/submit_batch 처리량 벤치마크 (배치 크기별 rows/sec)
+
+    python bench_eval_batch.py --sizes 1 100 10000 --rows 20000
+
+실행 중인 PostgreSQL이 필요하며, bench_db_pool.py와 같은 방식으로 벤치마크용 행을 만들고 지운다.
+비교용으로 같은 행 수를 /eval/submit로 한 건씩 넣은 결과도 출력한다.
+"""
+
+import argparse
+import time
+import uuid
+
+from AI_API import app
+from bench_db_pool import setup_fixtures, cleanup_fixtures
+from db_pool import close_pool
+
+def make_item(tag, user_id, i):
+    return {
+        "evaluator_id": user_id,
+        "a_model_name": f"bench_{tag}_a",
+        "b_model_name": f"bench_{tag}_b",
+        "prompt": f"벤치마크 프롬프트 {i}",
+        "a_model_answer": "A",
+        "b_model_answer": "B",
+        "evaluation": 1 + i % 4,
+        "session_id": f"bench_{tag}",
+    }
+
+def run_batches(client, tag, user_id, batch_size, total_rows):
+    n_batches = max(1, total_rows // batch_size)
+    batch = [make_item(tag, user_id, i) for i in range(batch_size)]
+    inserted = 0
+    t0 = time.perf_counter()
+    for _ in range(n_batches):
+        resp = client.post("/eval/submit_batch", json={"evaluations": batch})
+        body = resp.get_json()
+        if resp.status_code != 200:
+            raise RuntimeError(f"submit_batch 실패: {body}")
+        inserted += body["inserted"]
+    return inserted, time.perf_counter() - t0
+
+def run_single(client, tag, user_id, total_rows):
+    t0 = time.perf_counter()
+    for i in range(total_rows):
+        resp = client.post("/eval/submit", json=make_item(tag, user_id, i))
+        if resp.status_code != 200:
+            raise RuntimeError(f"submit 실패: {resp.get_json()}")
+    return total_rows, time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--rows", type=int, default=20000, help="배치 크기별로 넣을 총 행 수 (size=1은 --single-rows)")
+    parser.add_argument("--single-rows", type=int, default=2000, help="배치 크기 1과 /eval/submit 비교에 쓸 행 수")
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    user_id = setup_fixtures(tag)
+    client = app.test_client()
+    try:
+        inserted, sec = run_single(client, tag, user_id, args.single_rows)
+        print(f"[/eval/submit      ] rows={inserted} time={sec:.2f}s rows/sec={inserted / sec:,.0f}")
+        for size in args.sizes:
+            total = args.single_rows if size == 1 else max(args.rows, size)
+            inserted, sec = run_batches(client, tag, user_id, size, total)
+            print(f"[submit_batch {size:>5}] rows={inserted} time={sec:.2f}s rows/sec={inserted / sec:,.0f}")
+    finally:
+        cleanup_fixtures(tag)
+        close_pool()
+
+if __name__ == "__main__":
+    main()
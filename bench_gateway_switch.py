@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+모델 스위치 중 실패 요청 수 벤치마크 (스텁 vLLM 백엔드 사용, DB 불필요)
+
+    python bench_gateway_switch.py --concurrency 16
+
+  - legacy: 기존 /models/switch 순서 (기존 모델 종료 → 새 모델 기동 → 라우팅)
+  - blue_green: 새 모델 기동/ready → 라우팅 원자적 전환 → 기존 백엔드 drain → 기존 모델 종료
+두 방식 모두 게이트웨이(/slots/s1/v1/chat/completions)로 부하를 건 상태에서 전환한다.
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from flask import Flask
+from werkzeug.serving import make_server
+
+from gateway import gateway_bp, router, switch_route, Backend
+from vllm_supervisor import VLLMSupervisor
+
+SLOT = "s1"
+
+def start_gateway(port):
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    app = Flask("bench_gateway")
+    app.register_blueprint(gateway_bp)
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class LoadGenerator:
+    def __init__(self, url, concurrency):
+        self.url = url
+        self.concurrency = concurrency
+        self.ok = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _worker(self):
+        body = json.dumps({"model": "any", "messages": [{"role": "user", "content": "hi"}]}).encode("utf-8")
+        while not self._stop.is_set():
+            req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(req, timeout=10) as resp:
+                    resp.read()
+                    success = resp.status == 200
+            except (urllib.error.URLError, OSError):
+                success = False
+            with self._lock:
+                if success:
+                    self.ok += 1
+                else:
+                    self.failed += 1
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.concurrency)]
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join()
+
+def run_scenario(mode, sup, gateway_port, ports, concurrency, settle_sec):
+    old_port, new_port = ports
+    old = sup.start(0, old_port, "team_old", "serving", "model-old")
+    sup.wait_until_ready(old)
+    router.set_route(SLOT, Backend(old_port, team_name="team_old", model_name="model-old"))
+
+    load = LoadGenerator(f"http://127.0.0.1:{gateway_port}/slots/{SLOT}/v1/chat/completions", concurrency)
+    load.start()
+    time.sleep(settle_sec)
+
+    t0 = time.time()
+    if mode == "blue_green":
+        new = sup.start(1, new_port, "team_new", "serving", "model-new")
+        sup.wait_until_ready(new)
+        switch_route(SLOT, Backend(new_port, team_name="team_new", model_name="model-new"))
+        sup.stop(old_port)
+    else:
+        sup.stop(old_port)
+        new = sup.start(1, new_port, "team_new", "serving", "model-new")
+        sup.wait_until_ready(new)
+        router.set_route(SLOT, Backend(new_port, team_name="team_new", model_name="model-new"))
+    switch_sec = time.time() - t0
+
+    time.sleep(settle_sec)
+    load.stop()
+    sup.stop_all()
+    router.remove_route(SLOT)
+    return {"mode": mode, "switch_sec": round(switch_sec, 3), "ok": load.ok, "failed": load.failed}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--gateway-port", type=int, default=18020)
+    parser.add_argument("--ports", type=int, nargs=2, default=[18021, 18022])
+    parser.add_argument("--settle", type=float, default=2.0, help="전환 전후 부하 유지 시간(초)")
+    args = parser.parse_args()
+
+    sup = VLLMSupervisor(server_module="stub_vllm_server")
+    server = start_gateway(args.gateway_port)
+    try:
+        for mode in ("legacy", "blue_green"):
+            r = run_scenario(mode, sup, args.gateway_port, args.ports, args.concurrency, args.settle)
+            print(f"[{r['mode']:>10}] switch={r['switch_sec']}s ok={r['ok']} failed={r['failed']}")
+    finally:
+        sup.stop_all()
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
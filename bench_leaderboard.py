@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+리더보드 계산 벤치마크 (DB 없이 leaderboard.py의 계산 부분만)
+
+    python bench_leaderboard.py --votes 1000000 --models 100 --rounds 100
+
+1) 실제 강도를 정해 둔 가상 모델들로 투표를 만들고
+2) 쌍별 누계로 집계 (record_votes/pair_stats와 같은 형태)
+3) Bradley-Terry 적합과 bootstrap 신뢰구간 시간을 재고, 실제 강도와의 순위 상관을 출력
+비교용으로 투표를 한 건씩 순회하는 온라인 Elo 시간도 출력한다.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from leaderboard import build_win_matrix, fit_bradley_terry, bootstrap_ratings, to_elo
+
+TIE_RATE = 0.15
+
+def make_votes(n_models, n_votes, seed):
+    rng = np.random.default_rng(seed)
+    strength = rng.normal(0, 1, n_models)
+    a = rng.integers(0, n_models, n_votes)
+    b = (a + rng.integers(1, n_models, n_votes)) % n_models
+    p_a = 1 / (1 + np.exp(strength[b] - strength[a]))
+    u = rng.random(n_votes)
+    # 1: A 우수, 2: B 우수, 3/4: 무승부
+    evaluation = np.where(u < TIE_RATE, 3 + (u < TIE_RATE / 2),
+                          np.where(rng.random(n_votes) < p_a, 1, 2))
+    return strength, a, b, evaluation
+
+def aggregate(n_models, a, b, evaluation):
+    """투표 → 쌍별 (lo, hi, wins_lo, wins_hi, ties) 배열"""
+    lo = np.minimum(a, b)
+    hi = np.maximum(a, b)
+    a_is_lo = a == lo
+    tie = evaluation >= 3
+    lo_win = ~tie & ((evaluation == 1) == a_is_lo)
+    hi_win = ~tie & ~lo_win
+    key = lo * n_models + hi
+    keys, inv = np.unique(key, return_inverse=True)
+    wins_lo = np.bincount(inv, weights=lo_win).astype(np.int64)
+    wins_hi = np.bincount(inv, weights=hi_win).astype(np.int64)
+    ties = np.bincount(inv, weights=tie).astype(np.int64)
+    return keys // n_models, keys % n_models, wins_lo, wins_hi, ties
+
+def online_elo(n_models, a, b, evaluation, k=4.0):
+    rating = [1000.0] * n_models
+    for i, j, e in zip(a.tolist(), b.tolist(), evaluation.tolist()):
+        expected = 1 / (1 + 10 ** ((rating[j] - rating[i]) / 400))
+        score = 1.0 if e == 1 else 0.0 if e == 2 else 0.5
+        rating[i] += k * (score - expected)
+        rating[j] -= k * (score - expected)
+    return np.array(rating)
+
+def rank_corr(x, y):
+    rx = np.argsort(np.argsort(x))
+    ry = np.argsort(np.argsort(y))
+    return float(np.corrcoef(rx, ry)[0, 1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--votes", type=int, default=1_000_000)
+    parser.add_argument("--models", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    strength, a, b, evaluation = make_votes(args.models, args.votes, args.seed)
+
+    t0 = time.perf_counter()
+    lo, hi, wins_lo, wins_hi, ties = aggregate(args.models, a, b, evaluation)
+    t_agg = time.perf_counter() - t0
+    print(f"[aggregate ] votes={args.votes:,} pairs={len(lo):,} time={t_agg:.3f}s")
+
+    t0 = time.perf_counter()
+    rating = to_elo(fit_bradley_terry(build_win_matrix(args.models, lo, hi, wins_lo, wins_hi, ties)))
+    t_fit = time.perf_counter() - t0
+    print(f"[bt fit    ] time={t_fit * 1000:.1f}ms rank_corr={rank_corr(rating, strength):.4f}")
+
+    t0 = time.perf_counter()
+    samples = to_elo(bootstrap_ratings(args.models, lo, hi, wins_lo, wins_hi, ties,
+                                       rounds=args.rounds, seed=args.seed))
+    t_boot = time.perf_counter() - t0
+    width = np.percentile(samples, 97.5, axis=0) - np.percentile(samples, 2.5, axis=0)
+    print(f"[bootstrap ] rounds={args.rounds} time={t_boot:.2f}s "
+          f"({t_boot / args.rounds * 1000:.1f}ms/round) mean_ci_width={width.mean():.1f}")
+
+    t0 = time.perf_counter()
+    elo = online_elo(args.models, a, b, evaluation)
+    t_elo = time.perf_counter() - t0
+    print(f"[online elo] time={t_elo:.2f}s rank_corr={rank_corr(elo, strength):.4f}")
+
+if __name__ == "__main__":
+    main()
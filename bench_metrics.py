@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+/metrics 계측 비용 벤치마크 (DB 불필요)
+
+    python bench_metrics.py --threads 16 --seconds 3 --rounds 7 --json bench_metrics.json
+
+  1) micro: Counter.inc / Histogram.observe / 요청 하나에서 하는 기록(instrument_app과 같은 연산)의 ns/op
+     스레드 수를 바꿔 가며 측정하고, 같은 일을 threading.Lock으로 하는 카운터와 비교
+  2) /eval/submit: bench_api와 같은 부하를 계측 on/off로 번갈아 --rounds번 돌려 req/sec, p50 중앙값 비교
+  3) 판정: 요청당 기록 비용(micro) / 계측 off일 때 요청 하나의 처리 시간(1 / req/sec, GIL로 직렬화되므로 CPU 시간)
+     ≤ --max-overhead-pct 이면 PASS (아니면 종료 코드 1)
+     (2의 on/off 차이는 라운드마다 수 % 흔들리므로 참고용)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+import uuid
+
+def _time_ops(fn, n, threads):
+    """threads개 스레드가 fn을 n번씩 호출 → 호출 1회당 ns (전체 wall / 전체 호출 수)"""
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        barrier.wait()
+        for _ in range(n):
+            fn()
+
+    ts = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in ts:
+        t.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for t in ts:
+        t.join()
+    return (time.perf_counter() - t0) / (n * threads) * 1e9
+
+class LockedCounter:
+    """비교용: 락으로 보호하는 카운터"""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+def micro(n, thread_counts):
+    from metrics import Counter, Histogram, Registry, LATENCY_BUCKETS
+
+    registry = Registry()
+    counter = Counter("bench_counter_total", "bench", registry=registry)
+    histogram = Histogram("bench_seconds", "bench", registry=registry)
+    request_seconds = Histogram("bench_request_seconds", "bench", ("method", "route", "status"),
+                                buckets=LATENCY_BUCKETS, registry=registry)
+    locked = LockedCounter()
+    environ = {}
+
+    def request_hook():
+        # instrument_app의 before_request + after_request와 같은 연산
+        environ["t0"] = time.perf_counter()
+        t0 = environ.pop("t0")
+        request_seconds.labels("POST", "/eval/submit", 200).observe(time.perf_counter() - t0)
+
+    ops = {
+        "counter_inc": counter.inc,
+        "histogram_observe": lambda: histogram.observe(0.003),
+        "request_hook": request_hook,
+        "locked_counter_inc": locked.inc,
+        "empty_call": lambda: None,
+    }
+    result = {}
+    for threads in thread_counts:
+        result[threads] = {name: round(_time_ops(fn, n, threads), 1) for name, fn in ops.items()}
+        print(f"[micro] threads={threads:<3} " + " ".join(f"{k}={v}ns" for k, v in result[threads].items()))
+    # 스레드가 모두 끝난 뒤에도 합계가 맞는지 (끝난 스레드 shard 합산 확인)
+    total_calls = n * sum(thread_counts)
+    assert counter._default.value() == total_calls, (counter._default.value(), total_calls)
+    assert histogram._default.snapshot()[1] == total_calls
+    return result
+
+def submit_ab(store_spec, seconds, concurrency, rounds, n_models):
+    import metrics
+    from bench_api import CountingStore, setup_fixtures, run
+    from model_store import set_store
+
+    tag = uuid.uuid4().hex[:8]
+    store, user_id, cleanup = setup_fixtures(store_spec, tag, n_models, 0)
+    counting = CountingStore(store)
+    set_store(counting)
+    from AI_API import app
+
+    samples = {"on": [], "off": []}
+    try:
+        for i in range(rounds):
+            # 순서 효과(워밍업, GC)를 줄이려고 라운드마다 on/off 순서를 바꿈
+            for mode in (("off", "on") if i % 2 == 0 else ("on", "off")):
+                metrics.set_enabled(mode == "on")
+                r = run(app, counting, tag, user_id, n_models, {"submit": 1.0}, seconds, concurrency)["submit"]
+                samples[mode].append(r)
+                print(f"[submit] round={i} metrics={mode:<3} req/sec={r['req_per_sec']:,.1f} p50={r['p50_ms']}ms p99={r['p99_ms']}ms")
+    finally:
+        metrics.set_enabled(True)
+        cleanup()
+
+    summary = {}
+    for mode, rs in samples.items():
+        summary[mode] = {
+            "req_per_sec": round(statistics.median(r["req_per_sec"] for r in rs), 1),
+            "p50_ms": round(statistics.median(r["p50_ms"] for r in rs), 3),
+            "p99_ms": round(statistics.median(r["p99_ms"] for r in rs), 3),
+        }
+    summary["throughput_change_pct"] = round((summary["on"]["req_per_sec"] / summary["off"]["req_per_sec"] - 1) * 100, 2)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=200000, help="micro: 스레드당 호출 수")
+    parser.add_argument("--thread-counts", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--store", default="memory", help="/eval/submit 비교에 쓸 저장소 (memory | sqlite[:경로] | postgres)")
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--threads", type=int, default=16, help="/eval/submit 동시 요청 스레드 수")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--models", type=int, default=50)
+    parser.add_argument("--max-overhead-pct", type=float, default=1.0)
+    parser.add_argument("--json", default=None)
+    args = parser.parse_args()
+
+    if args.store != "postgres":
+        os.environ.setdefault("MALPYEONG_EVENTS_BACKEND", "local")
+
+    micro_result = micro(args.ops, args.thread_counts)
+    submit = submit_ab(args.store, args.seconds, args.threads, args.rounds, args.models)
+    print(f"[submit] median off={submit['off']} on={submit['on']} throughput {submit['throughput_change_pct']:+.2f}%")
+
+    hook_ns = max(v["request_hook"] for v in micro_result.values())
+    request_ns = 1e9 / submit["off"]["req_per_sec"]
+    overhead_pct = hook_ns / request_ns * 100
+    verdict = "PASS" if overhead_pct <= args.max_overhead_pct else "FAIL"
+    print(f"[verdict] {verdict}: 요청당 계측 {hook_ns / 1000:.2f}us = /eval/submit 요청 처리 시간({request_ns / 1000:.0f}us)의 "
+          f"{overhead_pct:.3f}% (허용 {args.max_overhead_pct}%)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "micro_ns": micro_result, "submit": submit,
+                       "request_hook_ns": hook_ns, "overhead_pct": round(overhead_pct, 4), "verdict": verdict},
+                      f, ensure_ascii=False, indent=2)
+    if verdict == "FAIL":
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
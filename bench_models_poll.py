@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+/models/current 폴링 벤치마크 (매 요청 DB 조회 vs 스냅샷 vs 스냅샷 + If-None-Match)
+
+    python bench_models_poll.py --seconds 5 --concurrency 16
+
+실행 중인 PostgreSQL이 필요하다. 모드별로 처리량, 지연 시간, 그리고 그동안 DB에서 커밋된
+트랜잭션 수(pg_stat_database.xact_commit 증가분 – 측정용 조회 자체는 빼고)를 출력한다.
+'per_request' 모드는 매 요청 전에 스냅샷을 무효화해 기존 동작(요청마다 조회)을 흉내 낸다.
+"""
+
+import argparse
+import threading
+import time
+
+from AI_API import app
+from bench_db_pool import percentile
+from db_pool import get_connection, close_pool
+from model_snapshot import model_snapshot
+
+def db_commits():
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_stat_clear_snapshot()")
+        cur.execute("SELECT xact_commit FROM pg_stat_database WHERE datname = current_database()")
+        n = cur.fetchone()[0]
+        cur.close()
+    return n
+
+def run_mode(mode, seconds, concurrency):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        client = app.test_client()
+        etag = None
+        local = []
+        local_status = {}
+        while time.perf_counter() < deadline:
+            if mode == "per_request":
+                model_snapshot.invalidate()
+            headers = {"If-None-Match": etag} if mode == "etag" and etag else {}
+            t0 = time.perf_counter()
+            resp = client.get("/models/current", headers=headers)
+            local.append(time.perf_counter() - t0)
+            local_status[resp.status_code] = local_status.get(resp.status_code, 0) + 1
+            etag = resp.headers.get("ETag", etag)
+        with lock:
+            latencies.extend(local)
+            for code, n in local_status.items():
+                statuses[code] = statuses.get(code, 0) + n
+
+    model_snapshot.invalidate()
+    rebuilds_before = model_snapshot.rebuilds
+    commits_before = db_commits()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # db_commits() 자신의 트랜잭션 1건 제외
+    commits = db_commits() - commits_before - 1
+    ms = [x * 1000 for x in latencies]
+    print(f"[{mode:<11}] requests={len(ms)} req/sec={len(ms) / seconds:,.0f} "
+          f"p50={percentile(ms, 50):.2f}ms p99={percentile(ms, 99):.2f}ms "
+          f"status={statuses} snapshot_rebuilds={model_snapshot.rebuilds - rebuilds_before} db_commits={commits}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    try:
+        for mode in ("per_request", "snapshot", "etag"):
+            run_mode(mode, args.seconds, args.concurrency)
+    finally:
+        close_pool()
+
+if __name__ == "__main__":
+    main()
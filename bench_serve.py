@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+개발 서버(app.run, 한 프로세스) vs serve.py(제어 프로세스 + gunicorn 워커) 부하 비교
+
+    python bench_serve.py --seconds 10 --workers 4 --clients 4 --concurrency 16
+
+  - /eval/submit(POST)와 /models/current?user_id=...(GET)를 번갈아 보내고 경로별 req/sec, p50/p95/p99 출력
+  - 두 모드 모두 같은 SQLite(WAL) 저장소 파일을 사용 (PostgreSQL 불필요, gunicorn 필요)
+  - --control-load: 서버 쪽에서 제어 작업(전환 계획, safetensors 헤더 파싱 등)을 흉내 내는 CPU 루프 스레드 실행
+      dev   → API와 같은 프로세스 (main.py처럼 스케줄러와 같은 인터프리터)
+      serve → 제어 프로세스 (워커와 분리)
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_db_pool import percentile
+
+HOST = "127.0.0.1"
+ROUTES = ("/eval/submit", "/models/current")
+
+def _busy_loop():
+    # GIL을 잡는 순수 Python 연산 (제어 프로세스의 CPU 작업 흉내)
+    while True:
+        sum(i * i for i in range(10000))
+
+def _start_busy(n):
+    for _ in range(n):
+        threading.Thread(target=_busy_loop, daemon=True).start()
+
+def setup_store(path, n_models):
+    from model_store import SQLiteStore
+    store = SQLiteStore(path)
+    user_id = store.add_user("bench_serve")
+    meta = {"total_bytes": 0, "param_count": 0, "tensor_count": 0, "dtypes": {}, "shards": []}
+    for i in range(n_models):
+        store.register_model(f"bench_team{i}", f"bench_model{i}", f"/bench/{i}.safetensors", "bench", meta)
+    for i in range(min(2, n_models)):
+        store.set_state(f"bench_team{i}", "serving", gpu_id=i)
+    return user_id
+
+def _wait_ready(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(HOST, port, timeout=1)
+            conn.request("GET", "/ping")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"서버가 {timeout}s 안에 뜨지 않음 (port={port})")
+
+def _client_proc(port, seconds, concurrency, user_id, n_models, seed, out):
+    """부하 생성 프로세스 하나: 스레드 concurrency개가 keep-alive 커넥션으로 요청"""
+    latencies = {r: [] for r in ROUTES}
+    errors = {r: 0 for r in ROUTES}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(k):
+        rnd = random.Random(seed * 1000 + k)
+        conn = None
+        local = {r: [] for r in ROUTES}
+        local_err = {r: 0 for r in ROUTES}
+        i = 0
+        while time.perf_counter() < deadline:
+            route = ROUTES[i % 2]
+            i += 1
+            if route == "/eval/submit":
+                a, b = rnd.sample(range(n_models), 2)
+                body = json.dumps({"evaluator_id": user_id, "a_model_name": f"bench_model{a}",
+                                   "b_model_name": f"bench_model{b}", "prompt": "p", "a_model_answer": "a",
+                                   "b_model_answer": "b", "evaluation": rnd.randint(1, 4), "session_id": "bench_serve"})
+                args = ("POST", route, body, {"Content-Type": "application/json"})
+            else:
+                args = ("GET", f"{route}?user_id=bench_team{rnd.randrange(n_models)}", None, {})
+            t0 = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection(HOST, port, timeout=30)
+                conn.request(*args)
+                resp = conn.getresponse()
+                resp.read()
+                ok = resp.status == 200
+                if resp.will_close:
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException):
+                ok = False
+                if conn is not None:
+                    conn.close()
+                conn = None
+            if ok:
+                local[route].append((time.perf_counter() - t0) * 1000)
+            else:
+                local_err[route] += 1
+        with lock:
+            for r in ROUTES:
+                latencies[r].extend(local[r])
+                errors[r] += local_err[r]
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    out.put((latencies, errors))
+
+def run_load(port, seconds, clients, concurrency, user_id, n_models):
+    out = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_client_proc, args=(port, seconds, concurrency, user_id, n_models, c, out))
+             for c in range(clients)]
+    for p in procs:
+        p.start()
+    latencies = {r: [] for r in ROUTES}
+    errors = {r: 0 for r in ROUTES}
+    for _ in procs:
+        lat, err = out.get()
+        for r in ROUTES:
+            latencies[r].extend(lat[r])
+            errors[r] += err[r]
+    for p in procs:
+        p.join()
+    result = {}
+    for r in ROUTES:
+        ms = latencies[r]
+        result[r] = {
+            "requests": len(ms),
+            "req_per_sec": round(len(ms) / seconds, 1),
+            "p50_ms": round(percentile(ms, 50), 2) if ms else None,
+            "p95_ms": round(percentile(ms, 95), 2) if ms else None,
+            "p99_ms": round(percentile(ms, 99), 2) if ms else None,
+            "errors": errors[r],
+        }
+    return result
+
+def _spawn(args, env):
+    return subprocess.Popen([sys.executable] + args, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+
+def _stop(procs):
+    for p in procs:
+        p.terminate()
+    for p in procs:
+        try:
+            p.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            p.kill()
+
+def run_mode(mode, args, env, user_id):
+    port = args.port
+    if mode == "dev":
+        procs = [_spawn([__file__, "_dev", str(port), str(args.control_load)], env)]
+    else:
+        control_port = port + 9
+        procs = [
+            _spawn([__file__, "_control", str(control_port), str(args.control_load)], env),
+            _spawn(["serve.py", "workers", "--bind", f"{HOST}:{port}", "--workers", str(args.workers),
+                    "--threads", str(args.threads), "--control-bind", f"{HOST}:{control_port}"], env),
+        ]
+    try:
+        _wait_ready(port)
+        return run_load(port, args.seconds, args.clients, args.concurrency, user_id, args.models)
+    finally:
+        _stop(procs)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=4, help="부하 생성 프로세스 수")
+    parser.add_argument("--concurrency", type=int, default=16, help="부하 생성 프로세스당 동시 연결 수")
+    parser.add_argument("--models", type=int, default=50)
+    parser.add_argument("--control-load", type=int, default=0, help="서버 쪽 CPU 루프 스레드 수 (제어 작업 흉내)")
+    parser.add_argument("--modes", nargs="+", choices=("dev", "serve"), default=["dev", "serve"])
+    parser.add_argument("--port", type=int, default=5090)
+    parser.add_argument("--json", default=None, help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_serve_")
+    db_path = os.path.join(tmpdir, "bench.db")
+    user_id = setup_store(db_path, args.models)
+    env = dict(os.environ, MALPYEONG_STORE=f"sqlite:{db_path}", MALPYEONG_EVENTS_BACKEND="local")
+
+    report = {"config": vars(args), "modes": {}}
+    for mode in args.modes:
+        report["modes"][mode] = result = run_mode(mode, args, env, user_id)
+        for route, r in result.items():
+            print(f"[{mode:<5}] {route:<16} req/sec={r['req_per_sec']:>8,.1f} p50={r['p50_ms']}ms "
+                  f"p95={r['p95_ms']}ms p99={r['p99_ms']}ms errors={r['errors']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] in ("_dev", "_control"):
+    # 벤치마크가 띄우는 서버 프로세스
+    _, role, port, busy = sys.argv
+    _start_busy(int(busy))
+    if role == "_dev":
+        from AI_API import app
+        # main.py와 같은 개발 서버 (스레드 모드)
+        app.run(host=HOST, port=int(port), debug=False, use_reloader=False)
+    else:
+        import serve
+        serve.run_control("none", f"{HOST}:{port}")
+elif __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+스케줄 전환(daily_model_switch) 단계별 소요 시간 벤치마크 (스텁 vLLM, GPU/DB 불필요)
+
+    python bench_switch.py --load-delay 2 --memory-mb 256 --shutdown-delay 0.5 --json bench_switch.json
+
+  - 번들된 schedule(day).csv, schedule(time).csv의 각 행을 실제 스케줄러 코드
+    (scheduler_day / scheduler_time.daily_model_switch)로 순서대로 전환
+  - vLLM 대신 stub_vllm_server를 띄우고, 로딩 시간/메모리/종료 시간은 옵션으로 지정
+  - 전환별 kill(기존 프로세스 종료) / spawn(프로세스 생성) / ready(생성 → 응답) / other(경로 조회 등)와
+    행별 DB 상태 기록 시간, 전체 wall time을 출력
+  - 저장소는 기본 memory (--store sqlite:경로 / postgres도 가능)
+"""
+
+import argparse
+import csv
+import json
+import os
+
+DAY_CSV = "schedule(day).csv"
+TIME_CSV = "schedule(time).csv"
+
+def _configure(args):
+    # 모듈 import 전에 환경 설정 (vllm_supervisor / model_store / model_events가 import 시점에 읽음)
+    os.environ["MALPYEONG_VLLM_SERVER_MODULE"] = "stub_vllm_server"
+    os.environ["MALPYEONG_STUB_LOAD_DELAY"] = str(args.load_delay)
+    os.environ["MALPYEONG_STUB_MEMORY_MB"] = str(args.memory_mb)
+    os.environ["MALPYEONG_STUB_SHUTDOWN_DELAY"] = str(args.shutdown_delay)
+    os.environ["MALPYEONG_VLLM_LOG_DIR"] = args.log_dir
+    os.environ["MALPYEONG_STORE"] = args.store
+    if args.store != "postgres":
+        os.environ.setdefault("MALPYEONG_EVENTS_BACKEND", "local")
+
+def read_rows(path):
+    with open(path, encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def teams_in_rows(rows):
+    teams = []
+    for row in rows:
+        for key in ("s1_user", "s2_user", "st1_user", "st2_user"):
+            if row.get(key) and row[key] not in teams:
+                teams.append(row[key])
+    return teams
+
+def register_teams(teams):
+    from model_store import get_store
+    store = get_store()
+    meta = {"total_bytes": 0, "param_count": 0, "tensor_count": 0, "dtypes": {}, "shards": []}
+    for team in teams:
+        if store.get_model(team) is None:
+            store.register_model(team, f"{team}_model", f"/bench/{team}/model.safetensors", "bench", meta)
+
+def rss_mb(pids):
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return round(total / 1024, 1)
+
+def run_schedule(name, scheduler, rows, gpu_port_map):
+    from vllm_supervisor import supervisor
+    scheduler.GPU_PORT_MAP = gpu_port_map
+    out = []
+    for i, row in enumerate(rows):
+        label = row.get("date") or f"+{row.get('time_offset')}min"
+        scheduler.set_team_config_from_csv_row(row)
+        report = scheduler.daily_model_switch()
+        if report is None:
+            print(f"[{name}] row {i} ({label}) 전환 실패 (로그 확인)")
+            continue
+        transitions = [{k: r.get(k) for k in ("user_id", "role", "gpu", "port", "action", "ok", "error",
+                                               "kill_sec", "spawn_sec", "ready_sec", "other_sec", "total_sec")}
+                       for r in report["results"]]
+        entry = {
+            "schedule": name,
+            "row": label,
+            "wall_sec": report["wall_sec"],
+            "sum_launch_sec": report["sum_launch_sec"],
+            "state_sec": report["state_sec"],
+            "changed": report["changed"],
+            "trace_id": report["trace_id"],
+            "vllm_rss_mb": rss_mb(s.pid for s in supervisor.slots() if s.alive()),
+            "transitions": transitions,
+        }
+        out.append(entry)
+        print(f"[{name}] {label}: wall={entry['wall_sec']}s sum_launch={entry['sum_launch_sec']}s "
+              f"db_state={entry['state_sec'] * 1000:.1f}ms changed={len(entry['changed'])} rss={entry['vllm_rss_mb']}MiB")
+        for t in sorted(transitions, key=lambda t: t["gpu"]):
+            if t["ok"]:
+                print(f"    gpu={t['gpu']} {t['user_id']:<14} → {t['role']:<7} [{t['action']}] kill={t['kill_sec']}s "
+                      f"spawn={t['spawn_sec']}s ready={t['ready_sec']}s other={t['other_sec']}s total={t['total_sec']}s")
+            else:
+                print(f"    gpu={t['gpu']} {t['user_id']:<14} → {t['role']:<7} FAILED: {t['error']}")
+    return out
+
+def summarize(entries):
+    ok = [t for e in entries for t in e["transitions"] if t["ok"] and t["action"] == "restart"]
+    if not ok:
+        return {}
+    avg = lambda key: round(sum(t[key] for t in ok) / len(ok), 3)
+    return {
+        "restarts": len(ok),
+        "avg_kill_sec": avg("kill_sec"),
+        "avg_spawn_sec": avg("spawn_sec"),
+        "avg_ready_sec": avg("ready_sec"),
+        "avg_other_sec": avg("other_sec"),
+        "avg_db_state_ms": round(sum(e["state_sec"] for e in entries) / len(entries) * 1000, 2),
+        "avg_wall_sec": round(sum(e["wall_sec"] for e in entries) / len(entries), 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schedules", nargs="+", choices=("day", "time"), default=["day", "time"])
+    parser.add_argument("--load-delay", type=float, default=1.0, help="스텁 vLLM 로딩 시간(초)")
+    parser.add_argument("--memory-mb", type=float, default=64, help="스텁 vLLM이 채워 두는 메모리(MiB)")
+    parser.add_argument("--shutdown-delay", type=float, default=0.2, help="스텁 vLLM이 SIGTERM 후 종료까지 걸리는 시간(초)")
+    parser.add_argument("--base-port", type=int, default=6021, help="GPU 0의 포트 (GPU n은 base-port + n)")
+    parser.add_argument("--store", default="memory")
+    parser.add_argument("--log-dir", default="logs/bench_switch")
+    parser.add_argument("--json", default=None)
+    args = parser.parse_args()
+    _configure(args)
+
+    import scheduler_day
+    import scheduler_time
+    from vllm_supervisor import supervisor
+
+    gpu_port_map = {gpu: args.base_port + gpu for gpu in range(4)}
+    schedules = {"day": (scheduler_day, read_rows(DAY_CSV)), "time": (scheduler_time, read_rows(TIME_CSV))}
+    register_teams(teams_in_rows([row for name in args.schedules for row in schedules[name][1]]))
+
+    result = {"config": vars(args), "schedules": {}}
+    try:
+        for name in args.schedules:
+            scheduler, rows = schedules[name]
+            # 스케줄마다 빈 GPU에서 시작 (앞 스케줄의 프로세스가 keep으로 재사용되지 않도록)
+            supervisor.stop_all()
+            entries = run_schedule(name, scheduler, rows, gpu_port_map)
+            result["schedules"][name] = {"rows": entries, "summary": summarize(entries)}
+            print(f"[{name}] summary: {result['schedules'][name]['summary']}")
+    finally:
+        supervisor.stop_all()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,16 @@
 
 import psycopg2
 
-# DB 접속 정보 
-DB_CONN_INFO = "dbname=malpyeong user=postgres password=!TeddySum host=127.0.0.1 port=5432"
+# DB 접속 정보 (db_pool에서 한 곳으로 관리)
+from db_pool import DB_CONN_INFO
 
 def init_db():
     conn = psycopg2.connect(DB_CONN_INFO)
     cur = conn.cursor()
 
     # 기존 테이블 삭제 (종속관계 포함)
+    cur.execute("DROP TABLE IF EXISTS pair_stats CASCADE")
+    cur.execute("DROP TABLE IF EXISTS model_metadata CASCADE")
     cur.execute("DROP TABLE IF EXISTS evaluations CASCADE")
     cur.execute("DROP TABLE IF EXISTS models CASCADE")
     cur.execute("DROP TABLE IF EXISTS users CASCADE")
@@ -32,6 +34,7 @@ def init_db():
             team_name VARCHAR(100) NOT NULL,
             model_name VARCHAR(100) NOT NULL,
             safetensors_path TEXT,
+            revision VARCHAR(64),
             gpu_id INTEGER,
             model_state VARCHAR(20) DEFAULT 'idle',
             downloaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -39,6 +42,19 @@ def init_db():
         )
     """)
 
+    # 2-1. model_metadata 테이블: safetensors 헤더/인덱스 요약 (모델 삭제 시 함께 삭제)
+    cur.execute("""
+        CREATE TABLE model_metadata (
+            model_id INTEGER PRIMARY KEY REFERENCES models(model_id) ON DELETE CASCADE,
+            total_bytes BIGINT,
+            param_count BIGINT,
+            tensor_count INTEGER,
+            dtypes JSONB,
+            shards JSONB,
+            indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
     # 3. evaluations 테이블: 평가 기록 저장 (평가자는 users 테이블 참조)
     cur.execute("""
         CREATE TABLE evaluations (
@@ -56,6 +72,26 @@ def init_db():
         )
     """)
 
+    # 평가 제출 시 model_name → model_id 조회용 인덱스
+    cur.execute("CREATE INDEX models_model_name_idx ON models (model_name, model_id)")
+
+    # /eval/list keyset 페이지네이션용 인덱스
+    cur.execute("CREATE INDEX evaluations_timestamp_id_idx ON evaluations (timestamp, evaluation_id)")
+
+    # 4. pair_stats 테이블: 모델 쌍별 평가 누계 (model_lo < model_hi, 리더보드 계산용)
+    cur.execute("""
+        CREATE TABLE pair_stats (
+            model_lo INTEGER NOT NULL REFERENCES models(model_id),
+            model_hi INTEGER NOT NULL REFERENCES models(model_id),
+            wins_lo INTEGER NOT NULL DEFAULT 0,
+            wins_hi INTEGER NOT NULL DEFAULT 0,
+            ties INTEGER NOT NULL DEFAULT 0,
+            both_bad INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (model_lo, model_hi),
+            CONSTRAINT check_pair_order CHECK (model_lo < model_hi)
+        )
+    """)
+
     conn.commit()
     cur.close()
     conn.close()
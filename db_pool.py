@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions as pg_ext
+from psycopg2 import pool as pg_pool
+
+from metrics import REGISTRY, DB_ACQUIRE_SECONDS, DB_TRANSACTION_SECONDS
+
+# PostgreSQL 접속 정보 (모든 모듈이 이 값 하나를 공유)
+DB_CONN_INFO = os.environ.get(
+    "MALPYEONG_DB_CONN_INFO",
+    "dbname=malpyeong user=postgres password=!TeddySum host=127.0.0.1 port=5432"
+)
+
+# 커넥션 풀 설정 (환경 변수로 덮어쓸 수 있음)
+POOL_MIN_SIZE = int(os.environ.get("MALPYEONG_DB_POOL_MIN", "2"))
+POOL_MAX_SIZE = int(os.environ.get("MALPYEONG_DB_POOL_MAX", "20"))
+POOL_ACQUIRE_TIMEOUT = float(os.environ.get("MALPYEONG_DB_POOL_TIMEOUT", "10"))        # 풀에서 커넥션을 기다리는 최대 시간(초)
+CONNECT_TIMEOUT = int(os.environ.get("MALPYEONG_DB_CONNECT_TIMEOUT", "5"))             # TCP 연결 타임아웃(초)
+STATEMENT_TIMEOUT_MS = int(os.environ.get("MALPYEONG_DB_STATEMENT_TIMEOUT_MS", "30000"))
+HEALTH_CHECK_INTERVAL = float(os.environ.get("MALPYEONG_DB_HEALTH_CHECK_INTERVAL", "30"))  # 이 시간 이상 쉬던 커넥션은 SELECT 1로 확인
+USE_POOL = os.environ.get("MALPYEONG_DB_POOL", "1") != "0"
+
+class PoolTimeoutError(RuntimeError):
+    pass
+
+def _connect_kwargs():
+    return {
+        "connect_timeout": CONNECT_TIMEOUT,
+        "options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS}",
+    }
+
+class ConnectionPool:
+    """
+    psycopg2 ThreadedConnectionPool 래퍼
+      - 최대 개수만큼 커넥션을 빌려준 상태면 acquire_timeout 동안 대기 후 PoolTimeoutError
+      - 오래 쉬던 커넥션은 꺼낼 때 SELECT 1로 확인하고, 끊어졌으면 새로 연결
+      - 닫혔거나 오류 상태인 커넥션은 반환 시 폐기
+    """
+
+    def __init__(self, dsn, min_size, max_size, acquire_timeout, health_check_interval, **connect_kwargs):
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.max_size = max_size
+        self._pool = pg_pool.ThreadedConnectionPool(min_size, max_size, dsn, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._last_used = {}  # id(conn) → 마지막 반환 시각
+        self._lock = threading.Lock()
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        with self._lock:
+            last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise PoolTimeoutError(f"DB 커넥션 풀 대기 시간 초과 ({self.acquire_timeout}s)")
+        try:
+            # DB 재시작 뒤에는 쉬던 커넥션이 모두 끊어졌을 수 있으므로 건강한 커넥션이 나올 때까지 반복
+            # (풀이 비면 getconn()이 새로 연결하므로 최대 max_size + 1번)
+            for _ in range(self.max_size + 1):
+                conn = self._pool.getconn()
+                if self._is_healthy(conn):
+                    return conn
+                self._discard(conn)
+            raise psycopg2.OperationalError("DB 커넥션 풀에서 정상 커넥션을 얻지 못했습니다.")
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        try:
+            if conn.closed:
+                discard = True
+            elif not discard and conn.get_transaction_status() != pg_ext.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+            if discard:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        """빌려준 커넥션 수 / 풀에 쉬고 있는 커넥션 수 / 최대 개수 (ThreadedConnectionPool 내부 목록 기준)"""
+        return {"in_use": len(self._pool._used), "idle": len(self._pool._pool), "max": self.max_size}
+
+    def close(self):
+        self._pool.closeall()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    DB_CONN_INFO,
+                    POOL_MIN_SIZE,
+                    POOL_MAX_SIZE,
+                    POOL_ACQUIRE_TIMEOUT,
+                    HEALTH_CHECK_INTERVAL,
+                    **_connect_kwargs()
+                )
+                print(f"[get_pool] DB connection pool created (min={POOL_MIN_SIZE}, max={POOL_MAX_SIZE})")
+    return _pool
+
+@REGISTRY.add_collector
+def _pool_metrics():
+    if _pool is None:
+        return []
+    stats = _pool.stats()
+    return [
+        ("malpyeong_db_pool_connections", "gauge", "커넥션 풀 상태별 커넥션 수",
+         [({"state": "in_use"}, stats["in_use"]), ({"state": "idle"}, stats["idle"])]),
+        ("malpyeong_db_pool_max_connections", "gauge", "커넥션 풀 최대 크기", [({}, stats["max"])]),
+    ]
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+@contextmanager
+def get_connection():
+    """
+    with get_connection() as conn:
+        cur = conn.cursor()
+        ...
+    블록이 정상 종료되면 commit, 예외가 나면 rollback 후 커넥션을 풀에 반환
+    (USE_POOL=False면 매번 새로 연결하고 닫음 – 벤치마크 비교용)
+    """
+    if not USE_POOL:
+        conn = psycopg2.connect(DB_CONN_INFO, **_connect_kwargs())
+        t0 = time.perf_counter()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+            DB_TRANSACTION_SECONDS.labels("postgres").observe(time.perf_counter() - t0)
+        return
+
+    pool = get_pool()
+    t0 = time.perf_counter()
+    conn = pool.acquire()
+    t1 = time.perf_counter()
+    DB_ACQUIRE_SECONDS.observe(t1 - t0)
+    discard = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            discard = True
+        raise
+    finally:
+        pool.release(conn, discard=discard)
+        DB_TRANSACTION_SECONDS.labels("postgres").observe(time.perf_counter() - t1)
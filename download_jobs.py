@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from huggingface_hub import constants as hf_constants
+
+from model_service import download_repo_and_save_safetensors
+from model_fetch import FetchProgress, check_repo_id
+from metrics import REGISTRY
+
+# 다운로드 큐 설정
+DOWNLOAD_WORKERS = int(os.environ.get("MALPYEONG_DOWNLOAD_WORKERS", "4"))          # 동시에 실행되는 다운로드 수
+DOWNLOAD_MAX_PENDING = int(os.environ.get("MALPYEONG_DOWNLOAD_MAX_PENDING", "64"))  # 대기 + 실행 중 작업 상한
+DOWNLOAD_PER_HOST = int(os.environ.get("MALPYEONG_DOWNLOAD_PER_HOST", "2"))         # 호스트(엔드포인트)별 동시 다운로드 수
+DOWNLOAD_JOB_HISTORY = 256                                                         # 완료된 작업 기록 보관 개수
+# /models/download에서 endpoint로 지정할 수 있는 허브 미러 (쉼표 구분 URL, 기본 허브는 항상 허용)
+HUB_MIRRORS = [u.strip().rstrip("/") for u in os.environ.get("MALPYEONG_HUB_MIRRORS", "").split(",") if u.strip()]
+
+class QueueFullError(RuntimeError):
+    pass
+
+def check_endpoint(endpoint):
+    """
+    API로 받은 endpoint 검사 – 기본 허브 또는 HUB_MIRRORS에 있는 http(s) 주소만 허용
+    (file://경로, 로컬 디렉터리, 임의 호스트는 거부; LocalSource는 프로세스 안 호출/벤치마크 전용)
+    """
+    if endpoint is None:
+        return None
+    normalized = str(endpoint).strip().rstrip("/")
+    allowed = [hf_constants.ENDPOINT.rstrip("/")] + HUB_MIRRORS
+    if urlparse(normalized).scheme not in ("http", "https") or normalized not in allowed:
+        raise ValueError(f"허용되지 않은 endpoint: {endpoint} (MALPYEONG_HUB_MIRRORS에 등록된 미러만 사용 가능)")
+    return normalized
+
+class DownloadJob:
+    def __init__(self, repo_id, endpoint):
+        self.job_id = uuid.uuid4().hex
+        self.repo_id = repo_id
+        self.endpoint = endpoint
+        self.host = urlparse(endpoint).netloc or endpoint
+        self.state = "queued"   # queued → running → succeeded / failed
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.registered = None
+        self.progress = FetchProgress()
+
+    def to_dict(self):
+        progress = self.progress.to_dict()
+        transferred = progress["bytes_downloaded"]
+        if self.started_at is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "job_id": self.job_id,
+            "repo_id": self.repo_id,
+            "host": self.host,
+            "state": self.state,
+            "error": self.error,
+            "bytes_transferred": transferred,
+            "elapsed_sec": round(elapsed, 3),
+            "throughput_bytes_per_sec": round(transferred / elapsed, 1) if elapsed > 0 else 0.0,
+            "registered": self.registered,
+            **progress,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class DownloadQueue:
+    """
+    download_repo_and_save_safetensors를 백그라운드 워커 풀에서 실행
+      - submit()은 job을 즉시 반환하고, 진행 상황은 get()으로 조회
+      - 대기 + 실행 중 작업이 max_pending을 넘으면 QueueFullError
+      - 같은 호스트로의 동시 다운로드는 per_host_limit개로 제한
+        (호스트별 대기열에 두었다가 그 호스트 자리가 비면 워커 풀에 넘김
+         → 한 호스트 작업이 몰려도 워커 스레드를 붙잡고 기다리지 않아 다른 호스트 작업이 밀리지 않음)
+    """
+
+    def __init__(self, max_workers=DOWNLOAD_WORKERS, max_pending=DOWNLOAD_MAX_PENDING, per_host_limit=DOWNLOAD_PER_HOST):
+        self.max_pending = max_pending
+        self.per_host_limit = per_host_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download")
+        self._jobs = OrderedDict()
+        self._host_waiting = {}   # host → deque[DownloadJob] (자리를 기다리는 작업)
+        self._host_running = {}   # host → 워커 풀에 넘긴 작업 수
+        self._lock = threading.Lock()
+
+    def _active_count(self):
+        return sum(1 for j in self._jobs.values() if j.state in ("queued", "running"))
+
+    def _trim_history(self):
+        finished = [jid for jid, j in self._jobs.items() if j.state in ("succeeded", "failed")]
+        for jid in finished[:max(0, len(finished) - DOWNLOAD_JOB_HISTORY)]:
+            del self._jobs[jid]
+
+    def _dispatch(self, host):
+        # self._lock을 잡은 상태에서 호출: host 자리가 남는 만큼 대기 작업을 워커 풀에 넘김
+        waiting = self._host_waiting.get(host)
+        while waiting and self._host_running.get(host, 0) < self.per_host_limit:
+            self._host_running[host] = self._host_running.get(host, 0) + 1
+            self._executor.submit(self._run, waiting.popleft())
+        if not waiting:
+            self._host_waiting.pop(host, None)
+            if not self._host_running.get(host):
+                self._host_running.pop(host, None)
+
+    def submit(self, repo_id, endpoint=None):
+        check_repo_id(repo_id)
+        job = DownloadJob(repo_id, endpoint or hf_constants.ENDPOINT)
+        with self._lock:
+            if self._active_count() >= self.max_pending:
+                raise QueueFullError(f"다운로드 대기열이 가득 찼습니다 (max_pending={self.max_pending})")
+            self._jobs[job.job_id] = job
+            self._trim_history()
+            self._host_waiting.setdefault(job.host, deque()).append(job)
+            self._dispatch(job.host)
+        print(f"[DownloadQueue.submit] job={job.job_id} repo={repo_id} host={job.host}")
+        return job
+
+    def _run(self, job):
+        job.started_at = time.time()
+        job.state = "running"
+        try:
+            result = download_repo_and_save_safetensors(job.repo_id, endpoint=job.endpoint, progress=job.progress)
+            job.registered = result["registered"]
+            job.state = "succeeded"
+        except Exception as e:
+            job.error = str(e)
+            job.state = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._host_running[job.host] -= 1
+                self._dispatch(job.host)
+        print(f"[DownloadQueue._run] job={job.job_id} repo={job.repo_id} state={job.state}")
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def metric_families(self):
+        # 상태별 작업 수 + 실행 중인 작업의 현재까지 전송 바이트 (끝난 전송은 model_fetch에서 DOWNLOAD_BYTES로)
+        jobs = self.list()
+        counts = {state: 0 for state in ("queued", "running", "succeeded", "failed")}
+        for job in jobs:
+            counts[job.state] += 1
+        return [
+            ("malpyeong_download_jobs", "gauge", "다운로드 큐의 상태별 작업 수 (완료 작업은 최근 기록만)",
+             [({"state": state}, n) for state, n in counts.items()]),
+            ("malpyeong_download_inflight_bytes", "gauge", "실행 중인 다운로드가 지금까지 전송한 바이트",
+             [({"repo": job.repo_id}, job.progress.bytes_downloaded) for job in jobs if job.state == "running"]),
+        ]
+
+download_queue = DownloadQueue()
+REGISTRY.add_collector(download_queue.metric_families)
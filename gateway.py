@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from flask import Blueprint, Response, jsonify, request
+
+GATEWAY_TIMEOUT = float(os.environ.get("MALPYEONG_GATEWAY_TIMEOUT", "600"))     # 백엔드 응답 대기(초)
+DRAIN_TIMEOUT = float(os.environ.get("MALPYEONG_GATEWAY_DRAIN_TIMEOUT", "120"))  # 전환 후 기존 백엔드 요청 처리 대기(초)
+
+class Backend:
+    """논리 슬롯 뒤에 있는 vLLM 서버 하나 (진행 중인 요청 수를 셈)"""
+
+    def __init__(self, port, team_name=None, model_name=None, host="127.0.0.1"):
+        self.host = host
+        self.port = port
+        self.team_name = team_name
+        self.model_name = model_name  # vLLM의 served model name (= --model 경로)
+        self.inflight = 0
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def to_dict(self):
+        return {
+            "host": self.host,
+            "port": self.port,
+            "team_name": self.team_name,
+            "model_name": self.model_name,
+            "inflight": self.inflight,
+        }
+
+class Router:
+    """
+    논리 슬롯(예: "s1", "s2") → 현재 serving 백엔드 라우팅 테이블
+      - acquire()와 set_route()가 같은 락을 쓰므로, set_route가 끝난 뒤에는
+        기존 백엔드로 새 요청이 들어가지 않음 → drain()으로 남은 요청만 기다리면 됨
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+
+    def acquire(self, slot):
+        with self._lock:
+            backend = self._routes.get(slot)
+            if backend is not None:
+                backend.inflight += 1
+            return backend
+
+    def release(self, backend):
+        with self._lock:
+            backend.inflight -= 1
+            if backend.inflight == 0:
+                self._drained.notify_all()
+
+    def set_route(self, slot, backend):
+        """slot을 backend로 원자적으로 전환하고 이전 백엔드(없으면 None)를 반환"""
+        with self._lock:
+            old = self._routes.get(slot)
+            self._routes[slot] = backend
+        print(f"[Router.set_route] slot={slot} → {backend.url} ({backend.team_name})"
+              + (f", previous={old.url} ({old.team_name})" if old else ""))
+        return old
+
+    def remove_route(self, slot):
+        with self._lock:
+            return self._routes.pop(slot, None)
+
+    def drain(self, backend, timeout=DRAIN_TIMEOUT):
+        """backend의 진행 중 요청이 모두 끝날 때까지 대기. 시간 내에 끝나면 True"""
+        deadline = time.time() + timeout
+        with self._lock:
+            while backend.inflight > 0:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._drained.wait(remaining)
+        return True
+
+    def get(self, slot):
+        with self._lock:
+            return self._routes.get(slot)
+
+    def slot_of_team(self, team_name):
+        with self._lock:
+            for slot, backend in self._routes.items():
+                if backend.team_name == team_name:
+                    return slot
+        return None
+
+    def routes(self):
+        with self._lock:
+            return {slot: backend.to_dict() for slot, backend in self._routes.items()}
+
+router = Router()
+
+def switch_route(slot, new_backend, drain_timeout=DRAIN_TIMEOUT):
+    """
+    blue/green 전환의 라우팅 단계
+      1) slot을 new_backend로 원자적으로 전환
+      2) 이전 백엔드의 진행 중 요청이 끝날 때까지 대기
+    이전 백엔드(없으면 None)와 drain 완료 여부를 반환 – 프로세스 종료는 호출하는 쪽에서
+    """
+    old = router.set_route(slot, new_backend)
+    drained = True
+    if old is not None:
+        drained = router.drain(old, timeout=drain_timeout)
+        if not drained:
+            print(f"[switch_route] slot={slot} drain timeout, {old.inflight} request(s) still in flight on {old.url}")
+    return old, drained
+
+gateway_bp = Blueprint("gateway", __name__)
+
+def _rewrite_model(body, backend):
+    # 클라이언트는 논리 슬롯만 알면 되도록 "model" 필드를 백엔드의 served model name으로 교체
+    if not body or backend.model_name is None:
+        return body
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(payload, dict):
+        payload["model"] = backend.model_name
+        return json.dumps(payload).encode("utf-8")
+    return body
+
+@gateway_bp.route("/slots", methods=["GET"])
+def slots_list():
+    return jsonify(router.routes()), 200
+
+# OpenAI 호환 요청을 슬롯의 현재 serving 백엔드로 전달 (예: POST /slots/s1/v1/chat/completions)
+@gateway_bp.route("/slots/<slot>/v1/<path:subpath>", methods=["GET", "POST"])
+def slots_proxy(slot, subpath):
+    backend = router.acquire(slot)
+    if backend is None:
+        return jsonify({"error": f"No serving backend for slot {slot}"}), 503
+
+    url = f"{backend.url}/v1/{subpath}"
+    if request.query_string:
+        url += "?" + request.query_string.decode("utf-8")
+    body = _rewrite_model(request.get_data(), backend) if request.method == "POST" else None
+    upstream_req = urllib.request.Request(
+        url,
+        data=body,
+        method=request.method,
+        headers={"Content-Type": request.headers.get("Content-Type", "application/json")}
+    )
+    try:
+        upstream = urllib.request.urlopen(upstream_req, timeout=GATEWAY_TIMEOUT)
+        status = upstream.status
+    except urllib.error.HTTPError as e:
+        upstream = e
+        status = e.code
+    except (urllib.error.URLError, OSError) as e:
+        router.release(backend)
+        return jsonify({"error": f"Backend {backend.url} unavailable: {e}"}), 502
+
+    def generate():
+        # 스트리밍(SSE) 응답도 그대로 흘려보내고, 다 보낸 뒤에 inflight 반환
+        read = getattr(upstream, "read1", upstream.read)
+        try:
+            while True:
+                chunk = read(8192)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            upstream.close()
+            router.release(backend)
+
+    return Response(generate(), status=status, content_type=upstream.headers.get("Content-Type", "application/json"))
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import datetime
+import os
+import threading
+
+import numpy as np
+
+from model_store import get_store
+
+# 캐시된 순위를 다시 계산하기 전까지 쌓여야 하는 새 투표 수
+RECOMPUTE_MIN_VOTES = int(os.environ.get("MALPYEONG_LEADERBOARD_MIN_VOTES", "100"))
+BOOTSTRAP_ROUNDS = 200
+BT_MAX_ITER = 1000
+BT_TOL = 1e-8
+BT_PRIOR = 0.5            # 비교가 있는 쌍마다 양쪽에 더하는 가상 승수 (전승/전패 모델 발산 방지)
+ELO_SCALE = 400 / np.log(10)
+ELO_BASE = 1000
+
+def rebuild_pair_stats():
+    """evaluations 전체로부터 pair_stats를 다시 만듦 (기존 데이터 이관용)"""
+    get_store().rebuild_pair_stats()
+
+def build_win_matrix(n, lo, hi, wins_lo, wins_hi, ties):
+    """W[i, j] = i가 j를 이긴 횟수 (무승부는 양쪽에 0.5씩)"""
+    W = np.zeros((n, n))
+    np.add.at(W, (lo, hi), wins_lo + 0.5 * ties)
+    np.add.at(W, (hi, lo), wins_hi + 0.5 * ties)
+    return W
+
+def fit_bradley_terry(W, max_iter=BT_MAX_ITER, tol=BT_TOL, prior=BT_PRIOR):
+    """
+    Bradley-Terry MM 반복 (Hunter 2004), 행렬 연산으로 한 번에 전체 모델 갱신
+      p_i ← W_i / Σ_j N_ij / (p_i + p_j)
+    log-strength(평균 0) 반환
+    """
+    N = W + W.T
+    W = W + prior * (N > 0)
+    N = W + W.T
+    wins = W.sum(axis=1)
+    active = N.sum(axis=1) > 0
+    p = np.ones(len(W))
+    for _ in range(max_iter):
+        denom = (N / (p[:, None] + p[None, :])).sum(axis=1)
+        new_p = np.where(active, wins / np.where(denom > 0, denom, 1.0), 1.0)
+        new_p /= np.exp(np.log(new_p[active]).mean()) if active.any() else 1.0
+        if np.max(np.abs(new_p - p)) < tol:
+            p = new_p
+            break
+        p = new_p
+    theta = np.log(p)
+    theta[~active] = 0.0
+    return theta
+
+def bootstrap_ratings(n, lo, hi, wins_lo, wins_hi, ties, rounds=BOOTSTRAP_ROUNDS, seed=None):
+    """쌍별 (승/패/무) 개수를 multinomial로 재표집해 rounds번 다시 적합 → (rounds, n) log-strength"""
+    rng = np.random.default_rng(seed)
+    counts = np.stack([wins_lo, wins_hi, ties], axis=1).astype(np.int64)
+    games = counts.sum(axis=1)
+    pvals = counts / np.maximum(games, 1)[:, None]
+    samples = np.empty((rounds, n))
+    for r in range(rounds):
+        draw = rng.multinomial(games, pvals)
+        samples[r] = fit_bradley_terry(build_win_matrix(n, lo, hi, draw[:, 0], draw[:, 1], draw[:, 2]))
+    return samples
+
+def to_elo(theta):
+    return ELO_BASE + ELO_SCALE * theta
+
+class Leaderboard:
+    """
+    pair_stats 기반 순위 캐시
+      - get()은 캐시를 반환하고, 마지막 계산 이후 새 투표가 RECOMPUTE_MIN_VOTES 이상일 때만 다시 적합
+      - 신뢰구간(bootstrap)은 요청 시에만 계산하고 같은 투표 수 동안 캐시
+    """
+
+    def __init__(self, min_new_votes=RECOMPUTE_MIN_VOTES):
+        self.min_new_votes = min_new_votes
+        self._cached = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        store = get_store()
+        models = [(m["model_id"], m["team_name"], m["model_name"]) for m in store.list_models()]
+        return models, store.pair_stats()
+
+    def _total_votes(self):
+        return get_store().total_votes()
+
+    def _compute(self, total_votes):
+        models, pairs = self._load()
+        known = {model_id for model_id, _, _ in models}
+        pairs = [p for p in pairs if p[0] in known and p[1] in known]
+        index = {model_id: i for i, (model_id, _, _) in enumerate(models)}
+        n = len(models)
+        arr = np.array(pairs, dtype=np.int64).reshape(-1, 5)
+        lo = np.array([index[m] for m in arr[:, 0]], dtype=np.int64)
+        hi = np.array([index[m] for m in arr[:, 1]], dtype=np.int64)
+        wins_lo, wins_hi, ties = arr[:, 2], arr[:, 3], arr[:, 4]
+
+        W = build_win_matrix(n, lo, hi, wins_lo, wins_hi, ties)
+        theta = fit_bradley_terry(W)
+        wins = np.zeros(n)
+        losses = np.zeros(n)
+        tie_counts = np.zeros(n)
+        np.add.at(wins, lo, wins_lo)
+        np.add.at(wins, hi, wins_hi)
+        np.add.at(losses, lo, wins_hi)
+        np.add.at(losses, hi, wins_lo)
+        np.add.at(tie_counts, lo, ties)
+        np.add.at(tie_counts, hi, ties)
+        return {
+            "computed_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "total_votes": total_votes,
+            "models": models,
+            "arrays": (n, lo, hi, wins_lo, wins_hi, ties),
+            "rating": to_elo(theta),
+            "wins": wins,
+            "losses": losses,
+            "ties": tie_counts,
+            "ci": None,
+        }
+
+    def get(self, with_ci=False, rounds=BOOTSTRAP_ROUNDS, force=False):
+        with self._lock:
+            total = self._total_votes()
+            cached = self._cached
+            if force or cached is None or total - cached["total_votes"] >= self.min_new_votes:
+                cached = self._cached = self._compute(total)
+            if with_ci and (cached["ci"] is None or cached["ci"][0] != rounds):
+                samples = to_elo(bootstrap_ratings(*cached["arrays"], rounds=rounds))
+                cached["ci"] = (rounds, np.percentile(samples, 2.5, axis=0), np.percentile(samples, 97.5, axis=0))
+            return self._to_dict(cached, with_ci)
+
+    @staticmethod
+    def _to_dict(cached, with_ci):
+        rows = []
+        for i, (model_id, team_name, model_name) in enumerate(cached["models"]):
+            games = int(cached["wins"][i] + cached["losses"][i] + cached["ties"][i])
+            row = {
+                "model_id": model_id,
+                "team_name": team_name,
+                "model_name": model_name,
+                "rating": round(float(cached["rating"][i]), 1),
+                "wins": int(cached["wins"][i]),
+                "losses": int(cached["losses"][i]),
+                "ties": int(cached["ties"][i]),
+                "games": games,
+            }
+            if with_ci and cached["ci"] is not None:
+                row["ci_low"] = round(float(cached["ci"][1][i]), 1)
+                row["ci_high"] = round(float(cached["ci"][2][i]), 1)
+            rows.append(row)
+        rows.sort(key=lambda r: (r["games"] == 0, -r["rating"]))
+        for rank, row in enumerate(rows, 1):
+            row["rank"] = rank
+        return {
+            "computed_at": cached["computed_at"],
+            "total_votes": cached["total_votes"],
+            "bootstrap_rounds": cached["ci"][0] if with_ci and cached["ci"] is not None else None,
+            "models": rows,
+        }
+
+leaderboard = Leaderboard()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuild", action="store_true", help="evaluations로부터 pair_stats 재생성")
+    args = parser.parse_args()
+    if args.rebuild:
+        rebuild_pair_stats()
+        print("pair_stats 재생성 완료.")
+    for row in leaderboard.get(force=True)["models"]:
+        print(f"{row['rank']:>3}. {row['team_name']}/{row['model_name']}: {row['rating']} ({row['games']} games)")
@@ -6,28 +6,36 @@ from datetime import timedelta
 
 from AI_API import app
 from scheduler_time import start_scheduler, schedule_csv_row
+from model_events import event_bus
 
-def main():
-    # 1) GPU->포트 매핑
-    GPU_PORT_MAP = {0:5021, 1:5022, 2:5023, 3:5024}
+# GPU->포트 매핑
+GPU_PORT_MAP = {0:5021, 1:5022, 2:5023, 3:5024}
+
+CSV_CONFIG_PATH = "schedule(time).csv"
 
-    # 2) 스케줄러 시작
-    sched = start_scheduler(GPU_PORT_MAP)
+def start_jobs(gpu_port_map=GPU_PORT_MAP, csv_config_path=CSV_CONFIG_PATH):
+    """스케줄러 시작 + CSV 각 row를 'date' 트리거로 등록 (serve.py로 실행하면 제어 프로세스 하나에서만 호출됨)"""
+    sched = start_scheduler(gpu_port_map)
 
-    # 3) CSV 파싱
-    with open("schedule(time).csv", "r", encoding="utf-8") as f:
+    # CSV 파싱
+    with open(csv_config_path, "r", encoding="utf-8") as f:
         reader = csv.DictReader(f)  # time_offset,s1_user,s1_gpu,s2_user,s2_gpu,st1_user,st1_gpu,st2_user,st2_gpu
         rows = list(reader)
 
     now = datetime.datetime.now()
 
-    # 4) 각 row를 'date' 트리거로 등록
     for row in rows:
         offset = int(row["time_offset"])
         run_time = now + timedelta(minutes=offset)
         schedule_csv_row(row, run_time, sched)
+    return sched
+
+def main():
+    # 1) 스케줄러 시작, 2) CSV row 등록
+    start_jobs()
+    event_bus.start_listener()
 
-    # 5) Flask API (port=5020)
+    # 3) Flask API (port=5020) – 개발용 단일 프로세스, 운영은 python serve.py --schedule time
     print("[main] Flask API starting on port=5020...")
     app.run(host="0.0.0.0", port=5020, debug=False, use_reloader=False)
 
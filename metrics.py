@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Prometheus 텍스트 형식 지표 (/metrics)
+
+    from metrics import Counter, Histogram
+    CRASHES = Counter("malpyeong_vllm_crashes_total", "vLLM이 ready 전에/서비스 중에 죽은 횟수", ("gpu",))
+    CRASHES.labels(0).inc()
+
+  - Counter / Histogram 값은 스레드별 shard에 누적: 같은 shard는 그 스레드만 쓰므로 기록할 때 락이 없음
+    (/eval/submit처럼 요청마다 기록하는 경로에서도 비용은 list 원소 덧셈 수준)
+  - 락은 처음 보는 스레드의 shard 등록, 새 label 조합 생성, /metrics 수집 때만 잡음
+  - 끝난 스레드의 shard는 합산값으로 옮겨 두므로 요청마다 스레드를 만드는 개발 서버에서도 쌓이지 않음
+  - 현재 상태(커넥션 수, 슬롯 uptime 등)는 add_collector()로 수집 시점에 읽음
+  - 지표는 프로세스별: serve.py로 띄우면 /metrics는 요청을 받은 워커, /metrics/control은 제어 프로세스
+    (vLLM/스케줄러/다운로드 지표는 제어 프로세스에만 있음)
+"""
+
+import abc
+import bisect
+import os
+import threading
+import time
+import weakref
+
+# 0이면 요청별 지연 기록(instrument_app)을 건너뜀 (벤치마크 비교용, 그 외 지표는 그대로)
+ENABLED = os.environ.get("MALPYEONG_METRICS", "1") != "0"
+
+# 요청/DB 지연(초)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# vLLM 기동, 다운로드, 스케줄 전환처럼 오래 걸리는 작업(초)
+LONG_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class _Shard:
+    __slots__ = ("values", "_owner", "__weakref__")
+
+    def __init__(self, size, owner):
+        self.values = [0] * size
+        self._owner = owner
+
+    def __del__(self):
+        # 스레드가 끝나 thread-local이 정리될 때 호출
+        self._owner._retire(self)
+
+class _Cells:
+    """
+    스레드별 shard 값의 합
+      - add 쪽은 자기 shard만 쓰고, 합산(values)은 락 안에서 모든 shard를 읽음
+      - 끝난 스레드의 shard는 retired에 더한 뒤 0으로 만들어 두 번 세지 않음
+    """
+
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._shards = weakref.WeakSet()
+        self._retired = [0] * size
+        # shard의 __del__이 합산 중인 스레드에서 불릴 수 있으므로 재진입 가능한 락
+        self._lock = threading.RLock()
+
+    def shard(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            shard = _Shard(self._size, self)
+            with self._lock:
+                self._shards.add(shard)
+            self._local.shard = shard
+            self._local.values = shard.values
+            return shard.values
+
+    def _retire(self, shard):
+        with self._lock:
+            for i, v in enumerate(shard.values):
+                self._retired[i] += v
+                shard.values[i] = 0
+
+    def values(self):
+        with self._lock:
+            totals = list(self._retired)
+            for shard in list(self._shards):
+                for i, v in enumerate(shard.values):
+                    totals[i] += v
+        return totals
+
+class _CounterChild:
+    __slots__ = ("_cells",)
+
+    def __init__(self):
+        self._cells = _Cells(1)
+
+    def inc(self, amount=1):
+        self._cells.shard()[0] += amount
+
+    def value(self):
+        return self._cells.values()[0]
+
+class _HistogramChild:
+    __slots__ = ("_cells", "_bounds")
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        # [버킷별 개수..., +Inf 개수, 합]
+        self._cells = _Cells(len(bounds) + 2)
+
+    def observe(self, value):
+        v = self._cells.shard()
+        v[bisect.bisect_left(self._bounds, value)] += 1
+        v[-1] += value
+
+    def time(self):
+        return _Timer(self.observe)
+
+    def snapshot(self):
+        """(누적 버킷 개수 리스트, 개수, 합)"""
+        v = self._cells.values()
+        cumulative = []
+        total = 0
+        for n in v[:-1]:
+            total += n
+            cumulative.append(total)
+        return cumulative, total, v[-1]
+
+class _Timer:
+    __slots__ = ("_observe", "_t0")
+
+    def __init__(self, observe):
+        self._observe = observe
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._observe(time.perf_counter() - self._t0)
+        return False
+
+class _Metric(abc.ABC):
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+        (registry or REGISTRY).register(self)
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """label 값 조합 하나의 값 보관 객체"""
+
+    @abc.abstractmethod
+    def samples(self):
+        """수집 시점의 (이름, labels, 값) 목록"""
+
+    def labels(self, *values):
+        """label 값(순서는 labelnames와 같음)별 child – 값은 수집할 때 str()로 출력"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: label {self.labelnames}에 값 {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def children(self):
+        with self._lock:
+            return list(self._children.items())
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def samples(self):
+        for values, child in self.children():
+            yield self.name, dict(zip(self.labelnames, values)), child.value()
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def samples(self):
+        for values, child in self.children():
+            labels = dict(zip(self.labelnames, values))
+            cumulative, count, total = child.snapshot()
+            for bound, n in zip(self.buckets + (float("inf"),), cumulative):
+                yield self.name + "_bucket", dict(labels, le=bound), n
+            yield self.name + "_sum", labels, total
+            yield self.name + "_count", labels, count
+
+def _format_value(v):
+    if isinstance(v, float):
+        if v == float("inf"):
+            return "+Inf"
+        if v == float("-inf"):
+            return "-Inf"
+        return repr(v)
+    return str(v)
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_sample(name, labels, value):
+    if labels:
+        body = ",".join(f'{k}="{_escape(_format_value(v))}"' for k, v in labels.items())
+        return f"{name}{{{body}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+class Registry:
+    """지표 목록 + 수집 시점에 값을 만드는 collector → Prometheus 텍스트"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"이미 등록된 지표: {metric.name}")
+            self._metrics.append(metric)
+
+    def add_collector(self, fn):
+        """
+        fn() → [(name, kind("gauge"/"counter"), documentation, [(labels dict, value), ...]), ...]
+        /metrics를 읽을 때마다 호출 (실패해도 나머지 지표는 출력)
+        """
+        with self._lock:
+            self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.documentation}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(_format_sample(*s) for s in m.samples())
+        for fn in collectors:
+            try:
+                families = fn()
+            except Exception as e:
+                lines.append(f"# collector {getattr(fn, '__name__', fn)} failed: {_escape(e)}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(_format_sample(name, labels, value) for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+PROCESS_START_TIME = time.time()
+
+@REGISTRY.add_collector
+def _process_metrics():
+    return [("process_start_time_seconds", "gauge", "프로세스 시작 시각 (unix time)",
+             [({"pid": os.getpid()}, PROCESS_START_TIME)])]
+
+# ---- 공용 지표 (각 모듈이 import해서 기록) ----
+
+REQUEST_SECONDS = Histogram(
+    "malpyeong_http_request_seconds", "경로(route)별 요청 처리 시간(초, 응답 헤더까지)",
+    ("method", "route", "status"))
+DB_TRANSACTION_SECONDS = Histogram(
+    "malpyeong_db_transaction_seconds", "DB 트랜잭션(커넥션을 빌린 뒤 commit/rollback까지) 시간(초)",
+    ("backend",))
+DB_ACQUIRE_SECONDS = Histogram(
+    "malpyeong_db_pool_acquire_seconds", "커넥션 풀에서 커넥션을 받을 때까지 기다린 시간(초)")
+DOWNLOAD_BYTES = Counter(
+    "malpyeong_download_bytes_total", "저장소(repo)별 실제로 전송한 바이트", ("repo",))
+DOWNLOAD_SECONDS = Histogram(
+    "malpyeong_download_seconds", "저장소(repo)별 다운로드 작업 시간(초)", ("repo", "state"), buckets=LONG_BUCKETS)
+VLLM_READY_SECONDS = Histogram(
+    "malpyeong_vllm_launch_to_ready_seconds", "GPU 슬롯별 vLLM 프로세스 생성 → 요청 응답까지 시간(초)",
+    ("gpu", "port"), buckets=LONG_BUCKETS)
+VLLM_CRASHES = Counter(
+    "malpyeong_vllm_crashes_total", "GPU 슬롯별 vLLM이 종료 요청 없이 끝난 횟수 (ready 전 포함)", ("gpu", "port"))
+JOB_SECONDS = Histogram(
+    "malpyeong_scheduler_job_seconds", "스케줄러 JOB 실행 시간(초)", ("job", "outcome"), buckets=LONG_BUCKETS)
+JOB_LAG_SECONDS = Histogram(
+    "malpyeong_scheduler_job_lag_seconds", "스케줄러 JOB 예정 시각 → 실제 시작까지 지연(초)", ("job",),
+    buckets=LATENCY_BUCKETS + (30.0, 60.0, 300.0))
+
+class track_job:
+    """
+    with track_job("daily_switch_day", scheduled_at=run_time): ...
+      scheduled_at(datetime, 로컬 시각)이 있으면 시작 지연을 기록, 끝나면 outcome(ok/error)별 실행 시간 기록
+      예외를 안에서 처리하는 JOB은 블록 안에서 outcome = "error"로 지정
+    """
+
+    def __init__(self, job, scheduled_at=None):
+        self.job = job
+        self.scheduled_at = scheduled_at
+        self.outcome = None
+
+    def __enter__(self):
+        if self.scheduled_at is not None:
+            lag = time.time() - self.scheduled_at.timestamp()
+            JOB_LAG_SECONDS.labels(self.job).observe(max(0.0, lag))
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = self.outcome or ("ok" if exc_type is None else "error")
+        JOB_SECONDS.labels(self.job, outcome).observe(time.perf_counter() - self._t0)
+        return False
+
+def set_enabled(enabled):
+    global ENABLED
+    ENABLED = bool(enabled)
+
+_T0_KEY = "malpyeong.metrics_t0"
+
+def instrument_app(app):
+    """Flask app의 요청마다 (method, route 패턴, status)별 처리 시간을 REQUEST_SECONDS에 기록"""
+    from flask import request
+
+    def observe(status):
+        t0 = request.environ.pop(_T0_KEY, None)
+        if t0 is not None:
+            rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+            REQUEST_SECONDS.labels(request.method, rule, status).observe(time.perf_counter() - t0)
+
+    @app.before_request
+    def _metrics_start():
+        if ENABLED:
+            request.environ[_T0_KEY] = time.perf_counter()
+
+    @app.after_request
+    def _metrics_observe(response):
+        observe(response.status_code)
+        return response
+
+    @app.teardown_request
+    def _metrics_error(exc):
+        # 처리되지 않은 예외로 after_request를 건너뛴 요청
+        observe(500)
+
+    return app
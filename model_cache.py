@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from model_store import get_store
+
+# 캐시에 담을 최대 모델명 수 (LRU)
+MODEL_CACHE_SIZE = int(os.environ.get("MALPYEONG_MODEL_CACHE_SIZE", "4096"))
+# 카탈로그 전체가 캐시에 있을 때, 모르는 이름이 들어오면 이 시간(초)이 지난 경우에만 DB에서 다시 읽음
+MODEL_CACHE_MISS_REFRESH_SEC = float(os.environ.get("MALPYEONG_MODEL_CACHE_MISS_REFRESH_SEC", "5"))
+
+class ModelIdCache:
+    """
+    model_name → model_id 캐시 (API 프로세스 내부)
+      - 처음 조회 시 models 카탈로그를 한 번에 읽음 (maxsize 이하이면 '전체 카탈로그' 상태)
+      - 전체 카탈로그 상태에서 모르는 이름은 DB에 가지 않고 None (miss_refresh_sec마다 한 번은 다시 읽음)
+      - 카탈로그가 maxsize보다 크면 모르는 이름만 DB에서 조회해 LRU로 채움
+      - download_repo_and_save_safetensors / set_model_* 가 invalidate 호출
+    """
+
+    def __init__(self, maxsize=MODEL_CACHE_SIZE, miss_refresh_sec=MODEL_CACHE_MISS_REFRESH_SEC):
+        self.maxsize = maxsize
+        self.miss_refresh_sec = miss_refresh_sec
+        self._ids = OrderedDict()  # model_name → (model_id, team_name)
+        self._complete = False
+        self._loaded_at = None  # None = 아직 읽지 않음
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db_queries = 0
+        self.invalidations = 0
+
+    def _put(self, name, model_id, team_name):
+        self._ids[name] = (model_id, team_name)
+        self._ids.move_to_end(name)
+        while len(self._ids) > self.maxsize:
+            self._ids.popitem(last=False)
+            self._complete = False
+
+    def _load_catalog(self):
+        # 같은 model_name이 여러 팀에 있으면 가장 작은 model_id (기존 LIMIT 1 하위 쿼리와 같은 선택)
+        rows = get_store().model_ids(limit=self.maxsize + 1)
+        self.db_queries += 1
+        self._ids.clear()
+        for name, model_id, team_name in rows[:self.maxsize]:
+            self._ids[name] = (model_id, team_name)
+        self._complete = len(rows) <= self.maxsize
+        self._loaded_at = time.monotonic()
+
+    def _query(self, names):
+        rows = get_store().model_ids(names=names)
+        self.db_queries += 1
+        for name, model_id, team_name in rows:
+            self._put(name, model_id, team_name)
+
+    def resolve(self, names):
+        """{model_name: model_id} 반환 (모르는 이름은 빠짐)"""
+        names = set(names)
+        with self._lock:
+            if self._loaded_at is None:
+                self._load_catalog()
+            missing = [n for n in names if n not in self._ids]
+            self.hits += len(names) - len(missing)
+            self.misses += len(missing)
+            if missing:
+                stale = time.monotonic() - self._loaded_at >= self.miss_refresh_sec
+                if not self._complete:
+                    self._query(missing)
+                elif stale:
+                    self._load_catalog()
+            result = {}
+            for n in names:
+                entry = self._ids.get(n)
+                if entry is not None:
+                    self._ids.move_to_end(n)
+                    result[n] = entry[0]
+            return result
+
+    def get(self, name):
+        return self.resolve([name]).get(name)
+
+    def invalidate(self, team_name=None):
+        """
+        team_name이 없으면 전체 삭제 (다음 조회 때 카탈로그 다시 읽음)
+        있으면 그 팀의 항목만 지우고, 그 이름이 다시 조회되면 바로 DB에서 읽도록 stale 표시
+        """
+        with self._lock:
+            self.invalidations += 1
+            if team_name is None:
+                self._ids.clear()
+                self._complete = False
+                self._loaded_at = None
+                return
+            for name in [n for n, (_, team) in self._ids.items() if team == team_name]:
+                del self._ids[name]
+            if self._loaded_at is not None:
+                self._loaded_at = float("-inf")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._ids),
+                "maxsize": self.maxsize,
+                "complete": self._complete,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "db_queries": self.db_queries,
+                "invalidations": self.invalidations,
+            }
+
+model_ids = ModelIdCache()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import datetime
+import json
+import os
+import queue
+import select
+import threading
+from collections import deque
+
+import psycopg2
+
+from db_pool import DB_CONN_INFO, CONNECT_TIMEOUT, get_connection
+
+# pg: PostgreSQL NOTIFY/LISTEN으로 프로세스 간 전달 (스케줄러 → API), local: 같은 프로세스 안에서만 전달
+EVENTS_BACKEND = os.environ.get("MALPYEONG_EVENTS_BACKEND", "pg")
+EVENTS_CHANNEL = "model_events"
+EVENTS_HISTORY = 200              # 재접속 시 Last-Event-ID 이후를 다시 보내기 위해 보관하는 이벤트 수
+SUBSCRIBER_QUEUE_SIZE = 256       # 느린 구독자는 오래된 이벤트부터 버림
+LISTEN_POLL_SEC = 5.0
+LISTEN_RETRY_MAX_SEC = 30.0
+
+def make_event(team, state, gpu=None, port=None, reason=None):
+    # reason: 상태 전환이 아닌 변경 (예: "registered" – 모델이 새로 등록/갱신되어 이름, 경로가 바뀌었을 수 있음)
+    event = {
+        "team": team,
+        "state": state,
+        "gpu": gpu,
+        "port": port,
+        "ts": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+    }
+    if reason:
+        event["reason"] = reason
+    return event
+
+def notify(cur, event):
+    """호출한 쪽 트랜잭션 안에서 NOTIFY (커밋될 때 전달, 롤백되면 전달 안 됨)"""
+    if EVENTS_BACKEND == "pg":
+        cur.execute("SELECT pg_notify(%s, %s)", (EVENTS_CHANNEL, json.dumps(event, ensure_ascii=False)))
+    else:
+        event_bus.dispatch(event)
+
+def publish(team, state, gpu=None, port=None):
+    """트랜잭션 밖에서 이벤트 하나 발행"""
+    event = make_event(team, state, gpu, port)
+    if EVENTS_BACKEND == "pg":
+        with get_connection() as conn:
+            cur = conn.cursor()
+            notify(cur, event)
+            cur.close()
+    else:
+        event_bus.dispatch(event)
+    return event
+
+class Subscription:
+    def __init__(self, bus):
+        self._bus = bus
+        self._queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def _put(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """(seq, event) 또는 timeout이면 None"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+class EventBus:
+    """
+    프로세스 내 이벤트 팬아웃
+      - LISTEN 커넥션 하나(리스너 스레드)가 받은 이벤트를 모든 구독자 큐와 콜백에 전달
+      - 구독자가 몇 명이든 DB 부하는 리스너 커넥션 하나
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._callbacks = []
+        self._history = deque(maxlen=EVENTS_HISTORY)
+        self._seq = 0
+        self._listener = None
+        self._stop = threading.Event()
+
+    def dispatch(self, event):
+        with self._lock:
+            self._seq += 1
+            item = (self._seq, event)
+            self._history.append(item)
+            subscribers = list(self._subscribers)
+            callbacks = list(self._callbacks)
+        for sub in subscribers:
+            sub._put(item)
+        for fn in callbacks:
+            try:
+                fn(event)
+            except Exception as e:
+                print(f"[EventBus.dispatch] callback 오류: {e}")
+
+    def subscribe(self, last_seq=None):
+        """last_seq가 주어지면 그 이후 보관 중인 이벤트부터 먼저 넣어 줌"""
+        self.start_listener()
+        sub = Subscription(self)
+        with self._lock:
+            if last_seq is not None:
+                for item in self._history:
+                    if item[0] > last_seq:
+                        sub._put(item)
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def add_callback(self, fn):
+        # 리스너는 시작하지 않음 (필요하면 start_listener 호출)
+        with self._lock:
+            self._callbacks.append(fn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": EVENTS_BACKEND,
+                "subscribers": len(self._subscribers),
+                "seq": self._seq,
+                "listening": bool(self._listener and self._listener.is_alive()),
+            }
+
+    def start_listener(self):
+        if EVENTS_BACKEND != "pg":
+            return
+        with self._lock:
+            if self._listener and self._listener.is_alive():
+                return
+            self._stop.clear()
+            self._listener = threading.Thread(target=self._listen_loop, name="model-events-listener", daemon=True)
+            self._listener.start()
+
+    def stop_listener(self):
+        self._stop.set()
+
+    def _listen_loop(self):
+        # 풀과 별도의 전용 커넥션 (LISTEN은 autocommit 세션에서 계속 유지해야 함)
+        delay = 1.0
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(DB_CONN_INFO, connect_timeout=CONNECT_TIMEOUT)
+                conn.autocommit = True
+                cur = conn.cursor()
+                cur.execute(f"LISTEN {EVENTS_CHANNEL}")
+                print(f"[EventBus._listen_loop] LISTEN {EVENTS_CHANNEL}")
+                delay = 1.0
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], LISTEN_POLL_SEC) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        n = conn.notifies.pop(0)
+                        try:
+                            self.dispatch(json.loads(n.payload))
+                        except ValueError:
+                            print(f"[EventBus._listen_loop] 잘못된 payload: {n.payload!r}")
+            except Exception as e:
+                print(f"[EventBus._listen_loop] 리스너 오류, {delay:.0f}초 후 재연결: {e}")
+                self._stop.wait(delay)
+                delay = min(delay * 2, LISTEN_RETRY_MAX_SEC)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+event_bus = EventBus()
+
+if __name__ == "__main__":
+    # 이벤트 구독 확인용: python model_events.py
+    sub = event_bus.subscribe()
+    while True:
+        item = sub.get(timeout=30)
+        if item:
+            print(item[0], json.dumps(item[1], ensure_ascii=False))
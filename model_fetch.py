@@ -0,0 +1,438 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import DOWNLOAD_BYTES, DOWNLOAD_SECONDS
+
+# 다운로드 저장소 (content-addressed blob + 팀별 snapshot 디렉터리)
+MODEL_STORE_DIR = os.environ.get("MALPYEONG_MODEL_STORE", "model_store")
+FETCH_WORKERS = int(os.environ.get("MALPYEONG_FETCH_WORKERS", "4"))        # 한 리포 안에서 동시에 받는 파일 수
+FETCH_RETRIES = int(os.environ.get("MALPYEONG_FETCH_RETRIES", "3"))        # 파일별 재시도 (남은 부분부터 이어 받음)
+FETCH_TIMEOUT = float(os.environ.get("MALPYEONG_FETCH_TIMEOUT", "60"))
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# vLLM 기동에 필요한 파일만 (가중치 샤드, 설정, 토크나이저)
+ALLOW_PATTERNS = (
+    "*.safetensors",
+    "model.safetensors.index.json",
+    "config.json",
+    "generation_config.json",
+    "preprocessor_config.json",
+    "tokenizer.json",
+    "tokenizer_config.json",
+    "special_tokens_map.json",
+    "added_tokens.json",
+    "chat_template.json",
+    "chat_template.jinja",
+    "tokenizer.model",
+    "*.tiktoken",
+    "vocab.json",
+    "vocab.txt",
+    "merges.txt",
+)
+
+# 리포 id는 "<team>/<model>" 두 조각만 (경로에 그대로 붙으므로 "..", 절대 경로 등은 거부)
+REPO_ID_RE = re.compile(r"^[\w.-]+/[\w.-]+$")
+# 허브가 돌려주는 revision/sha256도 경로에 붙으므로 형식 확인
+REVISION_RE = re.compile(r"^[\w.-]+$")
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+class FetchError(RuntimeError):
+    pass
+
+def check_repo_id(repo_id):
+    """허브 루트/MODEL_STORE_DIR 밖을 가리킬 수 있는 repo_id면 ValueError"""
+    if not isinstance(repo_id, str) or not REPO_ID_RE.match(repo_id) \
+            or any(part in (".", "..") for part in repo_id.split("/")):
+        raise ValueError(f"hf_repo_id='{repo_id}'는 'user/model' 형식이어야 합니다.")
+    return repo_id
+
+def _safe_relpath(path):
+    # 리포 안 파일 경로 ("/" 구분) – 미러가 "../" 같은 이름을 줘도 snapshot 밖에 쓰지 않도록
+    parts = path.split("/")
+    return bool(path) and not path.startswith("/") and all(p not in ("", ".", "..") and "\\" not in p for p in parts)
+
+def wanted(path, allow_patterns=ALLOW_PATTERNS):
+    name = path.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(path, p) for p in allow_patterns)
+
+class RemoteFile:
+    def __init__(self, path, size, sha256=None):
+        self.path = path        # 리포 안 상대 경로 ("/" 구분)
+        self.size = size
+        self.sha256 = sha256    # 미리 알 수 있으면 (LFS) 전송 전에 중복 제거
+
+class HubSource:
+    """
+    Hugging Face Hub (또는 호환 미러)
+      proxies: {"http": ..., "https": ...} – 주면 메타데이터 조회와 파일 전송 모두 이 프록시로
+               (없으면 HTTP_PROXY / HTTPS_PROXY 환경 변수)
+    """
+
+    def __init__(self, endpoint=None, proxies=None):
+        from huggingface_hub import constants as hf_constants
+        self.endpoint = (endpoint or hf_constants.ENDPOINT).rstrip("/")
+        self.proxies = proxies
+        self._opener = urllib.request.build_opener(urllib.request.ProxyHandler(proxies)) if proxies else None
+
+    def _urlopen(self, req):
+        if self._opener is not None:
+            return self._opener.open(req, timeout=FETCH_TIMEOUT)
+        return urllib.request.urlopen(req, timeout=FETCH_TIMEOUT)
+
+    def resolve(self, repo_id):
+        if self.proxies:
+            return self._resolve_api(repo_id)
+        from huggingface_hub import HfApi
+        info = HfApi(endpoint=self.endpoint).model_info(repo_id, files_metadata=True)
+        files = []
+        for s in info.siblings or []:
+            lfs = s.lfs
+            sha256 = (lfs.get("sha256") if isinstance(lfs, dict) else getattr(lfs, "sha256", None)) if lfs else None
+            files.append(RemoteFile(s.rfilename, s.size, sha256))
+        return info.sha, files
+
+    def _resolve_api(self, repo_id):
+        # HfApi.model_info(files_metadata=True)와 같은 API를 프록시 opener로 직접 호출
+        from huggingface_hub.utils import build_hf_headers
+        req = urllib.request.Request(f"{self.endpoint}/api/models/{repo_id}?blobs=true", headers=build_hf_headers())
+        with self._urlopen(req) as resp:
+            info = json.load(resp)
+        files = [RemoteFile(s["rfilename"], s.get("size"), (s.get("lfs") or {}).get("sha256"))
+                 for s in info.get("siblings") or []]
+        return info["sha"], files
+
+    def open(self, repo_id, revision, path, offset):
+        """(stream, offset부터 이어서 주는지 여부)"""
+        from huggingface_hub import hf_hub_url
+        from huggingface_hub.utils import build_hf_headers
+        headers = build_hf_headers()
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        req = urllib.request.Request(hf_hub_url(repo_id, path, revision=revision, endpoint=self.endpoint), headers=headers)
+        try:
+            resp = self._urlopen(req)
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                # 이미 끝까지 받은 상태
+                return _EmptyStream(), True
+            raise
+        return resp, resp.status == 206
+
+class _EmptyStream:
+    def read(self, n=-1):
+        return b""
+
+    def close(self):
+        pass
+
+class LocalSource:
+    """
+    로컬 디렉터리를 허브처럼 사용 (테스트/오프라인 미러용)
+      <root>/<team>/<model>/... 구조, revision은 파일 목록과 내용 해시로 계산
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._hash_cache = {}
+        self._lock = threading.Lock()
+
+    def _repo_dir(self, repo_id):
+        path = os.path.join(self.root, *check_repo_id(repo_id).split("/"))
+        if not os.path.isdir(path):
+            raise FetchError(f"'{repo_id}' 리포가 {self.root}에 없습니다.")
+        return path
+
+    def _sha256(self, full_path):
+        st = os.stat(full_path)
+        key = (full_path, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if key in self._hash_cache:
+                return self._hash_cache[key]
+        h = hashlib.sha256()
+        with open(full_path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                h.update(chunk)
+        with self._lock:
+            self._hash_cache[key] = h.hexdigest()
+        return h.hexdigest()
+
+    def resolve(self, repo_id):
+        repo_dir = self._repo_dir(repo_id)
+        files = []
+        for root, dirs, names in os.walk(repo_dir):
+            for name in names:
+                full = os.path.join(root, name)
+                rel = os.path.relpath(full, repo_dir).replace(os.sep, "/")
+                files.append(RemoteFile(rel, os.path.getsize(full), self._sha256(full)))
+        files.sort(key=lambda f: f.path)
+        revision = hashlib.sha1("".join(f"{f.path}:{f.sha256}\n" for f in files).encode("utf-8")).hexdigest()
+        return revision, files
+
+    def open(self, repo_id, revision, path, offset):
+        f = open(os.path.join(self._repo_dir(repo_id), *path.split("/")), "rb")
+        f.seek(offset)
+        return f, True
+
+def make_source(endpoint=None, proxies=None):
+    # endpoint가 file://경로 또는 디렉터리면 LocalSource, 아니면 HF Hub (proxies는 HF Hub에만 적용)
+    if endpoint and endpoint.startswith("file://"):
+        return LocalSource(endpoint[len("file://"):])
+    if endpoint and os.path.isdir(endpoint):
+        return LocalSource(endpoint)
+    return HubSource(endpoint, proxies=proxies)
+
+class FetchProgress:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.revision = None
+        self.unchanged = False
+        self.files_total = 0
+        self.files_done = 0
+        self.bytes_total = 0
+        self.bytes_downloaded = 0   # 실제로 전송한 바이트
+        self.bytes_resumed = 0      # 이전에 받다 만 부분에서 이어 받아 전송하지 않은 바이트
+        self.bytes_deduped = 0      # 같은 내용의 blob이 있어 전송하지 않은 바이트
+
+    def add(self, **kw):
+        with self.lock:
+            for k, v in kw.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "revision": self.revision,
+                "unchanged": self.unchanged,
+                "files_total": self.files_total,
+                "files_done": self.files_done,
+                "bytes_total": self.bytes_total,
+                "bytes_downloaded": self.bytes_downloaded,
+                "bytes_resumed": self.bytes_resumed,
+                "bytes_deduped": self.bytes_deduped,
+            }
+
+class ModelStore:
+    """
+    <root>/blobs/sha256/<hash>                       내용 기준 저장 (팀이 달라도 같은 파일은 하나)
+    <root>/partial/<key>.part                        받다 만 파일 (다음 시도에서 이어 받음)
+    <root>/snapshots/<team>/<model>/<revision>/...   blob으로의 하드링크 (vLLM이 읽는 디렉터리)
+    <root>/refs/<team>/<model>.json                  마지막으로 받은 revision
+    """
+
+    def __init__(self, root=MODEL_STORE_DIR):
+        self.root = root
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def blob_path(self, sha256):
+        return os.path.join(self.root, "blobs", "sha256", sha256)
+
+    def snapshot_dir(self, repo_id, revision):
+        return os.path.join(self.root, "snapshots", *check_repo_id(repo_id).split("/"), revision)
+
+    def _ref_path(self, repo_id):
+        return os.path.join(self.root, "refs", *check_repo_id(repo_id).split("/")) + ".json"
+
+    def read_ref(self, repo_id):
+        try:
+            with open(self._ref_path(repo_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_ref(self, repo_id, revision, files):
+        path = self._ref_path(repo_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"revision": revision, "files": files, "fetched_at": time.time()}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def snapshot_complete(self, repo_id, revision, paths):
+        snap = self.snapshot_dir(repo_id, revision)
+        return all(os.path.exists(os.path.join(snap, *p.split("/"))) for p in paths)
+
+    def prune_snapshots(self, repo_id, keep_revision, in_use=()):
+        """
+        keep_revision 외 이전 revision의 snapshot 링크 정리 (blob은 다른 팀이 쓸 수 있으므로 유지)
+          in_use: 떠 있는 vLLM의 모델 경로 – 그 경로가 들어 있는 snapshot은 남김 (다음 정리 때 다시 확인)
+        지운 revision 목록 반환
+        """
+        parent = os.path.dirname(self.snapshot_dir(repo_id, keep_revision))
+        live = [os.path.abspath(p) for p in in_use if p]
+        try:
+            names = os.listdir(parent)
+        except FileNotFoundError:
+            return []
+        removed = []
+        for old in names:
+            if old == keep_revision:
+                continue
+            old_dir = os.path.abspath(os.path.join(parent, old))
+            if any(p == old_dir or p.startswith(old_dir + os.sep) for p in live):
+                print(f"[ModelStore.prune_snapshots] {repo_id}@{old[:12]} 사용 중인 vLLM이 있어 유지")
+                continue
+            shutil.rmtree(old_dir, ignore_errors=True)
+            removed.append(old)
+        return removed
+
+    def _link(self, blob, dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if os.path.lexists(dest):
+            os.remove(dest)
+        try:
+            os.link(blob, dest)
+        except OSError:
+            # 다른 파일시스템 등 하드링크가 안 되면 심볼릭 링크
+            os.symlink(os.path.abspath(blob), dest)
+
+    def fetch_file(self, source, repo_id, revision, rf, dest, progress):
+        """rf 하나를 blob으로 받고 dest에 링크. 같은 내용의 blob이 있으면 전송 생략"""
+        if rf.sha256 and os.path.exists(self.blob_path(rf.sha256)):
+            self._link(self.blob_path(rf.sha256), dest)
+            progress.add(files_done=1, bytes_deduped=rf.size or 0)
+            return
+        key = rf.sha256 or hashlib.sha1(f"{repo_id}@{revision}:{rf.path}".encode("utf-8")).hexdigest()
+        with self._key_lock(key):
+            # 같은 blob을 다른 팀 작업이 방금 받았을 수 있음
+            if rf.sha256 and os.path.exists(self.blob_path(rf.sha256)):
+                self._link(self.blob_path(rf.sha256), dest)
+                progress.add(files_done=1, bytes_deduped=rf.size or 0)
+                return
+            part = os.path.join(self.root, "partial", key + ".part")
+            os.makedirs(os.path.dirname(part), exist_ok=True)
+            last_error = None
+            for attempt in range(FETCH_RETRIES + 1):
+                try:
+                    sha256 = self._download(source, repo_id, revision, rf, part, progress)
+                    break
+                except Exception as e:
+                    last_error = e
+                    print(f"[ModelStore.fetch_file] {repo_id}/{rf.path} 시도 {attempt + 1} 실패: {e}")
+                    if attempt < FETCH_RETRIES:
+                        time.sleep(min(2 ** attempt, 10))
+            else:
+                raise FetchError(f"{repo_id}/{rf.path} 다운로드 실패: {last_error}")
+
+            if rf.sha256 and sha256 != rf.sha256:
+                os.remove(part)
+                raise FetchError(f"{repo_id}/{rf.path} sha256 불일치 (expected {rf.sha256}, got {sha256})")
+            blob = self.blob_path(sha256)
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            if os.path.exists(blob):
+                # 해시를 미리 몰랐던 파일이 기존 blob과 같은 내용
+                os.remove(part)
+                progress.add(bytes_deduped=rf.size or 0)
+            else:
+                os.replace(part, blob)
+            self._link(blob, dest)
+        progress.add(files_done=1)
+
+    def _download(self, source, repo_id, revision, rf, part, progress):
+        """part 파일 끝에서부터 이어 받고 전체 sha256 반환"""
+        h = hashlib.sha256()
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        if rf.size is not None and offset > rf.size:
+            os.remove(part)
+            offset = 0
+        stream, resumed = source.open(repo_id, revision, rf.path, offset)
+        try:
+            if offset and not resumed:
+                # 서버가 Range를 지원하지 않음 → 처음부터
+                offset = 0
+            mode = "ab" if offset else "wb"
+            if offset:
+                with open(part, "rb") as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                        h.update(chunk)
+                progress.add(bytes_resumed=offset)
+            with open(part, mode) as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    h.update(chunk)
+                    progress.add(bytes_downloaded=len(chunk))
+        finally:
+            stream.close()
+        size = os.path.getsize(part)
+        if rf.size is not None and size != rf.size:
+            raise FetchError(f"크기 불일치 ({size} / {rf.size} bytes), 이어서 다시 시도")
+        return h.hexdigest()
+
+def fetch_repo(repo_id, endpoint=None, allow_patterns=ALLOW_PATTERNS, store=None, progress=None, max_workers=FETCH_WORKERS,
+               proxies=None):
+    """
+    리포에서 vLLM에 필요한 파일만 받아 snapshot 디렉터리 구성
+      - 파일 단위 병렬 전송, 끊기면 .part에서 이어 받음
+      - sha256이 같은 파일은 팀이 달라도 한 번만 저장/전송
+      - 받은 revision을 기록하고, 같은 revision이 이미 완전히 있으면 바로 반환 (unchanged=True)
+      - proxies: HubSource 메타데이터 조회/파일 전송에 쓸 프록시 (requests 형식 {"http": ..., "https": ...})
+      - 이전 revision의 snapshot은 지우지 않음 (등록이 끝난 뒤 ModelStore.prune_snapshots로 정리)
+    반환: {"local_path", "revision", "unchanged", "files", ...progress}
+    """
+    check_repo_id(repo_id)
+    store = store or default_store
+    progress = progress or FetchProgress()
+    source = make_source(endpoint, proxies=proxies)
+    revision, files = source.resolve(repo_id)
+    if not isinstance(revision, str) or not REVISION_RE.match(revision) or revision in (".", ".."):
+        raise FetchError(f"'{repo_id}'의 revision 형식이 올바르지 않습니다: {revision}")
+    for f in files:
+        if not _safe_relpath(f.path) or (f.sha256 is not None and not SHA256_RE.match(f.sha256)):
+            raise FetchError(f"'{repo_id}'에 허용되지 않은 파일 경로/해시가 있습니다: {f.path}")
+    files = [f for f in files if wanted(f.path, allow_patterns)]
+    if not any(f.path.endswith(".safetensors") for f in files):
+        raise FileNotFoundError(f"리포 '{repo_id}' 내에 .safetensors 파일이 없습니다.")
+    paths = [f.path for f in files]
+    snap = store.snapshot_dir(repo_id, revision)
+    with progress.lock:
+        progress.revision = revision
+        progress.files_total = len(files)
+        progress.bytes_total = sum(f.size or 0 for f in files)
+
+    ref = store.read_ref(repo_id)
+    if ref and ref.get("revision") == revision and store.snapshot_complete(repo_id, revision, paths):
+        with progress.lock:
+            progress.unchanged = True
+            progress.files_done = len(files)
+        print(f"[fetch_repo] {repo_id}@{revision[:12]} 변경 없음 → {snap}")
+        return dict(progress.to_dict(), local_path=snap, files=paths)
+
+    t0 = time.time()
+    state = "failed"
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(files))), thread_name_prefix="fetch") as ex:
+            futures = [ex.submit(store.fetch_file, source, repo_id, revision, f, os.path.join(snap, *f.path.split("/")), progress)
+                       for f in files]
+            for fut in futures:
+                fut.result()
+        store.write_ref(repo_id, revision, paths)
+        state = "succeeded"
+    finally:
+        # 실패해도 그때까지 전송한 바이트는 집계 (다운로드 큐, prefetch, /models/download 모두 여기로 옴)
+        DOWNLOAD_BYTES.labels(repo_id).inc(progress.bytes_downloaded)
+        DOWNLOAD_SECONDS.labels(repo_id, state).observe(time.time() - t0)
+    p = progress.to_dict()
+    print(f"[fetch_repo] {repo_id}@{revision[:12]} files={len(files)} downloaded={p['bytes_downloaded']} "
+          f"resumed={p['bytes_resumed']} deduped={p['bytes_deduped']} ({time.time() - t0:.1f}s) → {snap}")
+    return dict(p, local_path=snap, files=paths)
+
+default_store = ModelStore()
@@ -2,106 +2,122 @@
 # -*- coding: utf-8 -*-
 
 import os
-import datetime
-import psycopg2
-from huggingface_hub import snapshot_download
 
-DB_CONN_INFO = "dbname=malpyeong user=postgres password=!TeddySum host=127.0.0.1 port=5432"
+from model_store import get_store
+from model_cache import model_ids
+from model_snapshot import model_snapshot
+from safetensors_index import index_model_dir
+from model_fetch import fetch_repo, check_repo_id, default_store as fetch_store
+from vllm_supervisor import supervisor
+import tracing
 
-def download_repo_and_save_safetensors(hf_repo_id: str):
+def _models_changed(team_name=None):
+    # models 행이 바뀐 뒤 프로세스 내 캐시(이름 → id, /models/list·current 스냅샷) 무효화
+    model_ids.invalidate(team_name)
+    model_snapshot.invalidate()
+
+def _prune_snapshots(hf_repo_id, revision):
+    # 등록이 끝난 뒤에만 이전 revision의 snapshot 정리 (떠 있는 vLLM이 읽고 있는 snapshot은 남김)
+    try:
+        in_use = [slot.model_path for slot in supervisor.slots()]
+        removed = fetch_store.prune_snapshots(hf_repo_id, revision, in_use)
+    except Exception as e:
+        print(f"[download_repo_and_save_safetensors] '{hf_repo_id}' 이전 snapshot 정리 실패: {e}")
+        return
+    if removed:
+        print(f"[download_repo_and_save_safetensors] '{hf_repo_id}' 이전 snapshot {len(removed)}개 정리")
+
+def download_repo_and_save_safetensors(hf_repo_id: str, endpoint: str = None, progress=None, proxies=None):
     """
     hf_repo_id 예: "KYMEKAdavide/mnist_safetensors"
     1) 입력값을 "/" 기준으로 분리하여 team_name와 model_name 추출
-    2) snapshot_download()로 Hugging Face 리포 다운로드
-    3) 다운로드한 리포에서 첫 번째 .safetensors 파일 경로 탐색
-    4) models 테이블에 (team_name, model_name, safetensors_path 등) 삽입
-       → 동일 team_name의 기존 레코드는 삭제하여 최신 모델만 유지
+    2) fetch_repo()로 vLLM에 필요한 파일(safetensors, 설정, 토크나이저)만 다운로드
+       (endpoint가 file://경로면 로컬 가짜 허브에서 받음, proxies를 주면 허브 요청을 그 프록시로)
+    3) 같은 revision이 이미 등록되어 있으면 여기서 바로 반환
+    4) safetensors 헤더/인덱스만 읽어 총 바이트, 파라미터 수, dtype, 샤드 목록 계산
+    5) 저장소(model_store)에 (team_name, model_name, safetensors_path, revision 등)과 4)의 결과 등록
+       → 동일 team_name의 기존 레코드를 갱신하여 최신 모델만 유지 (model_id는 그대로, 리더보드 기록 보존)
+    6) 등록에 성공하면 이전 revision의 snapshot 정리 (떠 있는 vLLM의 모델 경로가 든 snapshot은 유지)
+    fetch_repo 결과(revision, 전송/중복 제거 바이트 등)에 registered 여부를 더해 반환
     """
-    if "/" not in hf_repo_id:
-        raise ValueError(f"hf_repo_id='{hf_repo_id}'는 'user/model' 형식이어야 합니다.")
+    check_repo_id(hf_repo_id)
     team_name, model_name = hf_repo_id.split("/", 1)
 
-    local_repo_path = snapshot_download(repo_id=hf_repo_id)
-    print(f"[download_repo_and_save_safetensors] Downloaded '{hf_repo_id}' → {local_repo_path}")
+    result = fetch_repo(hf_repo_id, endpoint=endpoint, progress=progress, proxies=proxies)
+    local_repo_path = result["local_path"]
+    revision = result["revision"]
+    print(f"[download_repo_and_save_safetensors] Downloaded '{hf_repo_id}'@{revision[:12]} → {local_repo_path}")
+
+    if result["unchanged"]:
+        registered_path = get_store().find_registered(team_name, model_name, revision)
+        if registered_path and os.path.exists(registered_path):
+            print(f"[download_repo_and_save_safetensors] '{hf_repo_id}'@{revision[:12]} 이미 등록됨 → 건너뜀")
+            # 지난번에 사용 중이라 남겨 둔 snapshot이 있으면 다시 정리
+            _prune_snapshots(hf_repo_id, revision)
+            return dict(result, registered=False)
 
-    safetensors_files = []
-    for root, dirs, files in os.walk(local_repo_path):
-        for f in files:
-            if f.endswith(".safetensors"):
-                safetensors_files.append(os.path.join(root, f))
-    if not safetensors_files:
-        raise FileNotFoundError(f"리포 '{hf_repo_id}' 내에 .safetensors 파일이 없습니다.")
-    safetensors_path = safetensors_files[0]
+    safetensors_path = os.path.join(local_repo_path, sorted(p for p in result["files"] if p.endswith(".safetensors"))[0])
     file_name = os.path.basename(safetensors_path)
-    now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    metadata = index_model_dir(local_repo_path)
 
     try:
-        conn = psycopg2.connect(DB_CONN_INFO)
-        cur = conn.cursor()
-        # 기존 team_name의 모델 삭제 (항상 최신 모델만 유지)
-        cur.execute("DELETE FROM models WHERE team_name = %s", (team_name,))
-        cur.execute("""
-            INSERT INTO models (team_name, model_name, safetensors_path, model_state, downloaded_at, updated_at)
-            VALUES (%s, %s, %s, 'idle', %s, %s)
-        """, (team_name, model_name, safetensors_path, now_str, now_str))
-        conn.commit()
-        cur.close()
-        conn.close()
-        print(f"[download_repo_and_save_safetensors] DB updated → team_name={team_name}, model_name={model_name}, file={file_name}, state=idle")
+        # 기존 team_name의 모델 행을 갱신 (없으면 새로 등록, 항상 최신 모델만 유지)
+        get_store().register_model(team_name, model_name, safetensors_path, revision, metadata)
+        # model_name이 바뀌었을 수 있음 → 이름 캐시 전체 무효화
+        _models_changed()
+        print(f"[download_repo_and_save_safetensors] DB updated → team_name={team_name}, model_name={model_name}, file={file_name}, "
+              f"shards={len(metadata['shards'])}, params={metadata['param_count']}, bytes={metadata['total_bytes']}, state=idle")
     except Exception as e:
         raise RuntimeError(f"DB 저장 오류: {e}")
+    _prune_snapshots(hf_repo_id, revision)
+    return dict(result, registered=True)
+
+def get_model_metadata(team_name: str):
+    # safetensors 인덱스 정보 (없으면 None) – 기동 시간/GPU 메모리 추정용
+    return get_store().get_metadata(team_name)
 
-def set_model_standby(team_name: str, gpu_id: int):
-    now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def set_model_standby(team_name: str, gpu_id: int, port: int = None):
     try:
-        conn = psycopg2.connect(DB_CONN_INFO)
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE models
-            SET model_state = 'standby', gpu_id = %s, updated_at = %s
-            WHERE team_name = %s
-        """, (gpu_id, now_str, team_name))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with tracing.span("db.set_state", team=team_name, state="standby", gpu=gpu_id):
+            get_store().set_state(team_name, "standby", gpu_id=gpu_id, port=port)
+            _models_changed(team_name)
         print(f"[set_model_standby] team_name={team_name}, gpu={gpu_id}, state=standby")
     except Exception as e:
         raise RuntimeError(f"set_model_standby 오류: {e}")
 
-def set_model_serving(team_name: str, gpu_id: int):
-    now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def set_model_serving(team_name: str, gpu_id: int, port: int = None):
     try:
-        conn = psycopg2.connect(DB_CONN_INFO)
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE models
-            SET model_state = 'serving', gpu_id = %s, updated_at = %s
-            WHERE team_name = %s
-        """, (gpu_id, now_str, team_name))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with tracing.span("db.set_state", team=team_name, state="serving", gpu=gpu_id):
+            get_store().set_state(team_name, "serving", gpu_id=gpu_id, port=port)
+            _models_changed(team_name)
         print(f"[set_model_serving] team_name={team_name}, gpu={gpu_id}, state=serving")
     except Exception as e:
         raise RuntimeError(f"set_model_serving 오류: {e}")
 
 def set_model_idle(team_name: str):
-    now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     try:
-        conn = psycopg2.connect(DB_CONN_INFO)
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE models
-            SET model_state = 'idle', gpu_id = NULL, updated_at = %s
-            WHERE team_name = %s
-        """, (now_str, team_name))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with tracing.span("db.set_state", team=team_name, state="idle"):
+            get_store().set_state(team_name, "idle")
+            _models_changed(team_name)
         print(f"[set_model_idle] team_name={team_name}, state=idle")
     except Exception as e:
         raise RuntimeError(f"set_model_idle 오류: {e}")
 
+def apply_model_states(assignment):
+    """
+    assignment: {team_name: (state, gpu_id) 또는 (state, gpu_id, port)}
+    스케줄 전환 전체를 한 트랜잭션으로 적용 (중간 상태가 다른 쪽에 보이지 않음), 바뀐 팀 목록 반환
+    """
+    try:
+        with tracing.span("db.apply_states", teams=len(assignment)) as sp:
+            changed = get_store().apply_states(assignment)
+            _models_changed()
+            sp.set(changed=len(changed))
+        print(f"[apply_model_states] {len(assignment)} teams, changed={changed}")
+        return changed
+    except Exception as e:
+        raise RuntimeError(f"apply_model_states 오류: {e}")
+
 if __name__ == "__main__":
     # 테스트: 모델 카드 예시 (Hugging Face repo 형식)
     test_repo = "KYMEKAdavide/mnist_safetensors"
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from model_store import get_store
+
+# 다른 프로세스(스케줄러 등)에서 바뀐 상태를 반영하기 위한 최대 보존 시간(초), 0이면 무효화될 때만 다시 읽음
+MODEL_SNAPSHOT_MAX_AGE = float(os.environ.get("MALPYEONG_MODEL_SNAPSHOT_MAX_AGE", "30"))
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+def _etag(body):
+    return hashlib.sha1(body).hexdigest()
+
+def _fmt(ts):
+    return ts.strftime("%Y-%m-%d %H:%M:%S") if ts else None
+
+class ModelSnapshot:
+    """
+    /models/list, /models/current 응답을 미리 직렬화해 둔 메모리 스냅샷
+      - models 상태가 바뀔 때(set_model_* / 다운로드) invalidate → 다음 요청에서 한 번만 다시 읽음
+      - 응답 본문의 해시를 ETag로 사용 (내용이 같으면 다시 읽어도 ETag 유지)
+      - 다시 읽다가 DB 오류가 나면 직전 스냅샷을 계속 사용
+    """
+
+    def __init__(self, max_age=MODEL_SNAPSHOT_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._built_at = 0.0
+        self._list = None        # (body, etag)
+        self._current = None     # (body, etag)
+        self._by_team = {}       # team_name → (body, etag), serving 중인 팀만
+        self.rebuilds = 0
+        self.requests = 0
+
+    def invalidate(self):
+        self._dirty = True
+
+    def _expired(self):
+        return self._dirty or (self.max_age > 0 and time.monotonic() - self._built_at >= self.max_age)
+
+    def _rebuild(self):
+        models = []
+        current = []
+        by_team = {}
+        for m in get_store().list_models():
+            models.append({
+                "team_name": m["team_name"],
+                "model_name": m["model_name"],
+                "state": m["state"],
+                "gpu_id": m["gpu_id"],
+                "safetensors_path": m["safetensors_path"],
+                "downloaded_at": _fmt(m["downloaded_at"]),
+                "updated_at": _fmt(m["updated_at"]),
+                "metadata": m["metadata"]
+            })
+            if m["state"] == "serving":
+                entry = {"team_name": m["team_name"], "model_name": m["model_name"],
+                         "safetensors_path": m["safetensors_path"], "gpu_id": m["gpu_id"]}
+                current.append(entry)
+                if m["team_name"] not in by_team:
+                    body = _dumps(entry)
+                    by_team[m["team_name"]] = (body, _etag(body))
+        list_body = _dumps(models)
+        current_body = _dumps(current)
+        self._list = (list_body, _etag(list_body))
+        self._current = (current_body, _etag(current_body))
+        self._by_team = by_team
+        self._built_at = time.monotonic()
+        self.rebuilds += 1
+
+    def _ensure(self):
+        if not self._expired():
+            return
+        with self._lock:
+            if not self._expired():
+                return
+            # 다시 읽는 도중 들어온 invalidate를 놓치지 않도록 먼저 내림
+            self._dirty = False
+            try:
+                self._rebuild()
+            except Exception:
+                self._dirty = True
+                if self._list is None:
+                    raise
+                print("[ModelSnapshot] DB 조회 실패 → 직전 스냅샷 사용")
+
+    def models_list(self):
+        """(body, etag)"""
+        self._ensure()
+        self.requests += 1
+        return self._list
+
+    def models_current(self, team_name=None):
+        """(body, etag) – team_name이 있으면 그 팀의 serving 모델 (없으면 안내 메시지)"""
+        self._ensure()
+        self.requests += 1
+        if team_name is None:
+            return self._current
+        entry = self._by_team.get(team_name)
+        if entry is None:
+            body = _dumps({"msg": f"No serving model for {team_name}"})
+            entry = (body, _etag(body))
+        return entry
+
+    def stats(self):
+        return {
+            "rebuilds": self.rebuilds,
+            "requests": self.requests,
+            "age_sec": round(time.monotonic() - self._built_at, 3) if self._built_at else None,
+            "dirty": self._dirty,
+        }
+
+model_snapshot = ModelSnapshot()
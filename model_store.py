@@ -0,0 +1,962 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import abc
+import copy
+import datetime
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from psycopg2.extras import execute_values
+
+from db_pool import get_connection
+from model_events import EVENTS_CHANNEL, make_event, notify, event_bus
+from metrics import DB_TRANSACTION_SECONDS
+
+# 저장소 선택: postgres (기본) | sqlite[:경로] | memory
+MODEL_STORE_BACKEND = os.environ.get("MALPYEONG_STORE", "postgres")
+SQLITE_DEFAULT_PATH = "models.db"
+SQLITE_BUSY_TIMEOUT_SEC = 10
+EVAL_ITER_PAGE = 2000
+
+MODEL_STATES = ("idle", "standby", "serving")
+
+class StoreError(RuntimeError):
+    pass
+
+def pair_deltas(votes):
+    """
+    votes: [(a_model_id, b_model_id, evaluation), ...]
+    → {(model_lo, model_hi): [wins_lo, wins_hi, ties, both_bad]}
+    evaluation 값: 1 = A 우수, 2 = B 우수, 3 = 둘 다 좋음, 4 = 둘 다 별로
+    """
+    deltas = {}
+    for a_id, b_id, evaluation in votes:
+        try:
+            outcome = int(evaluation)
+        except (TypeError, ValueError):
+            continue
+        if a_id is None or b_id is None or a_id == b_id or outcome not in (1, 2, 3, 4):
+            continue
+        lo, hi = (a_id, b_id) if a_id < b_id else (b_id, a_id)
+        d = deltas.setdefault((lo, hi), [0, 0, 0, 0])
+        if outcome == 3:
+            d[2] += 1
+        elif outcome == 4:
+            d[3] += 1
+        elif (outcome == 1) == (a_id == lo):
+            d[0] += 1
+        else:
+            d[1] += 1
+    return deltas
+
+def _model_dict(r):
+    # (model_id, team_name, model_name, state, gpu_id, safetensors_path, revision, downloaded_at, updated_at, metadata)
+    return {
+        "model_id": r[0],
+        "team_name": r[1],
+        "model_name": r[2],
+        "state": r[3],
+        "gpu_id": r[4],
+        "safetensors_path": r[5],
+        "revision": r[6],
+        "downloaded_at": r[7],
+        "updated_at": r[8],
+        "metadata": r[9],
+    }
+
+class ModelStateStore(abc.ABC):
+    """
+    모델 카탈로그 / 상태 전환 / 평가 저장소 인터페이스
+      - 모든 스케줄러와 API 라우트는 이 인터페이스만 사용 (백엔드별 SQL은 각 구현 안에만)
+      - 평가 저장과 pair_stats(리더보드 누계) 갱신은 한 트랜잭션
+      - 상태 변경 이벤트는 커밋과 함께 발행
+    평가 행 형식: (a_model_id, b_model_id, prompt, a_model_answer, b_model_answer,
+                   evaluation, timestamp, session_id, evaluator_id)
+    조회 행 형식: (evaluation_id, a_model_name, b_model_name, prompt, a_model_answer, b_model_answer,
+                   evaluation, timestamp, session_id, evaluator_id)
+    """
+
+    name = "base"
+
+    # 카탈로그
+    @abc.abstractmethod
+    def list_models(self):
+        ...
+
+    @abc.abstractmethod
+    def get_model(self, team_name, state=None):
+        ...
+
+    def team_names(self):
+        return sorted({m["team_name"] for m in self.list_models()})
+
+    @abc.abstractmethod
+    def model_ids(self, names=None, limit=None):
+        """[(model_name, model_id, team_name)] – 같은 이름이면 가장 작은 model_id"""
+
+    def get_metadata(self, team_name):
+        m = self.get_model(team_name)
+        return m["metadata"] if m else None
+
+    def find_registered(self, team_name, model_name, revision):
+        """같은 revision으로 등록된 모델의 safetensors_path (없으면 None)"""
+        m = self.get_model(team_name)
+        if m and m["model_name"] == model_name and m["revision"] == revision:
+            return m["safetensors_path"]
+        return None
+
+    @abc.abstractmethod
+    def register_model(self, team_name, model_name, safetensors_path, revision, metadata):
+        """
+        팀의 모델 등록 (state=idle), model_id 반환
+          - 이미 등록된 팀이면 그 행을 UPDATE (경로/revision/상태) + model_metadata upsert
+            → model_id가 그대로라 evaluations/pair_stats(리더보드 누계)가 유지됨
+          - 처음 보는 팀이면 INSERT
+          - 같은 트랜잭션에서 reason="registered" 이벤트 발행 → 다른 프로세스(gunicorn 워커)도 이름 캐시 무효화
+        """
+
+    # 상태 전환
+    @abc.abstractmethod
+    def set_state(self, team_name, state, gpu_id=None, port=None):
+        ...
+
+    @abc.abstractmethod
+    def apply_states(self, assignment):
+        """
+        assignment: {team_name: (state, gpu_id) 또는 (state, gpu_id, port)}
+        전체를 한 트랜잭션에서 적용 (대상 행 잠금 → 바뀌는 행만 UPDATE → 이벤트 발행)
+          - 등록되지 않은 팀이 하나라도 있으면 아무것도 바꾸지 않고 StoreError
+          - 이미 같은 (state, gpu_id)인 팀은 건드리지 않음 (이벤트도 없음)
+        실제로 바뀐 팀 이름 목록 반환
+        """
+
+    # 평가
+    @abc.abstractmethod
+    def known_evaluators(self, user_ids):
+        ...
+
+    @abc.abstractmethod
+    def insert_evaluations(self, rows):
+        ...
+
+    @abc.abstractmethod
+    def list_evaluations(self, session_id=None, model_name=None, after=None, limit=None):
+        """after: (timestamp, evaluation_id) 다음부터 (timestamp, evaluation_id) 순"""
+
+    def iter_evaluations(self, session_id=None, model_name=None, after=None):
+        # 기본 구현: keyset 페이지를 이어 붙임
+        while True:
+            rows = self.list_evaluations(session_id, model_name, after, EVAL_ITER_PAGE)
+            yield from rows
+            if len(rows) < EVAL_ITER_PAGE:
+                return
+            after = (rows[-1][7], rows[-1][0])
+
+    # 리더보드
+    @abc.abstractmethod
+    def pair_stats(self):
+        """[(model_lo, model_hi, wins_lo, wins_hi, ties + both_bad)]"""
+
+    @abc.abstractmethod
+    def total_votes(self):
+        ...
+
+    @abc.abstractmethod
+    def rebuild_pair_stats(self):
+        ...
+
+    def _check_state(self, state):
+        if state not in MODEL_STATES:
+            raise StoreError(f"알 수 없는 상태: {state}")
+
+    def _normalize(self, assignment):
+        # → [(team_name, state, gpu_id, port)], idle이면 gpu_id = None
+        items = []
+        for team_name, target in assignment.items():
+            state, gpu_id = target[0], target[1]
+            port = target[2] if len(target) > 2 else None
+            self._check_state(state)
+            if state == "idle":
+                gpu_id = None
+            items.append((team_name, state, gpu_id, port))
+        return items
+
+    def _emit(self, team_name, state, gpu_id, port, reason=None):
+        # 같은 프로세스 안에서만 전달 (Postgres 백엔드는 NOTIFY로 프로세스 간 전달)
+        event_bus.dispatch(make_event(team_name, state, gpu_id, port, reason))
+
+class PostgresStore(ModelStateStore):
+    """db_pool 커넥션 풀 위의 PostgreSQL 구현 (운영 기본값)"""
+
+    name = "postgres"
+
+    _MODEL_SELECT = """
+        SELECT m.model_id, m.team_name, m.model_name, m.model_state, m.gpu_id, m.safetensors_path, m.revision,
+               m.downloaded_at, m.updated_at,
+               md.total_bytes, md.param_count, md.tensor_count, md.dtypes, md.shards
+        FROM models m
+        LEFT JOIN model_metadata md ON md.model_id = m.model_id
+    """
+
+    _EVAL_SELECT = """
+        SELECT e.evaluation_id, ma.model_name, mb.model_name, e.prompt,
+               e.a_model_answer, e.b_model_answer,
+               e.evaluation, e.timestamp, e.session_id, e.evaluator_id
+        FROM evaluations e
+        JOIN models ma ON ma.model_id = e.a_model_id
+        JOIN models mb ON mb.model_id = e.b_model_id
+    """
+
+    @staticmethod
+    def _row_to_model(r):
+        metadata = {
+            "total_bytes": r[9],
+            "param_count": r[10],
+            "tensor_count": r[11],
+            "dtypes": r[12],
+            "shards": r[13]
+        } if r[9] is not None else None
+        return _model_dict(r[:9] + (metadata,))
+
+    def list_models(self):
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(self._MODEL_SELECT + " ORDER BY m.model_id")
+            rows = cur.fetchall()
+            cur.close()
+        return [self._row_to_model(r) for r in rows]
+
+    def get_model(self, team_name, state=None):
+        query = self._MODEL_SELECT + " WHERE m.team_name = %s"
+        params = [team_name]
+        if state:
+            query += " AND m.model_state = %s"
+            params.append(state)
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(query + " ORDER BY m.model_id LIMIT 1", tuple(params))
+            row = cur.fetchone()
+            cur.close()
+        return self._row_to_model(row) if row else None
+
+    def team_names(self):
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT DISTINCT team_name FROM models ORDER BY team_name")
+            rows = cur.fetchall()
+            cur.close()
+        return [r[0] for r in rows]
+
+    def model_ids(self, names=None, limit=None):
+        query = "SELECT DISTINCT ON (model_name) model_name, model_id, team_name FROM models"
+        params = []
+        if names is not None:
+            query += " WHERE model_name = ANY(%s)"
+            params.append(list(names))
+        query += " ORDER BY model_name, model_id"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(query, tuple(params))
+            rows = cur.fetchall()
+            cur.close()
+        return rows
+
+    def find_registered(self, team_name, model_name, revision):
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT safetensors_path FROM models
+                WHERE team_name = %s AND model_name = %s AND revision = %s
+                LIMIT 1
+            """, (team_name, model_name, revision))
+            row = cur.fetchone()
+            cur.close()
+        return row[0] if row else None
+
+    def register_model(self, team_name, model_name, safetensors_path, revision, metadata):
+        now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with get_connection() as conn:
+            cur = conn.cursor()
+            # 팀의 기존 행이 있으면 그대로 갱신 (model_id 유지 → pair_stats FK, 리더보드 기록 보존)
+            cur.execute("SELECT model_id FROM models WHERE team_name = %s ORDER BY model_id LIMIT 1 FOR UPDATE",
+                        (team_name,))
+            row = cur.fetchone()
+            if row is not None:
+                model_id = row[0]
+                cur.execute("""
+                    UPDATE models
+                    SET model_name = %s, safetensors_path = %s, revision = %s, model_state = 'idle', gpu_id = NULL,
+                        downloaded_at = %s, updated_at = %s
+                    WHERE model_id = %s
+                """, (model_name, safetensors_path, revision, now_str, now_str, model_id))
+            else:
+                cur.execute("""
+                    INSERT INTO models (team_name, model_name, safetensors_path, revision, model_state, downloaded_at, updated_at)
+                    VALUES (%s, %s, %s, %s, 'idle', %s, %s)
+                    RETURNING model_id
+                """, (team_name, model_name, safetensors_path, revision, now_str, now_str))
+                model_id = cur.fetchone()[0]
+            cur.execute("""
+                INSERT INTO model_metadata (model_id, total_bytes, param_count, tensor_count, dtypes, shards, indexed_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (model_id) DO UPDATE SET
+                    total_bytes = EXCLUDED.total_bytes, param_count = EXCLUDED.param_count,
+                    tensor_count = EXCLUDED.tensor_count, dtypes = EXCLUDED.dtypes, shards = EXCLUDED.shards,
+                    indexed_at = EXCLUDED.indexed_at
+            """, (model_id, metadata["total_bytes"], metadata["param_count"], metadata["tensor_count"],
+                  json.dumps(metadata["dtypes"]), json.dumps(metadata["shards"]), now_str))
+            # 제어 프로세스에서 등록해도 워커들의 ModelIdCache/스냅샷이 무효화되도록 (커밋 시 전달)
+            notify(cur, make_event(team_name, "idle", reason="registered"))
+            cur.close()
+        return model_id
+
+    def set_state(self, team_name, state, gpu_id=None, port=None):
+        self._check_state(state)
+        if state == "idle":
+            gpu_id = None
+        now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE models
+                SET model_state = %s, gpu_id = %s, updated_at = %s
+                WHERE team_name = %s
+            """, (state, gpu_id, now_str, team_name))
+            # 같은 트랜잭션에서 상태 변경 이벤트 발행 (커밋 시 전달)
+            notify(cur, make_event(team_name, state, gpu_id, port))
+            cur.close()
+
+    def apply_states(self, assignment):
+        items = self._normalize(assignment)
+        if not items:
+            return []
+        now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        values = [(team_name, state, gpu_id, json.dumps(make_event(team_name, state, gpu_id, port), ensure_ascii=False))
+                  for team_name, state, gpu_id, port in items]
+        with get_connection() as conn:
+            cur = conn.cursor()
+            rows_sql = ", ".join(cur.mogrify("(%s, %s, %s::int, %s)", v).decode("utf-8") for v in values)
+            # 한 문장(왕복 1회): model_id 순으로 행 잠금 → 바뀌는 행만 UPDATE → 바뀐 팀만 NOTIFY (커밋 시 전달)
+            cur.execute(f"""
+                WITH v (team_name, state, gpu_id, payload) AS (VALUES {rows_sql.replace("%", "%%")}),
+                locked AS (
+                    SELECT m.model_id, m.team_name
+                    FROM models m JOIN v ON v.team_name = m.team_name
+                    ORDER BY m.model_id
+                    FOR UPDATE OF m
+                ),
+                upd AS (
+                    UPDATE models m
+                    SET model_state = v.state, gpu_id = v.gpu_id, updated_at = %s
+                    FROM locked l JOIN v ON v.team_name = l.team_name
+                    WHERE m.model_id = l.model_id
+                      AND (m.model_state, m.gpu_id) IS DISTINCT FROM (v.state, v.gpu_id)
+                    RETURNING m.team_name
+                ),
+                sent AS (
+                    SELECT pg_notify(%s, v.payload) FROM upd JOIN v ON v.team_name = upd.team_name
+                )
+                SELECT (SELECT array_agg(team_name) FROM locked),
+                       (SELECT array_agg(team_name ORDER BY team_name) FROM upd),
+                       (SELECT count(*) FROM sent)
+            """, (now_str, EVENTS_CHANNEL))
+            found, changed, _ = cur.fetchone()
+            cur.close()
+            missing = sorted(set(assignment) - set(found or ()))
+            if missing:
+                # 예외 → 롤백 (UPDATE와 NOTIFY 모두 취소)
+                raise StoreError(f"DB에 없는 팀: {', '.join(missing)}")
+        return changed or []
+
+    def known_evaluators(self, user_ids):
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT user_id FROM users WHERE user_id = ANY(%s)", (list(user_ids),))
+            rows = cur.fetchall()
+            cur.close()
+        return {r[0] for r in rows}
+
+    def insert_evaluations(self, rows):
+        if not rows:
+            return 0
+        with get_connection() as conn:
+            cur = conn.cursor()
+            # page_size=len(rows) → 전체를 INSERT 한 문장으로
+            execute_values(cur, """
+                INSERT INTO evaluations
+                (a_model_id, b_model_id, prompt, a_model_answer, b_model_answer,
+                 evaluation, timestamp, session_id, evaluator_id)
+                VALUES %s
+            """, rows, page_size=len(rows))
+            # 같은 트랜잭션에서 쌍별 누계 갱신
+            deltas = pair_deltas((r[0], r[1], r[5]) for r in rows)
+            if deltas:
+                execute_values(cur, """
+                    INSERT INTO pair_stats (model_lo, model_hi, wins_lo, wins_hi, ties, both_bad)
+                    VALUES %s
+                    ON CONFLICT (model_lo, model_hi) DO UPDATE SET
+                        wins_lo = pair_stats.wins_lo + EXCLUDED.wins_lo,
+                        wins_hi = pair_stats.wins_hi + EXCLUDED.wins_hi,
+                        ties = pair_stats.ties + EXCLUDED.ties,
+                        both_bad = pair_stats.both_bad + EXCLUDED.both_bad
+                """, [(lo, hi, *d) for (lo, hi), d in sorted(deltas.items())])
+            cur.close()
+        return len(rows)
+
+    def _eval_query(self, session_id, model_name, after):
+        query = self._EVAL_SELECT
+        conditions = []
+        params = []
+        if session_id:
+            conditions.append("e.session_id = %s")
+            params.append(session_id)
+        if model_name:
+            conditions.append("(ma.model_name = %s OR mb.model_name = %s)")
+            params.extend([model_name, model_name])
+        if after:
+            conditions.append("(e.timestamp, e.evaluation_id) > (%s, %s)")
+            params.extend(after)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return query + " ORDER BY e.timestamp, e.evaluation_id", params
+
+    def list_evaluations(self, session_id=None, model_name=None, after=None, limit=None):
+        query, params = self._eval_query(session_id, model_name, after)
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(query, tuple(params))
+            rows = cur.fetchall()
+            cur.close()
+        return rows
+
+    def iter_evaluations(self, session_id=None, model_name=None, after=None):
+        query, params = self._eval_query(session_id, model_name, after)
+        with get_connection() as conn:
+            # 이름 있는 커서 = 서버 측 커서: itersize 단위로만 가져와 메모리 사용량 일정
+            cur = conn.cursor(name=f"eval_list_{uuid.uuid4().hex}")
+            cur.itersize = EVAL_ITER_PAGE
+            cur.execute(query, tuple(params))
+            yield from cur
+            cur.close()
+
+    def pair_stats(self):
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT model_lo, model_hi, wins_lo, wins_hi, ties + both_bad FROM pair_stats")
+            rows = cur.fetchall()
+            cur.close()
+        return rows
+
+    def total_votes(self):
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT COALESCE(SUM(wins_lo + wins_hi + ties + both_bad), 0) FROM pair_stats")
+            total = cur.fetchone()[0]
+            cur.close()
+        return int(total)
+
+    def rebuild_pair_stats(self):
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("LOCK TABLE pair_stats IN EXCLUSIVE MODE")
+            cur.execute("DELETE FROM pair_stats")
+            cur.execute("""
+                INSERT INTO pair_stats (model_lo, model_hi, wins_lo, wins_hi, ties, both_bad)
+                SELECT LEAST(a_model_id, b_model_id), GREATEST(a_model_id, b_model_id),
+                       COUNT(*) FILTER (WHERE (evaluation = '1' AND a_model_id < b_model_id)
+                                           OR (evaluation = '2' AND b_model_id < a_model_id)),
+                       COUNT(*) FILTER (WHERE (evaluation = '1' AND a_model_id > b_model_id)
+                                           OR (evaluation = '2' AND b_model_id > a_model_id)),
+                       COUNT(*) FILTER (WHERE evaluation = '3'),
+                       COUNT(*) FILTER (WHERE evaluation = '4')
+                FROM evaluations
+                WHERE evaluation IN ('1', '2', '3', '4')
+                GROUP BY 1, 2
+            """)
+            cur.close()
+
+def _parse_ts(value):
+    return datetime.datetime.fromisoformat(value.decode("utf-8"))
+
+sqlite3.register_converter("TIMESTAMP", _parse_ts)
+sqlite3.register_adapter(datetime.datetime, lambda ts: ts.isoformat(" "))
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    password TEXT NOT NULL,
+    role TEXT DEFAULT 'user'
+);
+CREATE TABLE IF NOT EXISTS models (
+    model_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team_name TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    safetensors_path TEXT,
+    revision TEXT,
+    gpu_id INTEGER,
+    model_state TEXT DEFAULT 'idle',
+    downloaded_at TIMESTAMP,
+    updated_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS models_team_name_idx ON models (team_name);
+CREATE INDEX IF NOT EXISTS models_model_name_idx ON models (model_name, model_id);
+CREATE TABLE IF NOT EXISTS model_metadata (
+    model_id INTEGER PRIMARY KEY REFERENCES models(model_id) ON DELETE CASCADE,
+    total_bytes INTEGER,
+    param_count INTEGER,
+    tensor_count INTEGER,
+    dtypes TEXT,
+    shards TEXT,
+    indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS evaluations (
+    evaluation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    a_model_id INTEGER NOT NULL REFERENCES models(model_id),
+    b_model_id INTEGER NOT NULL REFERENCES models(model_id),
+    prompt TEXT,
+    a_model_answer TEXT,
+    b_model_answer TEXT,
+    evaluation TEXT,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    session_id TEXT,
+    evaluator_id INTEGER NOT NULL REFERENCES users(user_id),
+    CHECK (a_model_id <> b_model_id)
+);
+CREATE INDEX IF NOT EXISTS evaluations_timestamp_id_idx ON evaluations (timestamp, evaluation_id);
+CREATE TABLE IF NOT EXISTS pair_stats (
+    model_lo INTEGER NOT NULL REFERENCES models(model_id),
+    model_hi INTEGER NOT NULL REFERENCES models(model_id),
+    wins_lo INTEGER NOT NULL DEFAULT 0,
+    wins_hi INTEGER NOT NULL DEFAULT 0,
+    ties INTEGER NOT NULL DEFAULT 0,
+    both_bad INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (model_lo, model_hi),
+    CHECK (model_lo < model_hi)
+);
+"""
+
+class SQLiteStore(ModelStateStore):
+    """
+    단일 노드용 SQLite 구현
+      - WAL 저널 + synchronous=NORMAL: 읽기가 쓰기를 막지 않고 커밋마다 fsync하지 않음
+      - 스레드별 커넥션 하나, SQL 문자열을 상수로 두어 sqlite3 statement cache(준비된 문장)를 재사용
+      - 쓰기는 BEGIN IMMEDIATE로 시작해 다른 쓰기와의 교착 없이 busy_timeout 동안 대기
+    """
+
+    name = "sqlite"
+
+    _MODEL_SELECT = """
+        SELECT m.model_id, m.team_name, m.model_name, m.model_state, m.gpu_id, m.safetensors_path, m.revision,
+               m.downloaded_at, m.updated_at,
+               md.total_bytes, md.param_count, md.tensor_count, md.dtypes, md.shards
+        FROM models m
+        LEFT JOIN model_metadata md ON md.model_id = m.model_id
+    """
+    _SQL_LIST_MODELS = _MODEL_SELECT + " ORDER BY m.model_id"
+    _SQL_GET_MODEL = _MODEL_SELECT + " WHERE m.team_name = ? ORDER BY m.model_id LIMIT 1"
+    _SQL_GET_MODEL_STATE = _MODEL_SELECT + " WHERE m.team_name = ? AND m.model_state = ? ORDER BY m.model_id LIMIT 1"
+    _SQL_MODEL_IDS = """
+        SELECT model_name, MIN(model_id), team_name FROM models
+        GROUP BY model_name ORDER BY model_name LIMIT ?
+    """
+    _SQL_SET_STATE = "UPDATE models SET model_state = ?, gpu_id = ?, updated_at = ? WHERE team_name = ?"
+    _SQL_INSERT_EVAL = """
+        INSERT INTO evaluations
+        (a_model_id, b_model_id, prompt, a_model_answer, b_model_answer,
+         evaluation, timestamp, session_id, evaluator_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    _SQL_UPSERT_PAIR = """
+        INSERT INTO pair_stats (model_lo, model_hi, wins_lo, wins_hi, ties, both_bad)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (model_lo, model_hi) DO UPDATE SET
+            wins_lo = wins_lo + excluded.wins_lo,
+            wins_hi = wins_hi + excluded.wins_hi,
+            ties = ties + excluded.ties,
+            both_bad = both_bad + excluded.both_bad
+    """
+    _EVAL_SELECT = """
+        SELECT e.evaluation_id, ma.model_name, mb.model_name, e.prompt,
+               e.a_model_answer, e.b_model_answer,
+               e.evaluation, e.timestamp, e.session_id, e.evaluator_id
+        FROM evaluations e
+        JOIN models ma ON ma.model_id = e.a_model_id
+        JOIN models mb ON mb.model_id = e.b_model_id
+    """
+
+    def __init__(self, path=SQLITE_DEFAULT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(SQLITE_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_SEC, isolation_level=None,
+                                   detect_types=sqlite3.PARSE_DECLTYPES, cached_statements=256,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, fn):
+        conn = self._conn()
+        t0 = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            # 쓰기 락 대기(busy_timeout) 포함
+            DB_TRANSACTION_SECONDS.labels("sqlite").observe(time.perf_counter() - t0)
+
+    @staticmethod
+    def _row_to_model(r):
+        metadata = {
+            "total_bytes": r[9],
+            "param_count": r[10],
+            "tensor_count": r[11],
+            "dtypes": json.loads(r[12]) if r[12] else None,
+            "shards": json.loads(r[13]) if r[13] else None
+        } if r[9] is not None else None
+        return _model_dict(tuple(r[:9]) + (metadata,))
+
+    def list_models(self):
+        return [self._row_to_model(r) for r in self._conn().execute(self._SQL_LIST_MODELS)]
+
+    def get_model(self, team_name, state=None):
+        if state:
+            row = self._conn().execute(self._SQL_GET_MODEL_STATE, (team_name, state)).fetchone()
+        else:
+            row = self._conn().execute(self._SQL_GET_MODEL, (team_name,)).fetchone()
+        return self._row_to_model(row) if row else None
+
+    def team_names(self):
+        return [r[0] for r in self._conn().execute("SELECT DISTINCT team_name FROM models ORDER BY team_name")]
+
+    def model_ids(self, names=None, limit=None):
+        # SQLite의 MIN() 집계에서는 bare column(team_name)이 MIN 행의 값을 따름
+        if names is None:
+            return [tuple(r) for r in self._conn().execute(self._SQL_MODEL_IDS, (-1 if limit is None else limit,))]
+        names = list(names)
+        if not names:
+            return []
+        marks = ",".join("?" * len(names))
+        rows = self._conn().execute(f"""
+            SELECT model_name, MIN(model_id), team_name FROM models
+            WHERE model_name IN ({marks})
+            GROUP BY model_name ORDER BY model_name
+        """, names).fetchall()
+        return [tuple(r) for r in rows]
+
+    def register_model(self, team_name, model_name, safetensors_path, revision, metadata):
+        now = datetime.datetime.now().replace(microsecond=0)
+
+        def fn(conn):
+            # 팀의 기존 행이 있으면 그대로 갱신 (model_id 유지 → pair_stats FK, 리더보드 기록 보존)
+            row = conn.execute("SELECT model_id FROM models WHERE team_name = ? ORDER BY model_id LIMIT 1",
+                               (team_name,)).fetchone()
+            if row is not None:
+                model_id = row[0]
+                conn.execute("""
+                    UPDATE models
+                    SET model_name = ?, safetensors_path = ?, revision = ?, model_state = 'idle', gpu_id = NULL,
+                        downloaded_at = ?, updated_at = ?
+                    WHERE model_id = ?
+                """, (model_name, safetensors_path, revision, now, now, model_id))
+            else:
+                model_id = conn.execute("""
+                    INSERT INTO models (team_name, model_name, safetensors_path, revision, model_state, downloaded_at, updated_at)
+                    VALUES (?, ?, ?, ?, 'idle', ?, ?)
+                """, (team_name, model_name, safetensors_path, revision, now, now)).lastrowid
+            conn.execute("""
+                INSERT INTO model_metadata (model_id, total_bytes, param_count, tensor_count, dtypes, shards, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (model_id) DO UPDATE SET
+                    total_bytes = excluded.total_bytes, param_count = excluded.param_count,
+                    tensor_count = excluded.tensor_count, dtypes = excluded.dtypes, shards = excluded.shards,
+                    indexed_at = excluded.indexed_at
+            """, (model_id, metadata["total_bytes"], metadata["param_count"], metadata["tensor_count"],
+                  json.dumps(metadata["dtypes"]), json.dumps(metadata["shards"]), now))
+            return model_id
+        model_id = self._write(fn)
+        self._emit(team_name, "idle", None, None, reason="registered")
+        return model_id
+
+    def set_state(self, team_name, state, gpu_id=None, port=None):
+        self._check_state(state)
+        if state == "idle":
+            gpu_id = None
+        now = datetime.datetime.now().replace(microsecond=0)
+        self._write(lambda conn: conn.execute(self._SQL_SET_STATE, (state, gpu_id, now, team_name)))
+        self._emit(team_name, state, gpu_id, port)
+
+    def apply_states(self, assignment):
+        items = self._normalize(assignment)
+        if not items:
+            return []
+        now = datetime.datetime.now().replace(microsecond=0)
+
+        def fn(conn):
+            # BEGIN IMMEDIATE로 쓰기 잠금을 먼저 잡으므로 읽은 현재 상태가 커밋까지 유지됨
+            teams = [t[0] for t in items]
+            marks = ",".join("?" * len(teams))
+            current = {r[0]: (r[1], r[2]) for r in conn.execute(
+                f"SELECT team_name, model_state, gpu_id FROM models WHERE team_name IN ({marks})", teams)}
+            missing = sorted(t[0] for t in items if t[0] not in current)
+            if missing:
+                raise StoreError(f"DB에 없는 팀: {', '.join(missing)}")
+            changed = [t for t in items if current[t[0]] != (t[1], t[2])]
+            conn.executemany(self._SQL_SET_STATE, [(state, gpu_id, now, team_name) for team_name, state, gpu_id, _ in changed])
+            return changed
+
+        changed = self._write(fn)
+        for team_name, state, gpu_id, port in changed:
+            self._emit(team_name, state, gpu_id, port)
+        return sorted(t[0] for t in changed)
+
+    def add_user(self, name, password="", role="user"):
+        # 벤치마크/단일 노드 초기 설정용 (운영 사용자 관리는 db_init.py)
+        return self._write(lambda conn: conn.execute(
+            "INSERT INTO users (name, password, role) VALUES (?, ?, ?)", (name, password, role)).lastrowid)
+
+    def known_evaluators(self, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return set()
+        marks = ",".join("?" * len(user_ids))
+        return {r[0] for r in self._conn().execute(f"SELECT user_id FROM users WHERE user_id IN ({marks})", user_ids)}
+
+    def insert_evaluations(self, rows):
+        if not rows:
+            return 0
+        deltas = pair_deltas((r[0], r[1], r[5]) for r in rows)
+
+        def fn(conn):
+            conn.executemany(self._SQL_INSERT_EVAL, rows)
+            conn.executemany(self._SQL_UPSERT_PAIR, [(lo, hi, *d) for (lo, hi), d in sorted(deltas.items())])
+        self._write(fn)
+        return len(rows)
+
+    def list_evaluations(self, session_id=None, model_name=None, after=None, limit=None):
+        query = self._EVAL_SELECT
+        conditions = []
+        params = []
+        if session_id:
+            conditions.append("e.session_id = ?")
+            params.append(session_id)
+        if model_name:
+            conditions.append("(ma.model_name = ? OR mb.model_name = ?)")
+            params.extend([model_name, model_name])
+        if after:
+            conditions.append("(e.timestamp, e.evaluation_id) > (?, ?)")
+            params.extend(after)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY e.timestamp, e.evaluation_id LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        return [tuple(r) for r in self._conn().execute(query, params)]
+
+    def pair_stats(self):
+        return [tuple(r) for r in self._conn().execute(
+            "SELECT model_lo, model_hi, wins_lo, wins_hi, ties + both_bad FROM pair_stats")]
+
+    def total_votes(self):
+        return int(self._conn().execute(
+            "SELECT COALESCE(SUM(wins_lo + wins_hi + ties + both_bad), 0) FROM pair_stats").fetchone()[0])
+
+    def rebuild_pair_stats(self):
+        def fn(conn):
+            votes = conn.execute("SELECT a_model_id, b_model_id, evaluation FROM evaluations").fetchall()
+            conn.execute("DELETE FROM pair_stats")
+            conn.executemany(self._SQL_UPSERT_PAIR, [(lo, hi, *d) for (lo, hi), d in sorted(pair_deltas(votes).items())])
+        self._write(fn)
+
+class MemoryStore(ModelStateStore):
+    """
+    프로세스 메모리 구현 (테스트/벤치마크용, 재시작하면 사라짐)
+      - 잠금 하나로 모든 연산을 직렬화, 반환값은 복사본
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}         # model_id → dict
+        self._users = {}          # user_id → name
+        self._evaluations = []    # (evaluation_id, a_id, b_id, prompt, a_ans, b_ans, evaluation, ts, session_id, evaluator_id)
+        self._pairs = {}          # (lo, hi) → [wins_lo, wins_hi, ties, both_bad]
+        self._model_seq = itertools.count(1)
+        self._user_seq = itertools.count(1)
+        self._eval_seq = itertools.count(1)
+
+    def add_user(self, name, password="", role="user"):
+        with self._lock:
+            user_id = next(self._user_seq)
+            self._users[user_id] = (name, password, role)
+            return user_id
+
+    def list_models(self):
+        with self._lock:
+            return [copy.deepcopy(m) for _, m in sorted(self._models.items())]
+
+    def get_model(self, team_name, state=None):
+        with self._lock:
+            for _, m in sorted(self._models.items()):
+                if m["team_name"] == team_name and (state is None or m["state"] == state):
+                    return copy.deepcopy(m)
+        return None
+
+    def model_ids(self, names=None, limit=None):
+        wanted = set(names) if names is not None else None
+        with self._lock:
+            first = {}
+            for model_id, m in sorted(self._models.items()):
+                if wanted is None or m["model_name"] in wanted:
+                    first.setdefault(m["model_name"], (m["model_name"], model_id, m["team_name"]))
+        rows = [first[n] for n in sorted(first)]
+        return rows if limit is None else rows[:limit]
+
+    def register_model(self, team_name, model_name, safetensors_path, revision, metadata):
+        now = datetime.datetime.now().replace(microsecond=0)
+        with self._lock:
+            # 팀의 기존 모델이 있으면 model_id 유지 (리더보드 누계 보존)
+            existing = sorted(i for i, m in self._models.items() if m["team_name"] == team_name)
+            model_id = existing[0] if existing else next(self._model_seq)
+            self._models[model_id] = _model_dict((model_id, team_name, model_name, "idle", None, safetensors_path,
+                                                  revision, now, now, copy.deepcopy(metadata)))
+        self._emit(team_name, "idle", None, None, reason="registered")
+        return model_id
+
+    def set_state(self, team_name, state, gpu_id=None, port=None):
+        self._check_state(state)
+        if state == "idle":
+            gpu_id = None
+        now = datetime.datetime.now().replace(microsecond=0)
+        with self._lock:
+            for m in self._models.values():
+                if m["team_name"] == team_name:
+                    m.update(state=state, gpu_id=gpu_id, updated_at=now)
+        self._emit(team_name, state, gpu_id, port)
+
+    def apply_states(self, assignment):
+        items = self._normalize(assignment)
+        now = datetime.datetime.now().replace(microsecond=0)
+        with self._lock:
+            by_team = {m["team_name"]: m for _, m in sorted(self._models.items(), reverse=True)}
+            missing = sorted(t[0] for t in items if t[0] not in by_team)
+            if missing:
+                raise StoreError(f"DB에 없는 팀: {', '.join(missing)}")
+            changed = [t for t in items if (by_team[t[0]]["state"], by_team[t[0]]["gpu_id"]) != (t[1], t[2])]
+            for team_name, state, gpu_id, _ in changed:
+                by_team[team_name].update(state=state, gpu_id=gpu_id, updated_at=now)
+        for team_name, state, gpu_id, port in changed:
+            self._emit(team_name, state, gpu_id, port)
+        return sorted(t[0] for t in changed)
+
+    def known_evaluators(self, user_ids):
+        with self._lock:
+            return {u for u in user_ids if u in self._users}
+
+    def insert_evaluations(self, rows):
+        deltas = pair_deltas((r[0], r[1], r[5]) for r in rows)
+        with self._lock:
+            # 외래 키/제약 조건 확인 후 한 번에 반영 (하나라도 틀리면 전체 취소)
+            for r in rows:
+                if r[0] not in self._models or r[1] not in self._models:
+                    raise StoreError(f"알 수 없는 model_id: {r[0]}, {r[1]}")
+                if r[0] == r[1]:
+                    raise StoreError("a_model_id와 b_model_id가 같습니다.")
+                if r[8] not in self._users:
+                    raise StoreError(f"알 수 없는 evaluator_id: {r[8]}")
+            for r in rows:
+                ts = r[6]
+                if isinstance(ts, str):
+                    ts = datetime.datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
+                self._evaluations.append((next(self._eval_seq), r[0], r[1], r[2], r[3], r[4], str(r[5]), ts, r[7], r[8]))
+            for key, d in deltas.items():
+                acc = self._pairs.setdefault(key, [0, 0, 0, 0])
+                for i in range(4):
+                    acc[i] += d[i]
+        return len(rows)
+
+    def list_evaluations(self, session_id=None, model_name=None, after=None, limit=None):
+        with self._lock:
+            names = {i: m["model_name"] for i, m in self._models.items()}
+            result = []
+            # evaluations는 (timestamp, evaluation_id) 순으로 쌓이지만 timestamp가 같지 않을 수 있어 정렬
+            for e in sorted(self._evaluations, key=lambda e: (e[7], e[0])):
+                if session_id and e[8] != session_id:
+                    continue
+                a_name, b_name = names.get(e[1]), names.get(e[2])
+                if a_name is None or b_name is None:
+                    continue
+                if model_name and model_name not in (a_name, b_name):
+                    continue
+                if after and (e[7], e[0]) <= tuple(after):
+                    continue
+                result.append((e[0], a_name, b_name, e[3], e[4], e[5], e[6], e[7], e[8], e[9]))
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
+
+    def pair_stats(self):
+        with self._lock:
+            return [(lo, hi, d[0], d[1], d[2] + d[3]) for (lo, hi), d in self._pairs.items()]
+
+    def total_votes(self):
+        with self._lock:
+            return sum(sum(d) for d in self._pairs.values())
+
+    def rebuild_pair_stats(self):
+        with self._lock:
+            self._pairs = pair_deltas((e[1], e[2], e[6]) for e in self._evaluations)
+
+def create_store(spec=MODEL_STORE_BACKEND):
+    """'postgres' | 'sqlite' | 'sqlite:/path/to/models.db' | 'memory'"""
+    if spec == "postgres":
+        return PostgresStore()
+    if spec == "memory":
+        return MemoryStore()
+    if spec == "sqlite" or spec.startswith("sqlite:"):
+        return SQLiteStore(spec.split(":", 1)[1] if ":" in spec else SQLITE_DEFAULT_PATH)
+    raise StoreError(f"알 수 없는 저장소: {spec}")
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """프로세스 전역 저장소 (처음 호출 시 MALPYEONG_STORE 설정으로 생성)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store()
+    return _store
+
+def set_store(new_store):
+    # 테스트/벤치마크에서 MemoryStore 등으로 교체
+    global _store
+    with _store_lock:
+        _store = new_store
+    return new_store
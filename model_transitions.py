@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from model_service import apply_model_states, get_model_metadata
+from model_events import publish
+from vllm_control import get_model_path, restart_vllm_process
+from vllm_supervisor import supervisor
+from gateway import router, Backend
+from placement import plan_placement, required_bytes, GPU_MEMORY_BYTES, GPU_RESERVE_FRACTION
+import tracing
+
+# GPU 배치 방식: fixed = GPU_PORT_MAP대로 GPU당 모델 1개, packed = 모델 크기 기반으로 여러 모델을 한 GPU에
+PLACEMENT_MODE = os.environ.get("MALPYEONG_PLACEMENT", "fixed")
+# 동시에 진행할 GPU 전환 수 (GPU 수보다 크게 잡을 필요 없음)
+SWITCH_MAX_WORKERS = int(os.environ.get("MALPYEONG_SWITCH_MAX_WORKERS", "4"))
+# 기동 기록도 safetensors 메타데이터도 없는 모델의 예상 재기동 시간(초)
+DEFAULT_COLD_START_SEC = float(os.environ.get("MALPYEONG_DEFAULT_COLD_START_SEC", "120"))
+# 메타데이터로 추정할 때: 기본 기동 오버헤드(초) + 가중치 바이트 / 로딩 속도
+COLD_START_BASE_SEC = float(os.environ.get("MALPYEONG_COLD_START_BASE_SEC", "20"))
+LOAD_BYTES_PER_SEC = float(os.environ.get("MALPYEONG_LOAD_BYTES_PER_SEC", str(1024 ** 3)))
+# packed 배치에서 vLLM에 할당하지 않을 포트 (API/게이트웨이 등, 쉼표 구분)
+RESERVED_PORTS = [int(p) for p in os.environ.get("MALPYEONG_RESERVED_PORTS", "5020").split(",") if p.strip()]
+
+def build_transitions(team_config, gpu_port_map):
+    """
+    TEAM_CONFIG → 전환 목록 [{user_id, gpu, port, role}, ...]
+      - TEAM_CONFIG["serving"] 팀 → standby 전환
+      - TEAM_CONFIG["standby"] 팀 → serving 전환
+      - 포트 매핑이 없는 GPU는 경고 후 제외
+    """
+    transitions = []
+    for key, role in (("serving", "standby"), ("standby", "serving")):
+        for i, entry in enumerate(team_config[key]):
+            user_id = entry["user_id"]
+            gpu_id = entry["gpu"]
+            port = gpu_port_map.get(gpu_id)
+            if port is None:
+                logging.warning("GPU 포트 매핑 없음 (gpu=%s), %s 건너뜀", gpu_id, user_id)
+                continue
+            t = {"user_id": user_id, "gpu": gpu_id, "port": port, "role": role}
+            if role == "serving":
+                # 게이트웨이 논리 슬롯 (CSV의 s1/s2 순서)
+                t["slot"] = f"s{i + 1}"
+            transitions.append(t)
+    return transitions
+
+def build_packed_transitions(team_config, gpu_port_map, slots=None):
+    """
+    build_transitions와 같은 역할/슬롯을 만들되, GPU/포트/메모리 비율은 placement 계획으로 결정
+      - 모델 크기는 model_metadata(total_bytes), 없으면 GPU 한 장을 통째로 쓰는 것으로 간주
+      - CSV의 GPU는 무시하고 들어가는 만큼 한 GPU에 채움
+      - 이미 떠 있는 팀은 지금의 GPU/포트를 선호로 넘김 → 들어가면 그대로 두어 plan_transitions에서 keep
+      - 나머지 포트는 GPU_PORT_MAP의 가장 작은 포트부터 RESERVED_PORTS를 피해 자동 할당
+    """
+    transitions = build_transitions(team_config, {gpu: 0 for gpu in gpu_port_map})
+    live = {slot.team_name: slot for slot in (slots if slots is not None else supervisor.slots()) if slot.alive()}
+    models = []
+    for t in transitions:
+        metadata = get_model_metadata(t["user_id"])
+        if metadata is None:
+            logging.warning("모델 메타데이터 없음 (%s), GPU 한 장 전체로 배치", t["user_id"])
+            weight_bytes = None
+        else:
+            weight_bytes = metadata["total_bytes"]
+        m = {"team_name": t["user_id"], "weight_bytes": weight_bytes}
+        slot = live.get(t["user_id"])
+        if slot is not None:
+            m.update(gpu=slot.gpu_id, port=slot.port)
+        models.append(m)
+
+    # 크기를 모르는 모델은 다른 모델과 같은 GPU에 들어가지 않도록 최대 크기로 취급
+    full_gpu = int(GPU_MEMORY_BYTES * (1 - GPU_RESERVE_FRACTION)) - required_bytes(0)
+    for m in models:
+        if m["weight_bytes"] is None:
+            m["weight_bytes"] = full_gpu
+
+    placements = {p["team_name"]: p for p in plan_placement(models, sorted(gpu_port_map), base_port=min(gpu_port_map.values()),
+                                                            reserved_ports=RESERVED_PORTS)}
+    for t in transitions:
+        p = placements[t["user_id"]]
+        t.update(gpu=p["gpu_id"], port=p["port"], gpu_memory_utilization=p["gpu_memory_utilization"], exclusive=False)
+    return transitions
+
+def build_schedule_transitions(team_config, gpu_port_map):
+    if PLACEMENT_MODE == "packed":
+        return build_packed_transitions(team_config, gpu_port_map)
+    return build_transitions(team_config, gpu_port_map)
+
+def estimate_cold_start(team_name, history):
+    """실측 기동 기록 평균 → 없으면 safetensors 총 바이트로 추정 → 그것도 없으면 기본값"""
+    samples = [h["launch_to_ready_sec"] for h in history.get(team_name, [])]
+    if samples:
+        return sum(samples) / len(samples)
+    try:
+        metadata = get_model_metadata(team_name)
+    except Exception as e:
+        logging.warning("모델 메타데이터 조회 실패 (%s): %s", team_name, e)
+        metadata = None
+    if metadata:
+        return COLD_START_BASE_SEC + metadata["total_bytes"] / LOAD_BYTES_PER_SEC
+    return DEFAULT_COLD_START_SEC
+
+def plan_transitions(transitions, slots=None):
+    """
+    현재 떠 있는 vLLM 슬롯과 비교해 전환별 action 결정
+      - keep: 같은 팀의 같은 모델이 같은 GPU/포트에서 이미 ready → DB/라우팅의 role만 변경
+        (packed 배치는 --gpu-memory-utilization도 같아야 함: GPU를 함께 쓰는 모델이 바뀌어 몫이 달라지면 restart)
+      - restart: 그 외 (다른 모델이 떠 있거나, 비어 있거나, 죽었거나, 모델이 새로 다운로드됨)
+    각 전환에 action과 estimated_sec(예상 재기동 시간)를 붙여 반환
+    """
+    live = {slot.port: slot for slot in (slots if slots is not None else supervisor.slots())}
+    history = supervisor.cold_starts()
+    plan = []
+    for t in transitions:
+        slot = live.get(t["port"])
+        action = "restart"
+        if slot is not None and slot.alive() and slot.ready_at is not None \
+                and slot.team_name == t["user_id"] and slot.gpu_id == t["gpu"] \
+                and t.get("gpu_memory_utilization", slot.gpu_memory_utilization) == slot.gpu_memory_utilization:
+            try:
+                model_path, _ = get_model_path(t["user_id"])
+            except Exception as e:
+                logging.warning("모델 경로 조회 실패 (%s): %s", t["user_id"], e)
+                model_path = None
+            if model_path == slot.model_path:
+                action = "keep"
+        estimated = 0.0 if action == "keep" else estimate_cold_start(t["user_id"], history)
+        plan.append(dict(t, action=action, estimated_sec=round(estimated, 1)))
+    return plan
+
+def summarize_plan(plan):
+    per_gpu = {}
+    for t in plan:
+        per_gpu[t["gpu"]] = per_gpu.get(t["gpu"], 0.0) + t["estimated_sec"]
+    return {
+        "restarts": sum(1 for t in plan if t["action"] == "restart"),
+        "keeps": sum(1 for t in plan if t["action"] == "keep"),
+        "estimated_sum_sec": round(sum(per_gpu.values()), 1),
+        # GPU별 병렬 실행 시 예상 소요 시간 = 가장 오래 걸리는 GPU
+        "estimated_wall_sec": round(max(per_gpu.values(), default=0.0), 1),
+    }
+
+def format_plan(plan, idle_teams=()):
+    lines = []
+    for t in sorted(plan, key=lambda t: t["gpu"]):
+        lines.append(f"  gpu={t['gpu']} port={t['port']} {t['user_id']} → {t['role']:<7} "
+                     f"[{t['action']}] ~{t['estimated_sec']}s")
+    for team in idle_teams:
+        lines.append(f"  {team} → idle")
+    summary = summarize_plan(plan)
+    lines.append(f"  restart {summary['restarts']}건, keep {summary['keeps']}건, "
+                 f"예상 소요 {summary['estimated_wall_sec']}s (순차 시 {summary['estimated_sum_sec']}s)")
+    return "\n".join(lines)
+
+def run_transition(t):
+    """
+    action=restart: vLLM 재기동(ready까지)
+    action=keep: 프로세스는 그대로 두고 슬롯 role만 변경
+    DB 상태는 여기서 쓰지 않음 (run_transitions가 끝에 한 트랜잭션으로 기록)
+    소요 시간을 담은 결과 dict 반환
+      - kill_sec: 같은 슬롯/GPU의 기존 vLLM 종료, spawn_sec: 프로세스 생성, ready_sec: 생성 → 요청 응답
+      - other_sec: 나머지 (모델 경로 조회 등)
+    """
+    t0 = time.time()
+    with tracing.span("transition", team=t["user_id"], role=t["role"], gpu=t["gpu"], port=t["port"],
+                      action=t.get("action", "restart")) as sp:
+        if t.get("action") == "keep":
+            vllm = supervisor.set_role(t["port"], t["role"])
+        else:
+            vllm = restart_vllm_process(t["user_id"], role=t["role"], default_port=t["port"], gpu_id=t["gpu"],
+                                        gpu_memory_utilization=t.get("gpu_memory_utilization", 0.95),
+                                        exclusive=t.get("exclusive", True))
+        launch_sec = time.time() - t0
+        if t.get("action") == "keep":
+            phases = {"kill_sec": 0.0, "spawn_sec": 0.0, "ready_sec": 0.0}
+        else:
+            phases = {"kill_sec": vllm.stop_sec, "spawn_sec": vllm.spawn_sec, "ready_sec": vllm.launch_to_ready_sec}
+        phases["other_sec"] = round(max(0.0, launch_sec - sum(phases.values())), 3)
+        if t.get("slot"):
+            # ready 확인 후에 게이트웨이 슬롯을 새 serving 모델로 전환
+            router.set_route(t["slot"], Backend(t["port"], team_name=t["user_id"], model_name=vllm.model_path))
+        sp.set(**phases)
+    return dict(t, ok=True, launch_sec=round(launch_sec, 3), total_sec=round(time.time() - t0, 3), **phases)
+
+def _run_gpu_group(group):
+    # 같은 GPU를 쓰는 전환은 순서대로 (한 GPU에 두 모델이 동시에 뜨지 않도록)
+    with tracing.span("gpu_group", gpu=group[0]["gpu"], transitions=len(group)):
+        return _run_gpu_group_steps(group)
+
+def _run_gpu_group_steps(group):
+    results = []
+    for t in group:
+        t0 = time.time()
+        try:
+            results.append(run_transition(t))
+        except Exception as e:
+            logging.error("전환 실패 %s → %s (gpu=%s): %s", t["user_id"], t["role"], t["gpu"], e)
+            try:
+                publish(t["user_id"], "failed", t["gpu"], t["port"])
+            except Exception as pe:
+                logging.error("전환 실패 이벤트 발행 오류: %s", pe)
+            results.append(dict(t, ok=False, error=str(e), total_sec=round(time.time() - t0, 3)))
+    return results
+
+def unplanned_slots(transitions, idle_teams=(), slots=None):
+    """
+    이번 계획에 없는 포트의 슬롯과 idle_teams의 슬롯 (모든 GPU 대상)
+      - 다른 GPU로 옮겨 가거나 idle이 된 팀의 vLLM이 전환 그룹이 없는 GPU에 남아 메모리를 잡지 않도록
+      - 계획에 있는 포트의 다른 팀 슬롯은 restart가 같은 포트를 내리므로 제외
+    """
+    planned_ports = {t["port"] for t in transitions}
+    idle = set(idle_teams)
+    return [slot for slot in (slots if slots is not None else supervisor.slots())
+            if slot.port not in planned_ports or slot.team_name in idle]
+
+def _stop_slot(slot):
+    with tracing.span("kill", gpu=slot.gpu_id, port=slot.port, team=slot.team_name):
+        supervisor.stop(slot.port)
+    return {"user_id": slot.team_name, "gpu": slot.gpu_id, "port": slot.port}
+
+def transition_states(results, idle_teams=()):
+    # 성공한 전환은 (role, gpu, port), idle_teams는 idle → apply_model_states에 넘길 목표 상태
+    assignment = {team: ("idle", None) for team in idle_teams}
+    for r in results:
+        if r["ok"]:
+            assignment[r["user_id"]] = (r["role"], r["gpu"], r["port"])
+    return assignment
+
+def run_transitions(transitions, idle_teams=(), max_workers=SWITCH_MAX_WORKERS):
+    """
+    서로 다른 GPU의 전환을 병렬로 실행 (plan_transitions 결과를 넘기면 keep은 재기동 생략)
+    기동 전에 계획에 없는 슬롯과 idle_teams의 슬롯을 모든 GPU에서 먼저 내려 메모리 확보
+    끝나면 성공한 전환의 상태와 idle_teams의 idle 전환을 한 트랜잭션으로 기록
+    (실패한 전환의 팀은 기존 DB 상태 유지)
+    반환: {"results": [...], "failures": [...], "stopped": [...], "changed": [...], "state_error", "state_sec", "wall_sec", "sum_launch_sec", "trace_id"}
+      - state_sec: 상태 기록(한 트랜잭션)에 걸린 시간
+      - wall_sec: 전체 소요 시간 (≈ 가장 느린 GPU 하나의 기동 시간)
+      - sum_launch_sec: 각 전환의 기동 시간 합 (순차 실행했다면 걸렸을 시간)
+    """
+    groups = {}
+    for t in transitions:
+        groups.setdefault(t["gpu"], []).append(t)
+
+    with tracing.span("run_transitions", transitions=len(transitions), idle=len(idle_teams)) as sp:
+        t0 = time.time()
+        results, stopped = [], []
+        stale = unplanned_slots(transitions, idle_teams)
+        if groups or stale:
+            workers = max(1, min(max_workers, max(len(groups), len(stale))))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="switch") as ex:
+                # 워커 스레드의 span도 이 trace 아래로 (contextvars는 스레드 풀로 자동 전달되지 않음)
+                stopped = list(ex.map(tracing.wrap(_stop_slot), stale))
+                for group_results in ex.map(tracing.wrap(_run_gpu_group), groups.values()):
+                    results.extend(group_results)
+        wall_sec = time.time() - t0
+
+        changed, state_error = [], None
+        t1 = time.time()
+        try:
+            changed = apply_model_states(transition_states(results, idle_teams))
+        except Exception as e:
+            logging.error("전환 상태 기록 실패: %s", e)
+            state_error = str(e)
+        state_sec = time.time() - t1
+
+    report = {
+        "results": results,
+        "failures": [r for r in results if not r["ok"]],
+        "stopped": stopped,
+        "changed": changed,
+        "state_error": state_error,
+        "state_sec": round(state_sec, 4),
+        "wall_sec": round(wall_sec, 3),
+        "sum_launch_sec": round(sum(r.get("launch_sec", 0.0) for r in results), 3),
+        "trace_id": sp.trace_id,
+    }
+    logging.info("전환 %d건 완료 (실패 %d): wall=%.1fs, 기동 시간 합=%.1fs",
+                 len(results), len(report["failures"]), report["wall_sec"], report["sum_launch_sec"])
+    return report
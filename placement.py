@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import math
+import os
+
+GIB = 1024 ** 3
+
+# GPU 한 장의 메모리 (기본 80GiB)
+GPU_MEMORY_BYTES = int(os.environ.get("MALPYEONG_GPU_MEMORY_BYTES", str(80 * GIB)))
+# 모델 하나당 KV cache 최소 예산
+KV_CACHE_BYTES = int(os.environ.get("MALPYEONG_KV_CACHE_BYTES", str(4 * GIB)))
+# 모델 하나당 CUDA context / activation 등 가중치 외 오버헤드
+MODEL_OVERHEAD_BYTES = int(os.environ.get("MALPYEONG_MODEL_OVERHEAD_BYTES", str(2 * GIB)))
+# vLLM이 쓰지 않고 남겨둘 GPU 메모리 비율 (기존 --gpu-memory-utilization 0.95와 같은 여유)
+GPU_RESERVE_FRACTION = 0.05
+
+class PlacementError(ValueError):
+    pass
+
+def required_bytes(weight_bytes, kv_cache_bytes=KV_CACHE_BYTES, overhead_bytes=MODEL_OVERHEAD_BYTES):
+    """모델 하나를 띄우는 데 필요한 최소 GPU 메모리 = 가중치 + KV cache 예산 + 오버헤드"""
+    return weight_bytes + kv_cache_bytes + overhead_bytes
+
+def plan_placement(models, gpu_ids, gpu_memory_bytes=GPU_MEMORY_BYTES, base_port=5021, reserved_ports=(),
+                   kv_cache_bytes=KV_CACHE_BYTES, overhead_bytes=MODEL_OVERHEAD_BYTES,
+                   reserve_fraction=GPU_RESERVE_FRACTION):
+    """
+    모델들을 GPU에 배치하는 순수 함수 (DB/프로세스 접근 없음)
+      models: [{"team_name", "weight_bytes", "gpu": 선호 GPU(선택), "port": 선호 포트(선택)}, ...]
+      gpu_ids: 사용할 GPU 번호 목록
+    규칙
+      1) 선호 GPU가 있고 남은 메모리에 들어가면 그 GPU에 배치
+      2) 나머지는 큰 모델부터 남은 메모리가 가장 적게 남는 GPU에 배치 (best-fit decreasing)
+      3) GPU별로 (1 - reserve_fraction) 만큼을 배치된 모델들의 필요 메모리 비율대로 나눠
+         --gpu-memory-utilization 값으로 사용 (남는 메모리는 KV cache로 감)
+      4) 선호 GPU에 그대로 배치된 모델은 선호 포트 유지 (지금 떠 있는 슬롯을 재기동하지 않도록)
+      5) 나머지 포트는 base_port부터 reserved_ports와 4)의 포트를 피해 (gpu, 팀 이름) 순서로 자동 할당
+    반환: [{"team_name", "gpu_id", "port", "gpu_memory_utilization", "required_bytes", "shared"}, ...]
+    한 GPU에도 들어가지 않는 모델이 있으면 PlacementError
+    """
+    if not gpu_ids:
+        raise PlacementError("사용할 GPU가 없습니다.")
+    capacity = int(gpu_memory_bytes * (1 - reserve_fraction))
+    free = {gpu: capacity for gpu in gpu_ids}
+    assigned = {gpu: [] for gpu in gpu_ids}
+
+    needs = []
+    for m in models:
+        need = required_bytes(m["weight_bytes"], kv_cache_bytes, overhead_bytes)
+        if need > capacity:
+            raise PlacementError(f"{m['team_name']}: 필요 메모리 {need} bytes가 GPU 한 장({capacity} bytes)보다 큽니다.")
+        needs.append((m, need))
+
+    pending = []
+    for m, need in needs:
+        gpu = m.get("gpu")
+        if gpu in free and free[gpu] >= need:
+            free[gpu] -= need
+            assigned[gpu].append((m["team_name"], need))
+        else:
+            pending.append((m, need))
+
+    for m, need in sorted(pending, key=lambda x: (-x[1], x[0]["team_name"])):
+        candidates = [gpu for gpu in gpu_ids if free[gpu] >= need]
+        if not candidates:
+            raise PlacementError(f"{m['team_name']}: 남은 GPU 메모리가 부족합니다 (필요 {need} bytes).")
+        gpu = min(candidates, key=lambda g: (free[g] - need, g))
+        free[gpu] -= need
+        assigned[gpu].append((m["team_name"], need))
+
+    by_team = {m["team_name"]: m for m in models}
+    reserved = set(reserved_ports)
+    ports = {}
+    for gpu in sorted(gpu_ids):
+        for team_name, _ in sorted(assigned[gpu]):
+            m = by_team[team_name]
+            preferred = m.get("port")
+            if preferred is not None and m.get("gpu") == gpu and preferred not in reserved and preferred not in ports.values():
+                ports[team_name] = preferred
+    taken = reserved | set(ports.values())
+
+    port = base_port
+    placements = []
+    for gpu in sorted(gpu_ids):
+        members = sorted(assigned[gpu])
+        used = sum(need for _, need in members)
+        for team_name, need in members:
+            if team_name not in ports:
+                while port in taken:
+                    port += 1
+                ports[team_name] = port
+                taken.add(port)
+            # 필요 메모리 비율대로 GPU 여유분까지 나눠 줌 (소수점 둘째 자리 내림 → 합이 capacity를 넘지 않음)
+            share = capacity * need / used
+            utilization = math.floor(share / gpu_memory_bytes * 100) / 100
+            placements.append({
+                "team_name": team_name,
+                "gpu_id": gpu,
+                "port": ports[team_name],
+                "gpu_memory_utilization": utilization,
+                "required_bytes": need,
+                "shared": len(members) > 1,
+            })
+    return placements
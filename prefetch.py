@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import datetime
+import os
+import threading
+import time
+from collections import deque
+
+from model_store import get_store
+from model_service import download_repo_and_save_safetensors
+from vllm_supervisor import supervisor
+from metrics import track_job
+
+# 전환 몇 분 전에 다음 모델을 미리 준비할지
+PREFETCH_LEAD_MINUTES = float(os.environ.get("MALPYEONG_PREFETCH_LEAD_MINUTES", "10"))
+# page cache 워밍에 쓸 최대 바이트 (0이면 MemAvailable의 절반)
+PREFETCH_MEMORY_BUDGET = int(os.environ.get("MALPYEONG_PREFETCH_MEMORY_BUDGET", "0"))
+READ_CHUNK = 16 * 1024 * 1024
+REPORT_HISTORY = 20
+
+_reports = deque(maxlen=REPORT_HISTORY)
+_reports_lock = threading.Lock()
+
+def mem_available():
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+def default_memory_budget():
+    return PREFETCH_MEMORY_BUDGET or mem_available() // 2
+
+def _team_model(team_name):
+    m = get_store().get_model(team_name)
+    return (m["model_name"], m["safetensors_path"]) if m else None
+
+def _safetensors_files(model_dir):
+    files = []
+    for root, dirs, names in os.walk(model_dir):
+        for f in names:
+            if f.endswith(".safetensors"):
+                files.append(os.path.join(root, f))
+    return sorted(files)
+
+def warm_file(path, max_bytes):
+    """순차 read로 파일을 page cache에 올림 (max_bytes까지만). 읽은 바이트 수 반환"""
+    buf = bytearray(READ_CHUNK)
+    view = memoryview(buf)
+    total = 0
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while total < max_bytes:
+            n = f.readinto(view[:min(READ_CHUNK, max_bytes - total)])
+            if not n:
+                break
+            total += n
+    return total
+
+def prefetch_teams(team_names, memory_budget=None):
+    """
+    다음 전환에 올라올 팀들의 모델을 미리 준비
+      1) DB에 등록됐지만 파일이 없는 모델은 다시 다운로드
+      2) .safetensors 파일을 순차로 읽어 page cache 워밍 (memory_budget 안에서)
+      - 이미 vLLM으로 떠 있는 팀은 건너뜀
+    팀별 결과(상태, 파일 수, 바이트, 소요 시간)를 담은 report 반환
+    """
+    budget = default_memory_budget() if memory_budget is None else memory_budget
+    running = {slot.team_name for slot in supervisor.slots() if slot.alive()}
+    remaining = budget
+    t_start = time.time()
+    results = []
+    for team_name in team_names:
+        t0 = time.time()
+        result = {"team_name": team_name, "status": "warmed", "files": 0, "bytes": 0, "downloaded": False}
+        try:
+            if team_name in running:
+                result["status"] = "running"
+                continue
+            row = _team_model(team_name)
+            if row is None:
+                result["status"] = "unknown_team"
+                continue
+            model_name, safetensors_path = row
+            if not safetensors_path or not os.path.exists(safetensors_path):
+                download_repo_and_save_safetensors(f"{team_name}/{model_name}")
+                result["downloaded"] = True
+                model_name, safetensors_path = _team_model(team_name)
+            for path in _safetensors_files(os.path.dirname(safetensors_path)):
+                if remaining <= 0:
+                    result["status"] = "budget_exceeded"
+                    break
+                n = warm_file(path, remaining)
+                remaining -= n
+                result["files"] += 1
+                result["bytes"] += n
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)
+        finally:
+            result["seconds"] = round(time.time() - t0, 3)
+            if result["bytes"] and result["seconds"] > 0:
+                result["throughput_mb_per_sec"] = round(result["bytes"] / result["seconds"] / 1e6, 1)
+            results.append(result)
+            print(f"[prefetch_teams] {result}")
+
+    report = {
+        "at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "memory_budget": budget,
+        "total_bytes": sum(r["bytes"] for r in results),
+        "seconds": round(time.time() - t_start, 3),
+        "teams": results,
+    }
+    with _reports_lock:
+        _reports.append(report)
+    return report
+
+def prefetch_job(team_names, scheduled_at=None):
+    """스케줄러가 예약 실행하는 prefetch_teams (예정 시각 대비 시작 지연과 실행 시간을 지표로 기록)"""
+    with track_job("prefetch", scheduled_at):
+        return prefetch_teams(team_names)
+
+def recent_reports():
+    with _reports_lock:
+        return list(_reports)
+
+def teams_in_row(row):
+    # CSV 한 행(s1/s2/st1/st2)의 팀 – 새로 serving이 될 st* 팀을 먼저
+    return [row[k] for k in ("st1_user", "st2_user", "s1_user", "s2_user") if row.get(k)]
+
+def prefetch_run_time(run_time, lead_minutes=PREFETCH_LEAD_MINUTES):
+    """전환 시각 lead_minutes 전 (이미 지났으면 지금)"""
+    return max(run_time - datetime.timedelta(minutes=lead_minutes), datetime.datetime.now())
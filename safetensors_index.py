@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import struct
+
+SAFETENSORS_INDEX_FILE = "model.safetensors.index.json"
+MAX_HEADER_BYTES = 100 * 1024 * 1024  # safetensors 스펙상 헤더 상한
+
+def read_header(path):
+    """
+    safetensors 파일의 JSON 헤더만 읽음 (텐서 데이터는 읽지 않음)
+      [8바이트 little-endian 헤더 길이][JSON 헤더][텐서 데이터]
+    {tensor_name: {"dtype", "shape", "data_offsets"}} 반환 (__metadata__ 제외)
+    """
+    with open(path, "rb") as f:
+        raw_len = f.read(8)
+        if len(raw_len) != 8:
+            raise ValueError(f"'{path}'는 올바른 safetensors 파일이 아닙니다.")
+        (header_len,) = struct.unpack("<Q", raw_len)
+        if header_len > MAX_HEADER_BYTES:
+            raise ValueError(f"'{path}' 헤더 크기가 비정상적입니다 ({header_len} bytes)")
+        header = json.loads(f.read(header_len))
+    header.pop("__metadata__", None)
+    return header
+
+def _num_elements(shape):
+    n = 1
+    for dim in shape:
+        n *= dim
+    return n
+
+def index_model_dir(model_dir):
+    """
+    모델 디렉터리의 safetensors 샤드 전체를 헤더만으로 요약
+      - model.safetensors.index.json이 있으면 weight_map의 샤드 목록을 사용
+      - 없으면 디렉터리의 .safetensors 파일 전체
+    반환: {total_bytes, param_count, tensor_count, dtypes: {dtype: param_count}, shards: [상대 경로]}
+    """
+    index_path = os.path.join(model_dir, SAFETENSORS_INDEX_FILE)
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            weight_map = json.load(f).get("weight_map", {})
+        shards = sorted(set(weight_map.values()))
+    else:
+        shards = []
+        for root, dirs, files in os.walk(model_dir):
+            for name in files:
+                if name.endswith(".safetensors"):
+                    shards.append(os.path.relpath(os.path.join(root, name), model_dir))
+        shards.sort()
+    if not shards:
+        raise FileNotFoundError(f"'{model_dir}' 내에 .safetensors 파일이 없습니다.")
+
+    total_bytes = 0
+    param_count = 0
+    tensor_count = 0
+    dtypes = {}
+    for shard in shards:
+        for name, info in read_header(os.path.join(model_dir, shard)).items():
+            n = _num_elements(info["shape"])
+            start, end = info["data_offsets"]
+            total_bytes += end - start
+            param_count += n
+            tensor_count += 1
+            dtypes[info["dtype"]] = dtypes.get(info["dtype"], 0) + n
+
+    return {
+        "total_bytes": total_bytes,
+        "param_count": param_count,
+        "tensor_count": tensor_count,
+        "dtypes": dtypes,
+        "shards": shards,
+    }
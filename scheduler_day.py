@@ -1,17 +1,17 @@
 import csv
 import datetime
 import logging
-import psycopg2
+import threading
 
-from model_service import set_model_standby, set_model_serving, set_model_idle
-from vllm_control import restart_vllm_process
+from model_store import get_store
+from prefetch import prefetch_job, prefetch_run_time, teams_in_row
+from metrics import track_job
+import tracing
+from model_transitions import build_schedule_transitions, plan_transitions, run_transitions, summarize_plan, format_plan
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
-# PostgreSQL 접속 정보 – 실제 환경에 맞게 수정하세요.
-DB_CONN_INFO = "dbname=malpyeong user=postgres password=!TeddySum host=127.0.0.1 port=5432"
-
 # GPU → 포트 매핑 (예시; 환경에 맞게 수정하세요)
 GPU_PORT_MAP = {}
 
@@ -27,75 +27,74 @@ def set_team_config_from_csv_row(row):
       date, s1_user, s1_gpu, s2_user, s2_gpu, st1_user, st1_gpu, st2_user, st2_gpu
     """
     global TEAM_CONFIG
-    try:
-        serving = [
-            {"user_id": row["s1_user"], "gpu": int(row["s1_gpu"])},
-            {"user_id": row["s2_user"], "gpu": int(row["s2_gpu"])}
-        ]
-        standby = [
-            {"user_id": row["st1_user"], "gpu": int(row["st1_gpu"])},
-            {"user_id": row["st2_user"], "gpu": int(row["st2_gpu"])}
-        ]
-        TEAM_CONFIG = {"serving": serving, "standby": standby}
-        logging.info("TEAM_CONFIG 업데이트됨: %s", TEAM_CONFIG)
-    except Exception as e:
-        logging.error("CSV 행 처리 중 오류: %s - %s", row, e)
+    with tracing.span("csv_parse", date=row.get("date")) as sp:
+        try:
+            serving = [
+                {"user_id": row["s1_user"], "gpu": int(row["s1_gpu"])},
+                {"user_id": row["s2_user"], "gpu": int(row["s2_gpu"])}
+            ]
+            standby = [
+                {"user_id": row["st1_user"], "gpu": int(row["st1_gpu"])},
+                {"user_id": row["st2_user"], "gpu": int(row["st2_gpu"])}
+            ]
+            TEAM_CONFIG = {"serving": serving, "standby": standby}
+            logging.info("TEAM_CONFIG 업데이트됨: %s", TEAM_CONFIG)
+        except Exception as e:
+            sp.fail(e)
+            logging.error("CSV 행 처리 중 오류: %s - %s", row, e)
 
-def daily_model_switch():
+def daily_model_switch(dry_run=False):
     """
     TEAM_CONFIG에 기반하여 모델 상태를 전환
       - serving 상태 모델 → standby 전환
       - standby 상태 모델 → serving 전환
+        (현재 떠 있는 vLLM과 비교해 같은 GPU에 같은 모델이면 재기동 없이 role만 변경,
+         서로 다른 GPU의 전환은 병렬로 실행)
       - TEAM_CONFIG에 없는 모델은 idle 상태로 전환
+    dry_run=True면 실행하지 않고 전환 계획과 예상 재기동 시간만 출력
+    전환 결과 report(GPU별 결과/실패, wall time, 기동 시간 합)를 반환
     """
     global TEAM_CONFIG, GPU_PORT_MAP
-    logging.info("daily_model_switch 시작: %s", datetime.datetime.now())
-    try:
-        # serving → standby 전환
-        for s in TEAM_CONFIG["serving"]:
-            user_id = s["user_id"]
-            gpu_id  = s["gpu"]
-            port = GPU_PORT_MAP.get(gpu_id)
-            if port is None:
-                logging.warning("GPU 포트 매핑 없음 (gpu=%s), %s 건너뜀", gpu_id, user_id)
-                continue
-            set_model_standby(user_id, gpu_id=gpu_id)
-            restart_vllm_process(user_id, role='standby', default_port=port)
-            logging.info("%s → standby (gpu=%s, port=%s)", user_id, gpu_id, port)
+    report = None
+    # 전환 하나 = trace 하나 (GET /traces, logs/traces.jsonl)
+    with tracing.span("daily_model_switch", schedule="day", dry_run=dry_run) as sp:
+        logging.info("daily_model_switch 시작: %s (trace=%s)", datetime.datetime.now(), sp.trace_id)
+        try:
+            # TEAM_CONFIG에 없는 모델은 idle로 전환
+            active_users = {s["user_id"] for s in TEAM_CONFIG["serving"]} | {st["user_id"] for st in TEAM_CONFIG["standby"]}
+            # 저장소의 팀 이름(team_name)을 사용 (CSV 파일의 s1_user 등과 대응됨)
+            with tracing.span("db.team_names"):
+                idle_teams = [team_name for team_name in get_store().team_names() if team_name not in active_users]
 
-        # standby → serving 전환
-        for st in TEAM_CONFIG["standby"]:
-            user_id = st["user_id"]
-            gpu_id  = st["gpu"]
-            port = GPU_PORT_MAP.get(gpu_id)
-            if port is None:
-                logging.warning("GPU 포트 매핑 없음 (gpu=%s), %s 건너뜀", gpu_id, user_id)
-                continue
-            set_model_serving(user_id, gpu_id=gpu_id)
-            restart_vllm_process(user_id, role='serving', default_port=port)
-            logging.info("%s → serving (gpu=%s, port=%s)", user_id, gpu_id, port)
+            with tracing.span("plan"):
+                plan = plan_transitions(build_schedule_transitions(TEAM_CONFIG, GPU_PORT_MAP))
+            if dry_run:
+                logging.info("[dry-run] 전환 계획:\n%s", format_plan(plan, idle_teams))
+                return {"plan": plan, "idle": idle_teams, "summary": summarize_plan(plan)}
 
-        # TEAM_CONFIG에 없는 모델은 idle로 전환
-        active_users = {s["user_id"] for s in TEAM_CONFIG["serving"]} | {st["user_id"] for st in TEAM_CONFIG["standby"]}
-        conn = psycopg2.connect(DB_CONN_INFO)
-        cur = conn.cursor()
-        # models 테이블의 팀 이름(team_name)을 사용 (CSV 파일의 s1_user 등과 대응됨)
-        cur.execute("SELECT team_name FROM models")
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        for (team_name,) in rows:
-            if team_name not in active_users:
-                set_model_idle(team_name)
+            # serving → standby, standby → serving 전환 (GPU별로 병렬 실행)
+            # 끝나면 전환 결과와 나머지 팀의 idle을 한 트랜잭션으로 기록
+            report = run_transitions(plan, idle_teams=idle_teams)
+            for r in report["results"]:
+                if r["ok"]:
+                    logging.info("%s → %s (gpu=%s, port=%s, %s, %.1fs)", r["user_id"], r["role"], r["gpu"], r["port"], r["action"], r["launch_sec"])
+            for team_name in idle_teams:
                 logging.info("%s → idle", team_name)
-    except Exception as e:
-        logging.error("daily_model_switch 실행 중 오류: %s", e)
-    logging.info("daily_model_switch 종료: %s", datetime.datetime.now())
+            sp.set(failures=len(report["failures"]))
+            if report["failures"] or report["state_error"]:
+                sp.fail(report["state_error"] or f"{len(report['failures'])}건 전환 실패")
+        except Exception as e:
+            sp.fail(e)
+            logging.error("daily_model_switch 실행 중 오류: %s", e)
+        logging.info("daily_model_switch 종료: %s", datetime.datetime.now())
+    return report
 
-def start_scheduler(gpu_port_map, csv_config_path):
+def start_scheduler(gpu_port_map, csv_config_path, dry_run=False, date_str=None):
     """
     gpu_port_map: 예) {0:5021, 1:5022, 2:5023, 3:5024}
     csv_config_path: CSV 파일 경로 (예: "schedule(day).csv")
+    dry_run: True면 전환 계획만 출력 (DB/vLLM 변경 없음)
+    date_str: 오늘 대신 사용할 날짜 (YYYY-MM-DD, dry-run 확인용)
     
  
     CSV 파일에서 오늘 날짜(YYYY-MM-DD)와 일치하는 행을 찾아 TEAM_CONFIG를 업데이트
@@ -104,31 +103,62 @@ def start_scheduler(gpu_port_map, csv_config_path):
     global GPU_PORT_MAP
     GPU_PORT_MAP = gpu_port_map
 
-    today_str = datetime.date.today().strftime("%Y-%m-%d")
+    today_str = date_str or datetime.date.today().strftime("%Y-%m-%d")
     logging.info("오늘 날짜: %s", today_str)
     
-    try:
-        with open(csv_config_path, mode="r", encoding="utf-8") as csvfile:
-            reader = csv.DictReader(csvfile)
-            found = False
-            for row in reader:
-                if row.get("date", "").strip() == today_str:
-                    logging.info("오늘에 해당하는 CSV 행 발견: %s", row)
-                    set_team_config_from_csv_row(row)
-                    found = True
-                    break
-            if not found:
-                logging.warning("오늘 날짜에 해당하는 CSV 행을 찾지 못했습니다.")
-                return
-    except Exception as e:
-        logging.error("CSV 파일 처리 중 오류: %s", e)
-        return
+    # CSV 읽기부터 전환까지 한 trace
+    with tracing.span("scheduler_day", date=today_str, csv=csv_config_path):
+        next_row = None
+        try:
+            with open(csv_config_path, mode="r", encoding="utf-8") as csvfile:
+                reader = csv.DictReader(csvfile)
+                found = False
+                for row in reader:
+                    row_date = row.get("date", "").strip()
+                    if row_date == today_str:
+                        logging.info("오늘에 해당하는 CSV 행 발견: %s", row)
+                        set_team_config_from_csv_row(row)
+                        found = True
+                    elif row_date > today_str and (next_row is None or row_date < next_row["date"].strip()):
+                        next_row = row
+                if not found:
+                    logging.warning("오늘 날짜에 해당하는 CSV 행을 찾지 못했습니다.")
+                    return
+        except Exception as e:
+            logging.error("CSV 파일 처리 중 오류: %s", e)
+            return
+
+        if dry_run:
+            return daily_model_switch(dry_run=True)
+        # 실행 시간(전환 실패 시 outcome=error)은 /metrics로
+        with track_job("daily_model_switch_day") as job:
+            report = daily_model_switch()
+            if report is None or report["state_error"] or not all(r["ok"] for r in report["results"]):
+                job.outcome = "error"
+        if next_row is not None:
+            schedule_prefetch(next_row)
+        return report
 
-    daily_model_switch()
+def schedule_prefetch(row):
+    """다음 날짜 행의 팀 모델을 전환(해당 날짜 0시) PREFETCH_LEAD_MINUTES 전에 미리 다운로드/캐시 워밍"""
+    switch_time = datetime.datetime.strptime(row["date"].strip(), "%Y-%m-%d")
+    run_time = prefetch_run_time(switch_time)
+    delay = max(0.0, (run_time - datetime.datetime.now()).total_seconds())
+    timer = threading.Timer(delay, prefetch_job, args=(teams_in_row(row), run_time))
+    timer.daemon = True
+    timer.start()
+    logging.info("prefetch 예약: %s 전환용 %s (실행 %s)", row["date"].strip(), teams_in_row(row), run_time)
+    return timer
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="전환 계획과 예상 재기동 시간만 출력")
+    parser.add_argument("--date", default=None, help="오늘 대신 사용할 CSV 날짜 (YYYY-MM-DD)")
+    args = parser.parse_args()
+
     # GPU → 포트 매핑 예시; 환경에 맞게 수정하세요.
     gpu_port_mapping = {0: 5021, 1: 5022, 2: 5023, 3: 5024}
     # CSV 파일 경로; 실제 경로로 수정하세요.
     csv_file_path = "schedule(day).csv"
-    start_scheduler(gpu_port_mapping, csv_file_path)
+    start_scheduler(gpu_port_mapping, csv_file_path, dry_run=args.dry_run, date_str=args.date)
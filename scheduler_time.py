@@ -2,12 +2,12 @@
 
 import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
-import sqlite3
 
-from model_service import set_model_standby, set_model_serving, set_model_idle
-from vllm_control import restart_vllm_process
-
-DB_PATH = "models.db"
+from model_store import get_store
+from prefetch import prefetch_job, prefetch_run_time, teams_in_row
+from metrics import track_job
+import tracing
+from model_transitions import build_schedule_transitions, plan_transitions, run_transitions, summarize_plan, format_plan
 
 # GPU→포트 매핑 (전역)
 GPU_PORT_MAP = {}
@@ -18,57 +18,67 @@ TEAM_CONFIG = {
     "standby": []
 }
 
-def daily_model_switch():
+def daily_model_switch(dry_run=False):
     """
     TEAM_CONFIG["serving"], TEAM_CONFIG["standby"]의 user/gpu대로
     1) serving->standby
     2) standby->serving
+       (1, 2는 GPU별로 병렬 실행, 같은 GPU에 같은 모델이 떠 있으면 재기동 없이 role만 변경)
     3) 나머지 idle
+    dry_run=True면 전환 계획과 예상 재기동 시간만 출력
+    전환 결과 report 반환 (저장소 오류로 계획을 세우지 못하면 None, trace에는 실패로 기록)
     """
     global GPU_PORT_MAP, TEAM_CONFIG
 
-    print("[daily_model_switch] Start:", datetime.datetime.now())
-
-    # 1) 기존 serving -> standby
-    for s in TEAM_CONFIG["serving"]:
-        user_id = s["user_id"]
-        gpu_id  = s["gpu"]
-        port    = GPU_PORT_MAP[gpu_id]  # 매핑
-        set_model_standby(user_id, gpu_id=gpu_id)
-        restart_vllm_process(user_id, role='standby', default_port=port)
-        print(f"[daily_model_switch] {user_id} => standby(gpu={gpu_id}, port={port})")
-
-    # 2) 기존 standby -> serving
-    for st in TEAM_CONFIG["standby"]:
-        user_id = st["user_id"]
-        gpu_id  = st["gpu"]
-        port    = GPU_PORT_MAP[gpu_id]
-        set_model_serving(user_id, gpu_id=gpu_id)
-        restart_vllm_process(user_id, role='serving', default_port=port)
-        print(f"[daily_model_switch] {user_id} => serving(gpu={gpu_id}, port={port})")
+    # 전환 하나 = trace 하나 (GET /traces, logs/traces.jsonl)
+    with tracing.span("daily_model_switch", schedule="time", dry_run=dry_run) as sp:
+        print(f"[daily_model_switch] Start: {datetime.datetime.now()} (trace={sp.trace_id})")
+
+        # 전환 계획(packed면 모델 메타데이터)과 팀 목록은 다른 스케줄러/API와 같은 저장소에서 (MALPYEONG_STORE=sqlite면 models.db)
+        try:
+            with tracing.span("plan"):
+                plan = plan_transitions(build_schedule_transitions(TEAM_CONFIG, GPU_PORT_MAP))
+            if dry_run:
+                print(f"[daily_model_switch] dry-run plan:\n{format_plan(plan)}")
+                return {"plan": plan, "summary": summarize_plan(plan)}
+
+            # 3) 나머지 idle
+            new_active_users = set()
+            for s in TEAM_CONFIG["serving"]:
+                new_active_users.add(s["user_id"])
+            for st in TEAM_CONFIG["standby"]:
+                new_active_users.add(st["user_id"])
+            with tracing.span("db.team_names"):
+                idle_users = [uid for uid in get_store().team_names() if uid not in new_active_users]
+        except Exception as e:
+            # 저장소 오류는 JOB 밖으로 던지지 않고 기록 (호출한 쪽은 None을 보고 실패로 집계)
+            sp.fail(e)
+            print(f"[daily_model_switch] 전환 계획 작성 오류, 전환 중단: {e}")
+            return None
+
+        # 1) 기존 serving -> standby, 2) 기존 standby -> serving (GPU별로 병렬 실행)
+        # 1, 2의 결과와 3)의 idle은 전환이 끝난 뒤 한 트랜잭션으로 기록
+        report = run_transitions(plan, idle_teams=idle_users)
+        sp.set(failures=len(report["failures"]))
+        if report["failures"] or report["state_error"]:
+            sp.fail(report["state_error"] or f"{len(report['failures'])}건 전환 실패")
+    for r in report["results"]:
+        if r["ok"]:
+            print(f"[daily_model_switch] {r['user_id']} => {r['role']}(gpu={r['gpu']}, port={r['port']}, {r['action']}, {r['launch_sec']}s)")
+        else:
+            print(f"[daily_model_switch] {r['user_id']} => {r['role']} FAILED(gpu={r['gpu']}): {r['error']}")
+    for uid in idle_users:
+        print(f"[daily_model_switch] {uid} => idle")
+    if report["state_error"]:
+        print(f"[daily_model_switch] state update FAILED: {report['state_error']}")
+    print(f"[daily_model_switch] wall={report['wall_sec']}s, sum of launches={report['sum_launch_sec']}s")
 
     # (만약 다음번 교체 때 swap을 쓸 거라면 여기서 swap 해도 됨
     # TEAM_CONFIG["serving"], TEAM_CONFIG["standby"] = TEAM_CONFIG["standby"], TEAM_CONFIG["serving"]
     # )
 
-    # 3) 나머지 idle
-    new_active_users = set()
-    for s in TEAM_CONFIG["serving"]:
-        new_active_users.add(s["user_id"])
-    for st in TEAM_CONFIG["standby"]:
-        new_active_users.add(st["user_id"])
-
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("SELECT user_id FROM model_info")
-    rows = cur.fetchall()
-    conn.close()
-
-    for (uid,) in rows:
-        if uid not in new_active_users:
-            set_model_idle(uid)
-
     print("[daily_model_switch] End:", datetime.datetime.now())
+    return report
 
 def set_team_config_from_csv_row(row):
     """
@@ -81,42 +91,56 @@ def set_team_config_from_csv_row(row):
     }
     """
     global TEAM_CONFIG
-    s1_user = row["s1_user"]
-    s1_gpu  = int(row["s1_gpu"])
-    s2_user = row["s2_user"]
-    s2_gpu  = int(row["s2_gpu"])
-    st1_user = row["st1_user"]
-    st1_gpu  = int(row["st1_gpu"])
-    st2_user = row["st2_user"]
-    st2_gpu  = int(row["st2_gpu"])
-
-    TEAM_CONFIG = {
-        "serving": [
-            {"user_id": s1_user, "gpu": s1_gpu},
-            {"user_id": s2_user, "gpu": s2_gpu}
-        ],
-        "standby": [
-            {"user_id": st1_user, "gpu": st1_gpu},
-            {"user_id": st2_user, "gpu": st2_gpu}
-        ]
-    }
+    with tracing.span("csv_parse", time_offset=row.get("time_offset")):
+        s1_user = row["s1_user"]
+        s1_gpu  = int(row["s1_gpu"])
+        s2_user = row["s2_user"]
+        s2_gpu  = int(row["s2_gpu"])
+        st1_user = row["st1_user"]
+        st1_gpu  = int(row["st1_gpu"])
+        st2_user = row["st2_user"]
+        st2_gpu  = int(row["st2_gpu"])
+
+        TEAM_CONFIG = {
+            "serving": [
+                {"user_id": s1_user, "gpu": s1_gpu},
+                {"user_id": s2_user, "gpu": s2_gpu}
+            ],
+            "standby": [
+                {"user_id": st1_user, "gpu": st1_gpu},
+                {"user_id": st2_user, "gpu": st2_gpu}
+            ]
+        }
     print(f"[set_team_config_from_csv_row] TEAM_CONFIG updated => {TEAM_CONFIG}")
 
-def schedule_csv_row(row, run_time, scheduler):
+def schedule_csv_row(row, run_time, scheduler, dry_run=False):
     """
     row: csv 한줄
     run_time: 실행 시점
     scheduler: BackgroundScheduler
+    dry_run: True면 전환 계획만 출력
     """
     def job_func(r=row):
-        # 1) TEAM_CONFIG 갱신
-        set_team_config_from_csv_row(r)
-        # 2) daily_model_switch
-        daily_model_switch()
+        # 예정 시각(run_time) 대비 시작 지연과 실행 시간은 /metrics로, 행 파싱부터 전환까지는 한 trace로
+        with track_job("daily_model_switch_time", scheduled_at=run_time) as job, \
+                tracing.span("scheduler_time", run_time=str(run_time)):
+            # 1) TEAM_CONFIG 갱신
+            set_team_config_from_csv_row(r)
+            # 2) daily_model_switch
+            report = daily_model_switch(dry_run=dry_run)
+            if not dry_run and (report is None or not all(x["ok"] for x in report["results"]) or report["state_error"]):
+                job.outcome = "error"
 
     scheduler.add_job(job_func, 'date', run_date=run_time)
     print(f"[schedule_csv_row] row={row}, run_time={run_time}")
 
+    # 전환 PREFETCH_LEAD_MINUTES 전에 다음 모델들 미리 다운로드/캐시 워밍
+    if not dry_run:
+        prefetch_time = prefetch_run_time(run_time)
+        scheduler.add_job(prefetch_job, 'date', run_date=prefetch_time, args=[teams_in_row(row), prefetch_time],
+                          misfire_grace_time=None)
+        print(f"[schedule_csv_row] prefetch {teams_in_row(row)} at {prefetch_time}")
+
 def start_scheduler(gpu_port_map):
     """
     gpu_port_map 예: {0:5022,1:5023,2:5024,3:5025}
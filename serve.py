@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+운영용 실행: 요청 워커(pre-fork, gunicorn)와 제어 프로세스를 분리
+
+    python serve.py --schedule day --workers 4          # 제어 프로세스 + 워커 4개
+    python serve.py control --schedule day              # 제어 프로세스만 (워커는 다른 곳에서 실행할 때)
+
+  - 제어 프로세스(1개): 스케줄러 JOB, vLLM 기동/전환, 다운로드 큐, 게이트웨이 라우팅
+    → 스케줄러는 항상 이 프로세스 하나에서만 돈다 (워커 수와 무관)
+  - 요청 워커(N개): 평가 제출/조회, /models/list·current, /leaderboard, /models/events
+    → 모델 상태는 DB(저장소)와 LISTEN/NOTIFY 이벤트로만 공유
+  - 워커는 CONTROL_PATHS로 들어온 요청을 제어 프로세스로 그대로 전달
+    (느린 전환/다운로드가 워커 스레드를 막지 않도록 제어 요청만 따로 처리)
+  - 지표는 프로세스별: /metrics는 요청을 받은 워커의 요청/DB 지표,
+    /metrics/control은 제어 프로세스의 vLLM/스케줄러/다운로드 지표
+워커끼리 상태를 공유해야 하므로 MALPYEONG_STORE=memory로는 실행할 수 없다.
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import urllib.error
+import urllib.request
+
+# 외부에 노출하는 주소 / 워커 수 / 워커당 스레드 수
+SERVE_BIND = os.environ.get("MALPYEONG_SERVE_BIND", "0.0.0.0:5020")
+SERVE_WORKERS = int(os.environ.get("MALPYEONG_SERVE_WORKERS", str(min(8, (os.cpu_count() or 1) * 2))))
+SERVE_THREADS = int(os.environ.get("MALPYEONG_SERVE_THREADS", "8"))
+# /models/events(SSE), 게이트웨이 스트리밍 응답이 워커 스레드를 오래 잡으므로 넉넉하게
+SERVE_TIMEOUT = int(os.environ.get("MALPYEONG_SERVE_TIMEOUT", "600"))
+# 제어 프로세스 주소 (워커만 접근하므로 기본은 loopback)
+CONTROL_BIND = os.environ.get("MALPYEONG_CONTROL_BIND", "127.0.0.1:5029")
+CONTROL_TIMEOUT = float(os.environ.get("MALPYEONG_CONTROL_TIMEOUT", "900"))  # /models/switch는 vLLM ready까지 기다림
+
+# 제어 프로세스에서 처리하는 경로 (프로세스 내 상태: vLLM supervisor, 다운로드 큐, 게이트웨이 라우터)
+CONTROL_PATHS = (
+    "/models/download",
+    "/models/standby",
+    "/models/serve",
+    "/models/idle",
+    "/models/switch",
+    "/models/cold_start",
+    "/gpus",
+    "/prefetch",
+    "/slots",
+    "/metrics/control",
+    "/traces",
+)
+# 전달하지 않는 hop-by-hop 헤더
+_HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "te", "trailer", "upgrade",
+                "proxy-authorization", "proxy-authenticate", "content-length", "host"}
+
+def is_control_path(path):
+    return any(path == p or path.startswith(p + "/") for p in CONTROL_PATHS)
+
+class ControlForwarder:
+    """
+    WSGI 미들웨어: CONTROL_PATHS 요청은 제어 프로세스로 전달, 나머지는 app이 처리
+      - 응답 본문은 청크 단위로 흘려보냄 (게이트웨이 SSE 스트리밍 포함)
+    """
+
+    def __init__(self, app, control_url):
+        self.app = app
+        self.control_url = control_url.rstrip("/")
+
+    def __call__(self, environ, start_response):
+        if not is_control_path(environ.get("PATH_INFO", "")):
+            return self.app(environ, start_response)
+        return self._forward(environ, start_response)
+
+    def _forward(self, environ, start_response):
+        url = self.control_url + environ.get("PATH_INFO", "")
+        if environ.get("QUERY_STRING"):
+            url += "?" + environ["QUERY_STRING"]
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        body = environ["wsgi.input"].read(length) if length else None
+        headers = {key[5:].replace("_", "-").title(): value for key, value in environ.items()
+                   if key.startswith("HTTP_") and key[5:].replace("_", "-").lower() not in _HOP_HEADERS}
+        if environ.get("CONTENT_TYPE"):
+            headers["Content-Type"] = environ["CONTENT_TYPE"]
+        req = urllib.request.Request(url, data=body, method=environ["REQUEST_METHOD"], headers=headers)
+        try:
+            upstream = urllib.request.urlopen(req, timeout=CONTROL_TIMEOUT)
+        except urllib.error.HTTPError as e:
+            upstream = e
+        except (urllib.error.URLError, OSError) as e:
+            payload = json.dumps({"error": f"제어 프로세스 연결 실패 ({self.control_url}): {e}"}, ensure_ascii=False).encode("utf-8")
+            start_response("502 Bad Gateway", [("Content-Type", "application/json"), ("Content-Length", str(len(payload)))])
+            return [payload]
+
+        status = f"{upstream.status} {upstream.reason}"
+        out_headers = [(k, v) for k, v in upstream.headers.items() if k.lower() not in _HOP_HEADERS]
+        start_response(status, out_headers)
+
+        def generate():
+            read = getattr(upstream, "read1", upstream.read)
+            try:
+                while True:
+                    chunk = read(8192)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                upstream.close()
+        return generate()
+
+def _split_bind(bind):
+    host, _, port = bind.rpartition(":")
+    return host or "0.0.0.0", int(port)
+
+def run_control(schedule, control_bind=CONTROL_BIND):
+    """제어 프로세스: 스케줄러 JOB 등록 후 전체 app을 control_bind에서 서비스 (스레드 서버)"""
+    from werkzeug.serving import make_server
+    from AI_API import app
+    from model_events import event_bus
+
+    if schedule == "day":
+        import main
+        main.start_jobs()
+    elif schedule == "time":
+        import main_time
+        main_time.start_jobs()
+    event_bus.start_listener()
+
+    host, port = _split_bind(control_bind)
+    server = make_server(host, port, app, threaded=True)
+    print(f"[run_control] schedule={schedule} control API on {host}:{port} (pid={os.getpid()})")
+    server.serve_forever()
+
+def _post_fork(server, worker):
+    # 워커마다 LISTEN 커넥션 하나 → 제어 프로세스의 상태 변경으로 캐시/스냅샷 무효화
+    from model_events import event_bus
+    event_bus.start_listener()
+
+def run_workers(bind=SERVE_BIND, workers=SERVE_WORKERS, threads=SERVE_THREADS, control_bind=CONTROL_BIND):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("[run_workers] gunicorn이 필요합니다: pip install gunicorn")
+
+    control_host, control_port = _split_bind(control_bind)
+    if control_host in ("0.0.0.0", ""):
+        control_host = "127.0.0.1"
+    control_url = f"http://{control_host}:{control_port}"
+
+    class WorkerApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", [bind])
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("timeout", SERVE_TIMEOUT)
+            self.cfg.set("post_fork", _post_fork)
+
+        def load(self):
+            # 워커 프로세스 안에서 import (커넥션 풀/스레드는 fork 뒤에 생성)
+            from AI_API import app
+            return ControlForwarder(app, control_url)
+
+    print(f"[run_workers] {workers} workers × {threads} threads on {bind}, control={control_url}")
+    WorkerApplication().run()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("role", nargs="?", choices=("all", "control", "workers"), default="all")
+    parser.add_argument("--schedule", choices=("day", "time", "none"), default="day",
+                        help="제어 프로세스에서 돌릴 스케줄 (day: main.py, time: main_time.py)")
+    parser.add_argument("--bind", default=SERVE_BIND)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--threads", type=int, default=SERVE_THREADS)
+    parser.add_argument("--control-bind", default=CONTROL_BIND)
+    args = parser.parse_args()
+
+    if os.environ.get("MALPYEONG_STORE", "postgres") == "memory" and args.role != "control":
+        raise SystemExit("[serve] MALPYEONG_STORE=memory는 프로세스 간에 공유되지 않습니다 (postgres 또는 sqlite 사용)")
+
+    if args.role == "control":
+        run_control(args.schedule, args.control_bind)
+        return
+    if args.role == "workers":
+        run_workers(args.bind, args.workers, args.threads, args.control_bind)
+        return
+
+    # all: 제어 프로세스를 자식으로 띄우고 이 프로세스는 gunicorn arbiter
+    control = subprocess.Popen([sys.executable, os.path.abspath(__file__), "control",
+                                "--schedule", args.schedule, "--control-bind", args.control_bind])
+    try:
+        run_workers(args.bind, args.workers, args.threads, args.control_bind)
+    finally:
+        control.send_signal(signal.SIGTERM)
+        try:
+            control.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            control.kill()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+vllm.entrypoints.openai.api_server 대용 스텁 서버 (GPU/vLLM 없이 테스트용)
+
+    MALPYEONG_VLLM_SERVER_MODULE=stub_vllm_server python main.py
+
+vLLM과 같은 인자(--model, --port, --gpu-memory-utilization ...)를 받아
+OpenAI 호환 엔드포인트 일부(/health, /v1/models, /v1/completions, /v1/chat/completions)를 흉내 낸다.
+
+기동/종료 비용도 흉내 낼 수 있다 (supervisor가 인자를 바꾸지 않아도 되도록 환경 변수로도 지정 가능):
+  --load-delay / MALPYEONG_STUB_LOAD_DELAY                  포트를 열기 전 대기(초) = 모델 로딩 시간
+  --load-bytes-per-sec / MALPYEONG_STUB_LOAD_BYTES_PER_SEC  > 0이면 --model 파일 크기 / 속도만큼 추가 대기
+  --memory-mb / MALPYEONG_STUB_MEMORY_MB                    로딩 중 실제로 채워 두는 메모리(MiB, RSS에 잡힘)
+  --shutdown-delay / MALPYEONG_STUB_SHUTDOWN_DELAY          SIGTERM을 받고 종료하기까지 대기(초)
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def make_handler(model_name):
+    class StubHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {})
+            elif self.path == "/v1/models":
+                self._send_json(200, {
+                    "object": "list",
+                    "data": [{"id": model_name, "object": "model", "owned_by": "stub"}]
+                })
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                req = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                req = {}
+            if self.path == "/v1/chat/completions":
+                messages = req.get("messages") or [{}]
+                self._send_json(200, {
+                    "id": f"stub-{time.time_ns()}",
+                    "object": "chat.completion",
+                    "model": model_name,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": f"[stub] {messages[-1].get('content', '')}"},
+                        "finish_reason": "stop"
+                    }]
+                })
+            elif self.path == "/v1/completions":
+                self._send_json(200, {
+                    "id": f"stub-{time.time_ns()}",
+                    "object": "text_completion",
+                    "model": model_name,
+                    "choices": [{"index": 0, "text": f"[stub] {req.get('prompt', '')}", "finish_reason": "stop"}]
+                })
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def log_message(self, fmt, *args):
+            print(f"[stub_vllm_server] {self.address_string()} {fmt % args}", flush=True)
+
+    return StubHandler
+
+def _env_float(name, default=0.0):
+    return float(os.environ.get(name, default))
+
+def _model_bytes(model_path):
+    if os.path.isfile(model_path):
+        return os.path.getsize(model_path)
+    total = 0
+    for root, _dirs, files in os.walk(model_path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files if f.endswith(".safetensors"))
+    return total
+
+def load_model(model_path, load_delay, load_bytes_per_sec, memory_mb):
+    """가중치 로딩 흉내: 메모리를 페이지마다 채우고 지정한 시간만큼 대기, 채운 버퍼 반환 (프로세스가 끝날 때까지 유지)"""
+    t0 = time.monotonic()
+    weights = bytearray(int(memory_mb * 1024 * 1024))
+    for i in range(0, len(weights), 4096):
+        weights[i] = 1
+    delay = load_delay
+    if load_bytes_per_sec > 0:
+        delay += _model_bytes(model_path) / load_bytes_per_sec
+    time.sleep(max(0.0, delay - (time.monotonic() - t0)))
+    return weights
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--gpu-memory-utilization", type=float, default=0.9)
+    parser.add_argument("--load-delay", type=float, default=_env_float("MALPYEONG_STUB_LOAD_DELAY"))
+    parser.add_argument("--load-bytes-per-sec", type=float, default=_env_float("MALPYEONG_STUB_LOAD_BYTES_PER_SEC"))
+    parser.add_argument("--memory-mb", type=float, default=_env_float("MALPYEONG_STUB_MEMORY_MB"))
+    parser.add_argument("--shutdown-delay", type=float, default=_env_float("MALPYEONG_STUB_SHUTDOWN_DELAY"))
+    args, _unknown = parser.parse_known_args()
+
+    def on_sigterm(signum, frame):
+        time.sleep(args.shutdown_delay)
+        sys.exit(0)
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+    # vLLM처럼 가중치를 다 올린 뒤에 포트를 엶 (그 전까지 /health는 연결 거부)
+    weights = load_model(args.model, args.load_delay, args.load_bytes_per_sec, args.memory_mb)
+    print(f"[stub_vllm_server] loaded model={args.model} memory={len(weights) >> 20}MiB", flush=True)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.model))
+    print(f"[stub_vllm_server] model={args.model} listening on {args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
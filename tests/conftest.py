@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+# 모듈이 저장소 최상위에 평평하게 있으므로 테스트에서 바로 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# DB/NOTIFY 없이 돌도록 (개별 테스트에서 덮어쓸 수 있음)
+os.environ.setdefault("MALPYEONG_STORE", "memory")
+os.environ.setdefault("MALPYEONG_EVENTS_BACKEND", "local")
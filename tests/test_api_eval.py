@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# /eval/submit와 /eval/submit_batch가 같은 항목 검사를 하는지 (MemoryStore)
+import pytest
+
+import AI_API
+from model_cache import model_ids
+from model_store import MemoryStore, set_store
+
+@pytest.fixture
+def client():
+    store = set_store(MemoryStore())
+    for team, name in (("TeamA", "a.safetensors"), ("TeamB", "b.safetensors")):
+        store.register_model(team, name, f"/models/{team}/{name}", "rev", {})
+    evaluator_id = store.add_user("evaluser1")
+    model_ids.invalidate()
+    yield AI_API.app.test_client(), store, evaluator_id
+    set_store(None)
+    model_ids.invalidate()
+
+def _item(evaluator_id, override=()):
+    item = {"evaluator_id": evaluator_id, "a_model_name": "a.safetensors", "b_model_name": "b.safetensors",
+            "prompt": "q", "a_model_answer": "A", "b_model_answer": "B", "evaluation": 1, "session_id": "s1"}
+    item.update(override)
+    return item
+
+BAD = [
+    {"evaluation": "9"},
+    {"evaluation": None},
+    {"evaluator_id": "999"},
+    {"evaluator_id": ""},
+    {"b_model_name": "a.safetensors"},
+    {"a_model_name": "nope"},
+    {"session_id": "x" * 51},
+    {"prompt": ["not", "text"]},
+]
+
+def test_submit_accepts_valid_item(client):
+    c, store, evaluator_id = client
+    resp = c.post("/eval/submit", json=_item(evaluator_id))
+    assert resp.status_code == 200, resp.get_json()
+    assert len(store.list_evaluations()) == 1
+
+@pytest.mark.parametrize("override", BAD)
+def test_submit_rejects_like_batch(client, override):
+    c, store, evaluator_id = client
+    item = _item(evaluator_id, override)
+    resp = c.post("/eval/submit", json=item)
+    assert resp.status_code == 400
+    batch = c.post("/eval/submit_batch", json={"evaluations": [item]}).get_json()
+    assert batch["inserted"] == 0
+    # 두 경로가 같은 오류 메시지를 돌려줌
+    assert resp.get_json()["error"] == batch["rejected"][0]["error"]
+    assert store.list_evaluations() == []
+
+def test_submit_rejects_non_object(client):
+    c, _, _ = client
+    assert c.post("/eval/submit", json=[1, 2]).status_code == 400
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+# /leaderboard 오류는 다른 조회 경로처럼 400 + {"error": ...}
+import AI_API
+
+def test_leaderboard_error_is_400(monkeypatch):
+    def broken(**kwargs):
+        raise RuntimeError("store down")
+    monkeypatch.setattr(AI_API.leaderboard, "get", broken)
+    resp = AI_API.app.test_client().get("/leaderboard")
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "store down"}
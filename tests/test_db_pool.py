@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import psycopg2
+import pytest
+
+import db_pool
+
+class _Cursor:
+    def execute(self, query):
+        pass
+
+    def close(self):
+        pass
+
+class _Conn:
+    def __init__(self, healthy):
+        self.closed = 0
+        self.healthy = healthy
+
+    def cursor(self):
+        if not self.healthy:
+            raise psycopg2.OperationalError("server closed the connection")
+        return _Cursor()
+
+    def rollback(self):
+        pass
+
+class _FakePool:
+    """ThreadedConnectionPool 대신: 정해 둔 순서대로 커넥션을 꺼내 줌"""
+
+    def __init__(self, conns):
+        self.conns = list(conns)
+        self.closed = []
+
+    def getconn(self):
+        return self.conns.pop(0)
+
+    def putconn(self, conn, close=False):
+        if close:
+            self.closed.append(conn)
+
+def _pool(conns, max_size=4):
+    pool = db_pool.ConnectionPool.__new__(db_pool.ConnectionPool)
+    pool.acquire_timeout = 1
+    pool.health_check_interval = 0
+    pool.max_size = max_size
+    pool._pool = _FakePool(conns)
+    pool._slots = threading.BoundedSemaphore(max_size)
+    pool._lock = threading.Lock()
+    # 모두 오래 쉬던 커넥션으로 표시 → 꺼낼 때마다 SELECT 1 확인
+    pool._last_used = {id(c): time.monotonic() - 60 for c in conns}
+    return pool
+
+def test_acquire_skips_every_dead_connection():
+    dead = [_Conn(False), _Conn(False)]
+    good = _Conn(True)
+    pool = _pool(dead + [good])
+    assert pool.acquire() is good
+    assert pool._pool.closed == dead
+
+def test_acquire_gives_up_and_releases_slot():
+    pool = _pool([_Conn(False) for _ in range(3)], max_size=2)
+    with pytest.raises(psycopg2.OperationalError):
+        pool.acquire()
+    # 실패해도 대기 슬롯은 돌려줌
+    assert pool._slots.acquire(timeout=0) and pool._slots.acquire(timeout=0)
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from metrics import Counter, Registry, _Metric
+
+def test_metric_base_is_abstract():
+    registry = Registry()
+    with pytest.raises(TypeError):
+        _Metric("x_total", "doc", registry=registry)
+
+    class NoChild(_Metric):
+        kind = "counter"
+
+        def samples(self):
+            return []
+
+    # _new_child를 빠뜨리면 등록 전에 생성 시점에 실패
+    with pytest.raises(TypeError, match="_new_child"):
+        NoChild("y_total", "doc", registry=registry)
+
+def test_counter_labels():
+    c = Counter("z_total", "doc", ("gpu",), registry=Registry())
+    c.labels(0).inc(2)
+    assert list(c.samples()) == [("z_total", {"gpu": 0}, 2)]
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# 로컬 가짜 허브에서 받기, 변경 없음, 팀 간 중복 제거, 이어 받기, 이전 snapshot 정리
+import hashlib
+import json
+import os
+import struct
+
+import pytest
+
+import model_fetch
+import model_service
+from model_fetch import FetchError, ModelStore, fetch_repo
+from model_store import MemoryStore, set_store
+
+def _safetensors(n_floats, seed):
+    # 헤더만 올바르면 되는 최소 safetensors (F32 텐서 하나)
+    header = json.dumps({"w": {"dtype": "F32", "shape": [n_floats], "data_offsets": [0, 4 * n_floats]}}).encode("utf-8")
+    data = hashlib.sha256(seed).digest() * (4 * n_floats // 32)
+    return struct.pack("<Q", len(header)) + header + data
+
+WEIGHTS = _safetensors(3 * 1024 * 256, b"v1")  # 약 3MiB
+
+def _write_repo(hub, team, weights):
+    repo = os.path.join(hub, team, "llm")
+    os.makedirs(repo, exist_ok=True)
+    with open(os.path.join(repo, "model.safetensors"), "wb") as f:
+        f.write(weights)
+    with open(os.path.join(repo, "config.json"), "w") as f:
+        json.dump({"team": team}, f)
+    with open(os.path.join(repo, "optimizer.pt"), "wb") as f:
+        f.write(b"x" * 1024)
+
+@pytest.fixture
+def hub(tmp_path):
+    path = str(tmp_path / "hub")
+    for team in ("TeamA", "TeamB"):
+        _write_repo(path, team, WEIGHTS)
+    return path
+
+@pytest.fixture
+def store(tmp_path):
+    return ModelStore(str(tmp_path / "store"))
+
+def test_fetch_unchanged_and_dedupe(hub, store):
+    endpoint = "file://" + hub
+    r = fetch_repo("TeamA/llm", endpoint=endpoint, store=store)
+    assert sorted(r["files"]) == ["config.json", "model.safetensors"] and r["bytes_downloaded"] == r["bytes_total"]
+    assert not r["unchanged"]
+    r = fetch_repo("TeamA/llm", endpoint=endpoint, store=store)
+    assert r["unchanged"] and r["bytes_downloaded"] == 0
+    r = fetch_repo("TeamB/llm", endpoint=endpoint, store=store)
+    assert r["bytes_deduped"] == len(WEIGHTS) and r["bytes_downloaded"] < 1024
+    with open(os.path.join(r["local_path"], "model.safetensors"), "rb") as f:
+        assert f.read() == WEIGHTS
+
+def test_resume_from_partial(hub, store):
+    endpoint = "file://" + hub
+    first = fetch_repo("TeamA/llm", endpoint=endpoint, store=store)
+    new_weights = _safetensors(3 * 1024 * 256, b"v2")
+    _write_repo(hub, "TeamA", new_weights)
+    sha = hashlib.sha256(new_weights).hexdigest()
+    os.makedirs(os.path.join(store.root, "partial"), exist_ok=True)
+    with open(os.path.join(store.root, "partial", sha + ".part"), "wb") as f:
+        f.write(new_weights[:1024 * 1024])
+    r = fetch_repo("TeamA/llm", endpoint=endpoint, store=store)
+    # config.json은 내용이 같아 중복 제거 → 가중치의 남은 부분만 전송
+    assert r["bytes_resumed"] == 1024 * 1024 and r["bytes_downloaded"] == len(new_weights) - 1024 * 1024
+    # fetch_repo는 이전 revision의 snapshot을 지우지 않음 (등록 뒤에 정리)
+    assert sorted(os.listdir(os.path.dirname(r["local_path"]))) == sorted([first["revision"], r["revision"]])
+
+def test_prune_snapshots_skips_in_use(hub, store):
+    endpoint = "file://" + hub
+    old = fetch_repo("TeamA/llm", endpoint=endpoint, store=store)
+    _write_repo(hub, "TeamA", _safetensors(1024, b"v2"))
+    new = fetch_repo("TeamA/llm", endpoint=endpoint, store=store)
+    parent = os.path.dirname(new["local_path"])
+
+    in_use = [os.path.join(old["local_path"], "model.safetensors")]
+    assert store.prune_snapshots("TeamA/llm", new["revision"], in_use) == []
+    assert sorted(os.listdir(parent)) == sorted([old["revision"], new["revision"]])
+
+    assert store.prune_snapshots("TeamA/llm", new["revision"]) == [old["revision"]]
+    assert os.listdir(parent) == [new["revision"]]
+
+@pytest.mark.parametrize("bad", ["../TeamA", "TeamA/..", "./llm", "/etc/passwd", "TeamA/llm/extra", "TeamA", "Team A/llm"])
+def test_bad_repo_id_rejected(hub, store, bad):
+    # 허브 루트/저장소 밖을 가리키는 repo_id는 경로를 만들기 전에 거부
+    with pytest.raises(ValueError):
+        fetch_repo(bad, endpoint="file://" + hub, store=store)
+
+def test_no_sleep_after_last_attempt(hub, store, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(model_fetch.time, "sleep", sleeps.append)
+    monkeypatch.setattr(ModelStore, "_download", lambda self, *args: (_ for _ in ()).throw(OSError("reset")))
+    with pytest.raises(FetchError):
+        fetch_repo("TeamA/llm", endpoint="file://" + hub, store=store)
+    # 파일마다 재시도 사이에만 대기 (FETCH_RETRIES + 1번 시도 → FETCH_RETRIES번 대기)
+    assert len(sleeps) == 2 * model_fetch.FETCH_RETRIES
+
+class _Slot:
+    def __init__(self, model_path):
+        self.model_path = model_path
+
+class _Supervisor:
+    def __init__(self):
+        self.live = []
+
+    def slots(self):
+        return list(self.live)
+
+@pytest.fixture
+def service(store, monkeypatch):
+    monkeypatch.setattr(model_fetch, "default_store", store)
+    monkeypatch.setattr(model_service, "fetch_store", store)
+    sup = _Supervisor()
+    monkeypatch.setattr(model_service, "supervisor", sup)
+    db = set_store(MemoryStore())
+    yield sup, db
+    set_store(None)
+
+def test_prune_after_registration(hub, service):
+    sup, db = service
+    endpoint = "file://" + hub
+    old = model_service.download_repo_and_save_safetensors("TeamA/llm", endpoint=endpoint)
+    parent = os.path.dirname(old["local_path"])
+    # 이전 revision으로 vLLM이 떠 있으면 새 revision을 등록해도 그 snapshot은 남김
+    sup.live.append(_Slot(db.get_model("TeamA")["safetensors_path"]))
+    _write_repo(hub, "TeamA", _safetensors(1024, b"v2"))
+    new = model_service.download_repo_and_save_safetensors("TeamA/llm", endpoint=endpoint)
+    assert db.get_model("TeamA")["revision"] == new["revision"]
+    assert sorted(os.listdir(parent)) == sorted([old["revision"], new["revision"]])
+    # vLLM이 내려간 뒤 다시 받으면(변경 없음) 남겨 둔 snapshot 정리
+    sup.live.clear()
+    again = model_service.download_repo_and_save_safetensors("TeamA/llm", endpoint=endpoint)
+    assert not again["registered"]
+    assert os.listdir(parent) == [new["revision"]]
+
+def test_no_prune_when_registration_fails(hub, service, monkeypatch):
+    sup, db = service
+    endpoint = "file://" + hub
+    old = model_service.download_repo_and_save_safetensors("TeamA/llm", endpoint=endpoint)
+    _write_repo(hub, "TeamA", _safetensors(1024, b"v2"))
+    def broken(*args, **kwargs):
+        raise RuntimeError("db down")
+    monkeypatch.setattr(db, "register_model", broken)
+    with pytest.raises(RuntimeError, match="DB 저장 오류"):
+        model_service.download_repo_and_save_safetensors("TeamA/llm", endpoint=endpoint)
+    # DB는 아직 이전 revision을 가리키므로 그 snapshot이 남아 있어야 함
+    assert os.path.exists(db.get_model("TeamA")["safetensors_path"])
+    assert old["revision"] in os.listdir(os.path.dirname(old["local_path"]))
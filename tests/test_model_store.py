@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from model_store import ModelStateStore, MemoryStore
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        ModelStateStore()
+
+    class Partial(ModelStateStore):
+        def list_models(self):
+            return []
+
+    # 구현하지 않은 메서드가 있으면 호출 시점이 아니라 생성 시점에 실패
+    with pytest.raises(TypeError, match="get_model"):
+        Partial()
+
+def test_memory_store_implements_interface():
+    store = MemoryStore()
+    store.register_model("TeamA", "a.safetensors", "/models/a", "rev", {})
+    assert store.team_names() == ["TeamA"]
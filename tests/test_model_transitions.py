@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# run_transitions가 계획에 없는 슬롯/idle 팀 슬롯을 모든 GPU에서 내리는지 (vLLM/DB 없이 가짜 supervisor로)
+import model_transitions
+
+class _Slot:
+    def __init__(self, gpu_id, port, team_name):
+        self.gpu_id, self.port, self.team_name = gpu_id, port, team_name
+
+class _Supervisor:
+    def __init__(self, slots):
+        self._slots = {s.port: s for s in slots}
+        self.stopped = []
+
+    def slots(self):
+        return list(self._slots.values())
+
+    def stop(self, port):
+        self.stopped.append(port)
+        return self._slots.pop(port, None)
+
+def _run(monkeypatch, slots, plan, idle_teams):
+    sup = _Supervisor(slots)
+    monkeypatch.setattr(model_transitions, "supervisor", sup)
+    monkeypatch.setattr(model_transitions, "run_transition", lambda t: dict(t, ok=True, launch_sec=0.0))
+    states = {}
+    monkeypatch.setattr(model_transitions, "apply_model_states", lambda a: states.update(a) or list(a))
+    report = model_transitions.run_transitions(plan, idle_teams=idle_teams)
+    return sup, report, states
+
+def test_stops_unplanned_and_idle_slots_on_every_gpu(monkeypatch):
+    slots = [
+        _Slot(0, 5021, "teamA"),  # 계획대로 유지
+        _Slot(0, 5022, "teamB"),  # GPU 1로 옮겨 감 → 포트가 계획에 없음
+        _Slot(2, 5025, "teamC"),  # idle 팀, 전환 그룹이 없는 GPU
+        _Slot(3, 5026, "teamD"),  # 계획에도 idle에도 없음
+    ]
+    plan = [
+        {"user_id": "teamA", "gpu": 0, "port": 5021, "role": "serving", "action": "keep", "exclusive": False},
+        {"user_id": "teamB", "gpu": 1, "port": 5023, "role": "standby", "action": "restart", "exclusive": False},
+    ]
+    sup, report, states = _run(monkeypatch, slots, plan, ["teamC"])
+    assert sorted(sup.stopped) == [5022, 5025, 5026]
+    assert sorted(s["port"] for s in report["stopped"]) == [5022, 5025, 5026]
+    assert states["teamC"] == ("idle", None)
+    assert not report["failures"]
+
+def test_idle_team_on_planned_port_is_stopped(monkeypatch):
+    # 같은 포트를 다른 팀이 이어받는 경우에도 idle 팀의 슬롯은 먼저 내림
+    slots = [_Slot(0, 5021, "teamC")]
+    plan = [{"user_id": "teamA", "gpu": 0, "port": 5021, "role": "serving", "action": "restart"}]
+    sup, report, _ = _run(monkeypatch, slots, plan, ["teamC"])
+    assert sup.stopped == [5021]
+
+def test_nothing_to_stop(monkeypatch):
+    slots = [_Slot(0, 5021, "teamA")]
+    plan = [{"user_id": "teamA", "gpu": 0, "port": 5021, "role": "serving", "action": "keep"}]
+    sup, report, _ = _run(monkeypatch, slots, plan, [])
+    assert sup.stopped == []
+    assert report["stopped"] == []
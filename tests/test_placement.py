@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# 가상 모델 크기로 배치 결과 확인
+import pytest
+
+from placement import GIB, GPU_RESERVE_FRACTION, PlacementError, plan_placement
+
+SMALL = [{"team_name": f"mnist{i}", "weight_bytes": 1024 ** 2} for i in range(4)]
+
+def test_small_models_share_gpus():
+    p = plan_placement(SMALL, [0, 1])
+    assert len({x["port"] for x in p}) == 4
+    assert all(x["shared"] for x in p)
+    for gpu in (0, 1):
+        assert sum(x["gpu_memory_utilization"] for x in p if x["gpu_id"] == gpu) <= 1 - GPU_RESERVE_FRACTION
+
+def test_preferred_gpu_and_best_fit():
+    big = [{"team_name": "llm70b", "weight_bytes": 60 * GIB, "gpu": 1},
+           {"team_name": "llm8b", "weight_bytes": 16 * GIB},
+           {"team_name": "mnist", "weight_bytes": 1024 ** 2}]
+    p = {x["team_name"]: x for x in plan_placement(big, [0, 1], reserved_ports=[5021])}
+    # 선호 GPU 유지, 작은 모델은 남는 공간이 가장 작은 GPU(70B 옆)에 채워 넣음
+    assert p["llm70b"]["gpu_id"] == 1 and p["mnist"]["gpu_id"] == 1
+    assert p["llm8b"]["gpu_id"] == 0 and not p["llm8b"]["shared"]
+    assert p["llm8b"]["gpu_memory_utilization"] == 0.95
+    assert p["llm70b"]["gpu_memory_utilization"] + p["mnist"]["gpu_memory_utilization"] <= 0.95
+    assert 5021 not in {x["port"] for x in p.values()}
+
+def test_live_ports_are_sticky():
+    # 지금 떠 있는 GPU/포트를 선호로 주면, 다른 팀이 추가/제거되어도 그 팀의 포트는 그대로
+    live = {x["team_name"]: x for x in plan_placement(SMALL, [0, 1], base_port=6000)}
+    again = [dict(m, gpu=live[m["team_name"]]["gpu_id"], port=live[m["team_name"]]["port"]) for m in SMALL[1:]]
+    again.append({"team_name": "aaa_new", "weight_bytes": 1024 ** 2})
+    p = {x["team_name"]: x for x in plan_placement(again, [0, 1], base_port=6000)}
+    for m in SMALL[1:]:
+        assert (p[m["team_name"]]["gpu_id"], p[m["team_name"]]["port"]) == (live[m["team_name"]]["gpu_id"], live[m["team_name"]]["port"])
+    assert p["aaa_new"]["port"] not in {live[m["team_name"]]["port"] for m in SMALL[1:]}
+
+def test_model_larger_than_gpu():
+    with pytest.raises(PlacementError):
+        plan_placement([{"team_name": "huge", "weight_bytes": 200 * GIB}], [0])
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+# 계획 단계의 저장소 오류가 JOB 밖으로 나가지 않고 None(실패)으로 돌아오는지
+import scheduler_time
+
+def _broken(*args, **kwargs):
+    raise RuntimeError("store down")
+
+def test_plan_store_error_returns_none(monkeypatch):
+    monkeypatch.setattr(scheduler_time, "build_schedule_transitions", _broken)
+    assert scheduler_time.daily_model_switch() is None
+    assert scheduler_time.daily_model_switch(dry_run=True) is None
+
+def test_team_names_store_error_returns_none(monkeypatch):
+    monkeypatch.setattr(scheduler_time, "plan_transitions", lambda transitions: [])
+    monkeypatch.setattr(scheduler_time, "get_store", _broken)
+    assert scheduler_time.daily_model_switch() is None
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# stub_vllm_server를 실제 프로세스로 띄워 기동 대기/비정상 종료 처리를 확인 (GPU/vLLM 불필요)
+import os
+import signal
+import socket
+import time
+
+import pytest
+
+import vllm_supervisor
+from metrics import VLLM_CRASHES
+from vllm_supervisor import VLLMNotReadyError, VLLMSupervisor
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture
+def supervisor(tmp_path, monkeypatch):
+    monkeypatch.setattr(vllm_supervisor, "VLLM_LOG_DIR", str(tmp_path))
+    monkeypatch.setattr(vllm_supervisor, "READY_POLL_INITIAL", 0.1)
+    monkeypatch.setattr(vllm_supervisor, "READY_POLL_MAX", 0.2)
+    sup = VLLMSupervisor(server_module="stub_vllm_server")
+    # 자식 프로세스가 저장소 최상위의 stub_vllm_server를 import할 수 있도록
+    monkeypatch.setenv("PYTHONPATH", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    yield sup
+    sup.stop_all()
+
+def test_ready_after_load_delay(supervisor, monkeypatch):
+    monkeypatch.setenv("MALPYEONG_STUB_LOAD_DELAY", "0.5")
+    slot = supervisor.start(0, _free_port(), "teamA", "serving", "/models/a", exclusive=False)
+    supervisor.wait_until_ready(slot, timeout=20)
+    assert slot.launch_to_ready_sec >= 0.5
+    assert supervisor.cold_starts()["teamA"][-1]["port"] == slot.port
+
+def test_exit_before_ready_raises(supervisor):
+    # --model이 없으면 argparse가 바로 종료 → 포트가 열리기 전에 죽은 것
+    supervisor.build_command = lambda model_path, port, gpu_memory_utilization=0.95: [
+        supervisor.python_exe, "-m", "stub_vllm_server", "--port", str(port)
+    ]
+    slot = supervisor.start(0, _free_port(), "teamA", "serving", "/models/a", exclusive=False)
+    with pytest.raises(VLLMNotReadyError, match="exited before ready"):
+        supervisor.wait_until_ready(slot, timeout=20)
+
+def test_not_ready_within_timeout(supervisor, monkeypatch):
+    monkeypatch.setenv("MALPYEONG_STUB_LOAD_DELAY", "30")
+    slot = supervisor.start(0, _free_port(), "teamA", "serving", "/models/a", exclusive=False)
+    with pytest.raises(VLLMNotReadyError, match="not ready within"):
+        supervisor.wait_until_ready(slot, timeout=1)
+
+@pytest.mark.parametrize("body", [b"<html>starting</html>", b"[]", b'{"data": []}'])
+def test_bad_models_body_keeps_polling(supervisor, monkeypatch, body):
+    # /health는 200인데 /v1/models 본문이 JSON 객체가 아니거나 비어 있으면 예외 없이 timeout까지 폴링
+    slot = supervisor.start(0, _free_port(), "teamA", "serving", "/models/a", exclusive=False)
+    polls = []
+    def fake_http_ok(url, timeout=2.0):
+        polls.append(url)
+        return True, (body if url.endswith("/v1/models") else b"{}")
+    monkeypatch.setattr(vllm_supervisor, "_http_ok", fake_http_ok)
+    with pytest.raises(VLLMNotReadyError, match="not ready within"):
+        supervisor.wait_until_ready(slot, timeout=1)
+    assert len(polls) > 2
+
+def test_crash_is_counted_and_stop_is_not(supervisor):
+    crashed = supervisor.start(0, _free_port(), "teamA", "serving", "/models/a", exclusive=False)
+    stopped = supervisor.start(1, _free_port(), "teamB", "serving", "/models/b", exclusive=False)
+    supervisor.wait_until_ready(crashed, timeout=20)
+    supervisor.wait_until_ready(stopped, timeout=20)
+    crashes = VLLM_CRASHES.labels(crashed.gpu_id, crashed.port)
+    stops = VLLM_CRASHES.labels(stopped.gpu_id, stopped.port)
+
+    os.killpg(crashed.pid, signal.SIGKILL)
+    supervisor.stop(stopped.port)
+    deadline = time.time() + 10
+    while crashes.value() < 1 and time.time() < deadline:
+        time.sleep(0.05)
+    assert crashes.value() == 1
+    assert stops.value() == 0
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+모델 전환 추적 (trace / span)
+
+    with tracing.span("daily_model_switch", schedule="day") as sp:
+        ...
+        sp.set(failures=0)
+
+  - 바깥 span이 없으면 새 trace(trace_id)를 시작, 있으면 그 아래 자식 span
+    → 스케줄 전환 하나(daily_model_switch, /models/switch 등)가 trace 하나:
+      CSV 파싱, DB 상태 기록, 기존 vLLM 종료(kill), 프로세스 생성(spawn), ready 대기가 자식 span
+  - 현재 span은 contextvars로 전달 (스레드 풀에서 실행하는 함수는 wrap()으로 감싸 부모 span을 넘김)
+  - 끝난 span은 TRACE_LOG_PATH(JSONL, 회전)에 한 줄씩 기록
+  - 최근 TRACE_HISTORY개 trace는 메모리에 보관 → GET /traces (진행 중인 trace는 끝나지 않은 span의 duration_ms=None)
+"""
+
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+TRACING_ENABLED = os.environ.get("MALPYEONG_TRACING", "1") != "0"
+TRACE_LOG_PATH = os.environ.get("MALPYEONG_TRACE_LOG", os.path.join("logs", "traces.jsonl"))
+TRACE_LOG_MAX_BYTES = int(os.environ.get("MALPYEONG_TRACE_LOG_MAX_BYTES", str(20 * 1024 * 1024)))
+TRACE_LOG_BACKUP_COUNT = int(os.environ.get("MALPYEONG_TRACE_LOG_BACKUP_COUNT", "5"))
+TRACE_HISTORY = int(os.environ.get("MALPYEONG_TRACE_HISTORY", "50"))  # 메모리에 보관하는 trace 수
+
+_current = contextvars.ContextVar("malpyeong_span", default=None)
+
+_traces = OrderedDict()  # trace_id → {"trace_id", "root", "spans": [span dict, ...]}
+_traces_lock = threading.Lock()
+
+_logger = None
+_logger_lock = threading.Lock()
+
+def _trace_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            directory = os.path.dirname(TRACE_LOG_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            logger = logging.getLogger("malpyeong.trace")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = logging.handlers.RotatingFileHandler(
+                TRACE_LOG_PATH, maxBytes=TRACE_LOG_MAX_BYTES, backupCount=TRACE_LOG_BACKUP_COUNT, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            _logger = logger
+        return _logger
+
+class Span:
+    def __init__(self, name, parent=None, attrs=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attrs = dict(attrs or {})
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.duration_ms = None
+        self.status = "running"
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def fail(self, error):
+        # 예외를 안에서 처리하는 코드에서 실패로 표시
+        self.status = "error"
+        self.error = str(error)
+        return self
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "thread": self.thread,
+            "attrs": self.attrs,
+        }
+
+    def _finish(self, exc=None):
+        self.duration_ms = round((time.perf_counter() - self._t0) * 1000, 3)
+        if exc is not None:
+            self.status = "error"
+            self.error = f"{type(exc).__name__}: {exc}"
+        elif self.status != "error":
+            self.status = "ok"
+
+class _NoopSpan:
+    trace_id = None
+    span_id = None
+
+    def set(self, **attrs):
+        return self
+
+    def fail(self, error):
+        return self
+
+_NOOP = _NoopSpan()
+
+class span:
+    """with span(name, **attrs) as sp: … – 현재 span의 자식 (없으면 새 trace의 root)"""
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self._span = None
+        self._token = None
+
+    def __enter__(self):
+        if not TRACING_ENABLED:
+            return _NOOP
+        parent = _current.get()
+        self._span = Span(self.name, parent, self.attrs)
+        self._token = _current.set(self._span)
+        _started(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is None:
+            return False
+        _current.reset(self._token)
+        self._span._finish(exc)
+        _finished(self._span)
+        return False
+
+def _started(sp):
+    with _traces_lock:
+        trace = _traces.get(sp.trace_id)
+        if trace is None:
+            trace = _traces[sp.trace_id] = {"trace_id": sp.trace_id, "root": sp, "spans": []}
+            while len(_traces) > TRACE_HISTORY:
+                _traces.popitem(last=False)
+        trace["spans"].append(sp)
+
+def _finished(sp):
+    try:
+        _trace_logger().info(json.dumps(sp.to_dict(), ensure_ascii=False, default=str))
+    except Exception as e:
+        print(f"[tracing] span 기록 실패: {e}")
+
+def current_span():
+    return _current.get()
+
+def current_trace_id():
+    sp = _current.get()
+    return sp.trace_id if sp is not None else None
+
+def wrap(fn):
+    """
+    지금의 span을 부모로 fn을 실행하는 함수 반환 (ThreadPoolExecutor/Thread에 넘길 때)
+      ex.map(tracing.wrap(_run_gpu_group), groups)
+    """
+    parent = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+def _trace_dict(trace, with_spans=True):
+    root = trace["root"]
+    spans = sorted(trace["spans"], key=lambda s: s.start)
+    out = {
+        "trace_id": trace["trace_id"],
+        "name": root.name,
+        "start": root.start,
+        "duration_ms": root.duration_ms,
+        "status": root.status,
+        "attrs": root.attrs,
+        "span_count": len(spans),
+    }
+    if with_spans:
+        out["spans"] = [s.to_dict() for s in spans]
+    else:
+        # 목록에서는 가장 오래 걸린 말단 span만 (어느 단계가 느렸는지)
+        parents = {s.parent_id for s in spans}
+        leaves = [s for s in spans if s is not root and s.span_id not in parents and s.duration_ms is not None]
+        slowest = max(leaves, key=lambda s: s.duration_ms, default=None)
+        out["slowest_span"] = {"name": slowest.name, "duration_ms": slowest.duration_ms, "attrs": slowest.attrs} if slowest else None
+    return out
+
+def recent_traces(limit=20, name=None, min_ms=None, with_spans=False):
+    """최근 trace(최신순) – name: root span 이름, min_ms: 이 시간 이상 걸린(또는 진행 중인) trace만"""
+    with _traces_lock:
+        traces = list(_traces.values())
+        out = []
+        for trace in reversed(traces):
+            root = trace["root"]
+            if name and root.name != name:
+                continue
+            if min_ms is not None and root.duration_ms is not None and root.duration_ms < min_ms:
+                continue
+            out.append(_trace_dict(trace, with_spans))
+            if len(out) >= limit:
+                break
+        return out
+
+def get_trace(trace_id):
+    with _traces_lock:
+        trace = _traces.get(trace_id)
+        return _trace_dict(trace) if trace is not None else None
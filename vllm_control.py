@@ -1,63 +1,51 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import psycopg2
-import subprocess
-import os
-import sys
-import time
+from model_store import get_store
+from vllm_supervisor import supervisor, VLLMNotReadyError
+import tracing
 
-DB_CONN_INFO = "dbname=malpyeong user=postgres password=!TeddySum host=127.0.0.1 port=5432"
-
-def get_model_path_by_role(team_name: str, role: str='serving'):
-    conn = psycopg2.connect(DB_CONN_INFO)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT safetensors_path, gpu_id
-        FROM models
-        WHERE team_name = %s AND model_state = %s
-        LIMIT 1
-    """, (team_name, role))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-    if not row:
-        raise ValueError(f"No {role} model for team {team_name}.")
-    path, gpu = row
+def get_model_path(team_name: str):
+    # 상태와 무관하게 팀의 모델 경로/GPU 조회 (ready 확인 후에 상태를 바꾸기 위함)
+    m = get_store().get_model(team_name)
+    if not m:
+        raise ValueError(f"No model for team {team_name}.")
+    path, gpu = m["safetensors_path"], m["gpu_id"]
     if gpu is None:
         gpu = 0
     return path, gpu
 
-def restart_vllm_process(team_name: str, role: str='serving', default_port=5022):
-    # 기존 vLLM 프로세스 종료
-    subprocess.run(["pkill", "-f", "api_server"])
-    # DB에서 모델 정보 조회
-    model_path, gpu_id = get_model_path_by_role(team_name, role=role)
-    python_exe = sys.executable
-    env = os.environ.copy()
-    env["CUDA_VISIBLE_DEVICES"] = str(gpu_id)
-    cmd = [
-        python_exe,
-        "-m",
-        "vllm.entrypoints.openai.api_server",
-        "--model", model_path,
-        "--port", str(default_port),
-        "--gpu-memory-utilization", "0.95"
-    ]
-    print(f"[restart_vllm_process] CMD: {cmd}")
-    proc = subprocess.Popen(
-        cmd,
-        env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
-    time.sleep(2)
-    rc = proc.poll()
-    if rc is not None:
-        out, err = proc.communicate()
-        print(f"[restart_vllm_process] vLLM crashed. Return code={rc}")
-        print("stdout:", out)
-        print("stderr:", err)
-    else:
-        print(f"[restart_vllm_process] vLLM is running (pid={proc.pid}) on port {default_port}")
+def restart_vllm_process(team_name: str, role: str='serving', default_port=5022, gpu_id=None,
+                         gpu_memory_utilization=0.95, exclusive=True):
+    """
+    team_name의 모델을 gpu_id/default_port 슬롯에 다시 띄우고, 실제로 요청에 응답할 때까지 대기
+      - gpu_id를 주지 않으면 DB에 기록된 GPU 사용
+      - exclusive=False면 같은 GPU의 다른 슬롯을 유지 (placement로 GPU를 나눠 쓰는 경우)
+      - 응답하지 않고 죽거나 시간 초과되면 RuntimeError
+        → 호출하는 쪽은 이 함수가 성공한 뒤에 DB 상태(serving/standby)를 바꾼다
+    """
+    # 스케줄 전환 중이면 그 trace 아래, API에서 직접 부르면 새 trace
+    with tracing.span("restart_vllm_process", team=team_name, role=role, port=default_port) as sp:
+        # DB에서 모델 정보 조회
+        with tracing.span("db.get_model_path", team=team_name):
+            model_path, db_gpu_id = get_model_path(team_name)
+        if gpu_id is None:
+            gpu_id = db_gpu_id
+        sp.set(gpu=gpu_id)
+        # 같은 포트/GPU 슬롯의 기존 vLLM만 종료하고 새로 실행 (다른 GPU의 서버는 유지)
+        slot = supervisor.start(gpu_id, default_port, team_name, role, model_path,
+                                gpu_memory_utilization=gpu_memory_utilization, exclusive=exclusive)
+        sp.set(pid=slot.pid)
+        try:
+            supervisor.wait_until_ready(slot)
+        except VLLMNotReadyError as e:
+            rc = slot.proc.poll()
+            if rc is not None:
+                print(f"[restart_vllm_process] vLLM crashed. Return code={rc}, log={slot.log_path}")
+                print("\n".join(slot.tail(50)))
+            else:
+                supervisor.stop(default_port)
+            raise RuntimeError(f"restart_vllm_process 오류: {e}")
+    print(f"[restart_vllm_process] vLLM is ready (pid={slot.pid}) on gpu {gpu_id}, port {default_port} "
+          f"after {slot.launch_to_ready_sec}s (trace={sp.trace_id})")
+    return slot
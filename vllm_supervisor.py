@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import logging.handlers
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+
+from metrics import REGISTRY, VLLM_CRASHES, VLLM_READY_SECONDS
+import tracing
+
+# vLLM 서버 모듈 (테스트 시 "stub_vllm_server"로 바꿔 GPU 없이 실행 가능)
+VLLM_SERVER_MODULE = os.environ.get("MALPYEONG_VLLM_SERVER_MODULE", "vllm.entrypoints.openai.api_server")
+STOP_TIMEOUT = float(os.environ.get("MALPYEONG_VLLM_STOP_TIMEOUT", "30"))  # SIGTERM 후 SIGKILL까지 대기(초)
+READY_TIMEOUT = float(os.environ.get("MALPYEONG_VLLM_READY_TIMEOUT", "600"))  # 기동 후 요청에 응답할 때까지 최대 대기(초)
+READY_POLL_INITIAL = 0.5   # 첫 헬스체크 간격(초), 이후 1.5배씩 증가
+READY_POLL_MAX = 5.0       # 헬스체크 간격 상한(초)
+COLD_START_HISTORY = 20    # 모델별로 보관하는 launch→ready 기록 수
+
+# vLLM stdout/stderr 로그 설정
+VLLM_LOG_DIR = os.environ.get("MALPYEONG_VLLM_LOG_DIR", "logs")
+VLLM_LOG_MAX_BYTES = int(os.environ.get("MALPYEONG_VLLM_LOG_MAX_BYTES", str(20 * 1024 * 1024)))  # 파일당 최대 크기
+VLLM_LOG_BACKUP_COUNT = int(os.environ.get("MALPYEONG_VLLM_LOG_BACKUP_COUNT", "5"))              # 회전 파일 보관 개수
+VLLM_LOG_RING_LINES = int(os.environ.get("MALPYEONG_VLLM_LOG_RING_LINES", "2000"))               # 메모리에 보관하는 최근 줄 수
+
+class VLLMNotReadyError(RuntimeError):
+    pass
+
+def _has_models(body):
+    # /v1/models 응답에 모델 목록이 있는지 (JSON이 아니거나 객체가 아니면 아직 준비 안 된 것으로 보고 계속 폴링)
+    try:
+        return bool(json.loads(body or b"{}").get("data"))
+    except (ValueError, AttributeError):
+        return False
+
+class VLLMSlot:
+    """포트 하나에서 실행 중인 vLLM 프로세스 정보"""
+
+    def __init__(self, gpu_id, port, team_name, role, model_path, proc):
+        self.gpu_id = gpu_id
+        self.port = port
+        self.team_name = team_name
+        self.role = role
+        self.model_path = model_path
+        self.proc = proc
+        self.started_at = time.time()
+        self.ready_at = None
+        self.launch_to_ready_sec = None
+        self.stop_sec = 0.0      # 이 슬롯을 띄우기 전에 기존 프로세스를 종료하는 데 걸린 시간
+        self.spawn_sec = None    # Popen(프로세스 생성)에 걸린 시간
+        self.gpu_memory_utilization = None
+        self.log_path = None
+        self.log_lines = deque(maxlen=VLLM_LOG_RING_LINES)  # 최근 stdout/stderr 줄 (ring buffer)
+
+    @property
+    def pid(self):
+        return self.proc.pid
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def to_dict(self):
+        return {
+            "gpu_id": self.gpu_id,
+            "port": self.port,
+            "pid": self.pid,
+            "team_name": self.team_name,
+            "role": self.role,
+            "model_path": self.model_path,
+            "gpu_memory_utilization": self.gpu_memory_utilization,
+            "alive": self.alive(),
+            "returncode": self.proc.poll(),
+            "started_at": self.started_at,
+            "uptime_sec": round(time.time() - self.started_at, 1),
+            "ready": self.ready_at is not None,
+            "ready_at": self.ready_at,
+            "launch_to_ready_sec": self.launch_to_ready_sec,
+            "stop_sec": self.stop_sec,
+            "spawn_sec": self.spawn_sec,
+            "log_path": self.log_path,
+        }
+
+    def tail(self, n=100):
+        """최근 n줄: ring buffer로 충분하면 메모리에서, 아니면 로그 파일 끝에서부터 읽음"""
+        lines = list(self.log_lines)
+        if n <= len(lines) or self.log_path is None:
+            return lines[-n:] if n > 0 else []
+        return tail_file(self.log_path, n)
+
+def tail_file(path, n, block_size=8192):
+    """파일 전체를 읽지 않고 끝에서부터 block 단위로 거슬러 올라가며 마지막 n줄 반환"""
+    if n <= 0 or not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= n:
+            read_size = min(block_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            data = f.read(read_size) + data
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    return lines[-n:]
+
+_slot_loggers = {}
+_slot_loggers_lock = threading.Lock()
+
+def _slot_logger(gpu_id, port):
+    # 슬롯(gpu, port)별 회전 로그 파일 – 재시작해도 같은 파일에 이어서 기록
+    key = (gpu_id, port)
+    with _slot_loggers_lock:
+        if key not in _slot_loggers:
+            os.makedirs(VLLM_LOG_DIR, exist_ok=True)
+            path = os.path.join(VLLM_LOG_DIR, f"vllm_gpu{gpu_id}_port{port}.log")
+            logger = logging.getLogger(f"vllm.gpu{gpu_id}.port{port}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=VLLM_LOG_MAX_BYTES, backupCount=VLLM_LOG_BACKUP_COUNT, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+            _slot_loggers[key] = (logger, path)
+        return _slot_loggers[key]
+
+def _drain(pipe, stream_name, slot, logger, on_exit=None):
+    # 파이프 버퍼가 차서 vLLM이 write에서 멈추지 않도록 계속 읽어서 파일/ring buffer로 보냄
+    try:
+        for line in iter(pipe.readline, ""):
+            line = f"[{stream_name}] {line.rstrip()}"
+            slot.log_lines.append(line)
+            logger.info(line)
+    except (OSError, ValueError):
+        pass
+    finally:
+        pipe.close()
+    # 파이프가 닫혔다 = 프로세스가 끝남
+    if on_exit is not None:
+        on_exit(slot)
+
+def _http_ok(url, timeout=2.0):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            return resp.status == 200, resp.read()
+    except (urllib.error.URLError, OSError):
+        return False, None
+
+class VLLMSupervisor:
+    """
+    GPU 슬롯별 vLLM 프로세스 관리
+      - 슬롯은 포트로 구분하며, 각 슬롯의 PID/포트/GPU를 기록
+      - 새 모델을 띄울 때는 같은 포트(및 같은 GPU)의 프로세스만 종료
+        (pkill -f api_server처럼 다른 GPU의 서버까지 죽이지 않음)
+      - 각 vLLM은 별도 세션(프로세스 그룹)으로 띄워 워커 프로세스까지 함께 종료
+    """
+
+    def __init__(self, server_module=VLLM_SERVER_MODULE, python_exe=sys.executable):
+        self.server_module = server_module
+        self.python_exe = python_exe
+        self._slots = {}  # port → VLLMSlot
+        self._cold_starts = {}  # team_name → deque[{model_path, gpu_id, port, launch_to_ready_sec, ready_at}]
+        self._lock = threading.RLock()
+
+    def build_command(self, model_path, port, gpu_memory_utilization=0.95):
+        return [
+            self.python_exe,
+            "-m",
+            self.server_module,
+            "--model", model_path,
+            "--port", str(port),
+            "--gpu-memory-utilization", str(gpu_memory_utilization)
+        ]
+
+    def _terminate(self, slot, timeout=STOP_TIMEOUT):
+        if not slot.alive():
+            return
+        try:
+            os.killpg(slot.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        try:
+            slot.proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            print(f"[VLLMSupervisor] pid={slot.pid} did not exit in {timeout}s, sending SIGKILL")
+            try:
+                os.killpg(slot.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            slot.proc.wait()
+
+    def stop(self, port):
+        with self._lock:
+            slot = self._slots.pop(port, None)
+        if slot is None:
+            return None
+        self._terminate(slot)
+        print(f"[VLLMSupervisor.stop] gpu={slot.gpu_id} port={port} pid={slot.pid} team={slot.team_name} stopped")
+        return slot
+
+    def stop_gpu(self, gpu_id):
+        with self._lock:
+            ports = [p for p, s in self._slots.items() if s.gpu_id == gpu_id]
+        return [self.stop(p) for p in ports]
+
+    def stop_all(self):
+        with self._lock:
+            ports = list(self._slots)
+        for p in ports:
+            self.stop(p)
+
+    def start(self, gpu_id, port, team_name, role, model_path, gpu_memory_utilization=0.95, exclusive=True):
+        """
+        gpu_id/port 슬롯에 vLLM 실행
+          exclusive=True면 같은 GPU에서 돌던 다른 슬롯도 종료 (GPU 메모리 확보)
+        """
+        with self._lock:
+            old_slots = [self._slots.pop(port, None)]
+            if exclusive:
+                old_slots += [self._slots.pop(p) for p, s in list(self._slots.items()) if s.gpu_id == gpu_id]
+        # 종료 대기는 락 밖에서 (다른 GPU 슬롯의 조회/기동을 막지 않도록)
+        t0 = time.time()
+        for old in old_slots:
+            if old is not None:
+                with tracing.span("kill", gpu=old.gpu_id, port=old.port, pid=old.pid, team=old.team_name):
+                    self._terminate(old)
+                print(f"[VLLMSupervisor.start] stopped gpu={old.gpu_id} port={old.port} pid={old.pid} team={old.team_name}")
+
+        env = os.environ.copy()
+        env["CUDA_VISIBLE_DEVICES"] = str(gpu_id)
+        cmd = self.build_command(model_path, port, gpu_memory_utilization)
+        print(f"[VLLMSupervisor.start] gpu={gpu_id} port={port} CMD: {cmd}")
+        t1 = time.time()
+        with tracing.span("spawn", gpu=gpu_id, port=port, team=team_name) as sp:
+            proc = subprocess.Popen(
+                cmd,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                errors="replace",
+                bufsize=1,
+                start_new_session=True
+            )
+            sp.set(pid=proc.pid)
+        slot = VLLMSlot(gpu_id, port, team_name, role, model_path, proc)
+        slot.stop_sec = round(t1 - t0, 3)
+        slot.spawn_sec = round(slot.started_at - t1, 3)
+        slot.gpu_memory_utilization = gpu_memory_utilization
+        logger, slot.log_path = _slot_logger(gpu_id, port)
+        logger.info(f"[supervisor] start team={team_name} role={role} pid={proc.pid} model={model_path}")
+        # 종료 감지(_on_exit)가 슬롯을 찾을 수 있도록 로그 스레드보다 먼저 등록
+        with self._lock:
+            self._slots[port] = slot
+        for pipe, name in ((proc.stdout, "stdout"), (proc.stderr, "stderr")):
+            threading.Thread(
+                target=_drain, args=(pipe, name, slot, logger, self._on_exit if name == "stdout" else None),
+                name=f"vllm-log-gpu{gpu_id}-{port}-{name}", daemon=True
+            ).start()
+        return slot
+
+    def _on_exit(self, slot):
+        # stop()/start()로 내린 슬롯은 종료 전에 목록에서 빠지므로, 아직 등록돼 있으면 스스로 죽은 것
+        rc = slot.proc.wait()
+        with self._lock:
+            crashed = self._slots.get(slot.port) is slot
+        if crashed:
+            VLLM_CRASHES.labels(slot.gpu_id, slot.port).inc()
+            print(f"[VLLMSupervisor] gpu={slot.gpu_id} port={slot.port} pid={slot.pid} team={slot.team_name} "
+                  f"exited unexpectedly (rc={rc}, ready={slot.ready_at is not None})")
+
+    def wait_until_ready(self, slot, timeout=READY_TIMEOUT, host="127.0.0.1"):
+        """
+        OpenAI 호환 /health → /v1/models 가 응답할 때까지 backoff로 폴링
+          - 프로세스가 먼저 죽거나 timeout을 넘기면 VLLMNotReadyError
+          - 성공하면 launch→ready 시간을 슬롯과 모델별 기록에 남김
+        """
+        base_url = f"http://{host}:{slot.port}"
+        deadline = slot.started_at + timeout
+        interval = READY_POLL_INITIAL
+        with tracing.span("ready_wait", gpu=slot.gpu_id, port=slot.port, team=slot.team_name) as sp:
+            polls = 0
+            while True:
+                rc = slot.proc.poll()
+                if rc is not None:
+                    raise VLLMNotReadyError(f"vLLM exited before ready (gpu={slot.gpu_id}, port={slot.port}, rc={rc})")
+                polls += 1
+                sp.set(polls=polls)
+                ok, _ = _http_ok(f"{base_url}/health")
+                if ok:
+                    ok, body = _http_ok(f"{base_url}/v1/models")
+                    if ok and _has_models(body):
+                        break
+                if time.time() + interval > deadline:
+                    raise VLLMNotReadyError(f"vLLM not ready within {timeout}s (gpu={slot.gpu_id}, port={slot.port})")
+                time.sleep(interval)
+                interval = min(interval * 1.5, READY_POLL_MAX)
+
+        slot.ready_at = time.time()
+        slot.launch_to_ready_sec = round(slot.ready_at - slot.started_at, 3)
+        VLLM_READY_SECONDS.labels(slot.gpu_id, slot.port).observe(slot.ready_at - slot.started_at)
+        with self._lock:
+            history = self._cold_starts.setdefault(slot.team_name, deque(maxlen=COLD_START_HISTORY))
+            history.append({
+                "model_path": slot.model_path,
+                "gpu_id": slot.gpu_id,
+                "port": slot.port,
+                "launch_to_ready_sec": slot.launch_to_ready_sec,
+                "ready_at": slot.ready_at,
+            })
+        print(f"[VLLMSupervisor.wait_until_ready] gpu={slot.gpu_id} port={slot.port} team={slot.team_name} "
+              f"ready in {slot.launch_to_ready_sec}s")
+        return slot
+
+    def cold_starts(self):
+        with self._lock:
+            return {team: list(history) for team, history in self._cold_starts.items()}
+
+    def set_role(self, port, role):
+        # 프로세스는 그대로 두고 역할(serving/standby)만 변경
+        with self._lock:
+            slot = self._slots.get(port)
+            if slot is not None:
+                slot.role = role
+        return slot
+
+    def get(self, port):
+        with self._lock:
+            return self._slots.get(port)
+
+    def find_by_gpu(self, gpu_id):
+        with self._lock:
+            return [s for s in self._slots.values() if s.gpu_id == gpu_id]
+
+    def slots(self):
+        with self._lock:
+            return sorted(self._slots.values(), key=lambda s: (s.gpu_id, s.port))
+
+    def metric_families(self):
+        # 슬롯별 현재 상태 (/metrics 수집 시점)
+        now = time.time()
+        up, uptime = [], []
+        for s in self.slots():
+            labels = {"gpu": s.gpu_id, "port": s.port, "team": s.team_name, "role": s.role}
+            alive = s.alive()
+            up.append((labels, 1 if alive and s.ready_at is not None else 0))
+            if alive:
+                uptime.append((labels, round(now - s.started_at, 3)))
+        return [
+            ("malpyeong_vllm_slot_up", "gauge", "GPU 슬롯의 vLLM이 살아 있고 ready면 1", up),
+            ("malpyeong_vllm_slot_uptime_seconds", "gauge", "GPU 슬롯의 vLLM 프로세스 생성 후 경과 시간(초)", uptime),
+        ]
+
+supervisor = VLLMSupervisor()
+REGISTRY.add_collector(supervisor.metric_families)